@@ -9,6 +9,10 @@ base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if base_path not in sys.path:
     sys.path.insert(0, base_path)
 
+# Running as a serverless function: the app skips background threads at import
+# and loads heavy dependencies on first use
+os.environ.setdefault('SERVERLESS', '1')
+
 # Import the Flask app
 from backend.app import app
 
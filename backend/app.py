@@ -4,34 +4,124 @@
 Hugo博客发布器 - Flask后端API
 """
 
+import io
 import os
-import time
 from datetime import datetime, timedelta, timezone
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
-from .services.deepseek import DeepSeekService
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from .services.deepseek import DeepSeekService, usage_scope, current_usage, PRIORITY_BATCH, PRIORITY_INTERACTIVE
 from .services.github import GitHubService
+from .services.commit_coalescer import CommitCoalescer, CoalescingGitHubService
+from .services.image_localizer import ImageLocalizer, image_files
+from .services.bulk_import import BulkImporter
+from .services.feed_poller import FeedPoller
+from .utils.image_processor import ImageProcessor
+from .utils.cpu_pool import cpu_pool
 
 from .utils.markdown import MarkdownGenerator
-from .utils.web_scraper import fetch_article_content
-from .utils.web_scraper import fetch_article_content
+from .utils.formatter import MarkdownFormatter
+from .utils.renderer import MarkdownRenderer
+from .utils.web_scraper import fetch_article_content, extract_article
 import re
+import json
+import gzip
+import hashlib
 import threading
 import uuid
 import traceback
 import queue
+import tempfile
 import atexit
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
+
+# 无服务器环境（Vercel 等）：请求结束后实例会被冻结，导入时不启动任何后台线程
+SERVERLESS = os.environ.get('SERVERLESS', os.environ.get('VERCEL', '')).lower() in ('1', 'true')
 CORS(app, origins=[os.environ.get('FRONTEND_URL', '*')])
 
+# 超过上限的请求直接返回 413；上传的文件由 Werkzeug 先写入临时文件，不整体读入内存
+MAX_CONTENT_SIZE = int(os.environ.get('MAX_CONTENT_SIZE', 50 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_SIZE
+
+# 超过该字节数的 JSON 响应按 Accept-Encoding 压缩（brotli 优先，未安装时用 gzip）
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+# 各 GET 接口的 Cache-Control；文件和列表带 ETag，每次向服务端确认，未变化时返回 304
+CACHE_CONTROL = {
+    'get_config': 'public, max-age=300',
+    'list_files': 'private, no-cache',
+    'get_file': 'private, no-cache',
+    'render_file': 'private, no-cache',
+    'get_job_status': 'no-store',
+    'health_check': 'no-store'
+}
+
+markdown_formatter = MarkdownFormatter()
+
 try:
     deepseek_service = DeepSeekService()
 except ValueError:
-    # 如果DeepSeek API密钥未设置，创建一个模拟服务
+    # 如果DeepSeek API密钥未设置，创建一个模拟服务（仅使用本地排版）
     class MockDeepSeekService:
         def format_markdown(self, content):
             return content + "\n\n<!-- 由于DeepSeek API密钥未设置，未进行格式优化 -->"
+        
+        def format_article(self, content, title='', tags=None, category='', progress_callback=None):
+            return {
+                'title': title,
+                'category': category,
+                'tags': tags or [],
+                'content': markdown_formatter.format(content, title)
+            }
+        
+        def analyze_metadata(self, content, title='', tags=None, category=''):
+            return {'title': title, 'category': category, 'tags': tags or []}
+        
+        def enrich_article(self, content, title='', tags=None, timeout=None):
+            # 本地回退：标题和标签沿用 analyze_metadata 的结果，摘要取正文第一段
+            if not content or not content.strip():
+                raise ValueError('文章内容不能为空')
+            metadata = self.analyze_metadata(content, title, tags)
+            result = {
+                'title': metadata['title'],
+                'tags': metadata['tags'],
+                'description': self._first_paragraph(content),
+                'missing': [],
+                'errors': {}
+            }
+            for field in ('title', 'tags', 'description'):
+                if not result[field]:
+                    del result[field]
+                    result['missing'].append(field)
+                    result['errors'][field] = '需要配置 DEEPSEEK_API_KEY'
+            return result
+        
+        def _first_paragraph(self, content, limit=120):
+            for block in re.split(r'\n\s*\n', content):
+                text = block.strip()
+                if not text or text.startswith(('#', '```', '~~~', '|', '>', '<', '- ', '* ', '![')) \
+                        or re.match(r'\d+\. ', text):
+                    continue
+                text = re.sub(r'!\[[^\]]*\]\([^)]*\)', '', text)
+                text = re.sub(r'\[([^\]]*)\]\([^)]*\)', r'\1', text)
+                text = ' '.join(re.sub(r'[*_`]+', '', text).split())
+                if text:
+                    return text[:limit] + ('…' if len(text) > limit else '')
+            return ''
+        
+        def translate_article(self, content, title, languages):
+            # 翻译无法在本地完成：逐个语言返回失败，原文照常发布，失败原因写入任务结果
+            return {lang: {'success': False, 'error': '翻译需要配置 DEEPSEEK_API_KEY'} for lang in languages}
+        
+        def health(self):
+            return {'enabled': False}
     
     deepseek_service = MockDeepSeekService()
     print("Warning: DeepSeek API key not set, using mock service")
@@ -42,16 +132,35 @@ except ValueError:
     github_service = None
     print("Warning: GitHub credentials not set, GitHub functionality disabled")
 
+# 写合并（可选）：窗口期内的写入和删除合并为一次提交
+coalesce_window = float(os.environ.get('GITHUB_COALESCE_WINDOW', 0))
+if github_service and coalesce_window > 0:
+    commit_coalescer = CommitCoalescer(
+        github_service,
+        window=coalesce_window,
+        max_ops=int(os.environ.get('GITHUB_COALESCE_MAX_OPS', 50))
+    )
+    github_service = CoalescingGitHubService(github_service, commit_coalescer)
+    atexit.register(commit_coalescer.flush)
+
+image_localizer = ImageLocalizer()
+image_processor = ImageProcessor()
+
 try:
     markdown_generator = MarkdownGenerator()
 except ValueError:
     markdown_generator = None
     print("Warning: Markdown generator not initialized, some functionality may be disabled")
 
+markdown_renderer = MarkdownRenderer(markdown_generator)
+
+bulk_importer = BulkImporter(deepseek_service, github_service, markdown_generator, markdown_formatter)
 
 # Global job store and queue
 jobs = {}
 task_queue = queue.Queue()
+# 流式发布：job_id -> 接收任务状态更新的队列
+job_listeners = {}
 
 def worker():
     """Background worker to process the queue"""
@@ -61,15 +170,107 @@ def worker():
             if job_id is None:  # Sentinel to stop worker
                 break
                 
-            process_publish_task(job_id, data, deepseek_service, github_service, markdown_generator)
+            with usage_scope(PRIORITY_BATCH):
+                process_publish_task(job_id, data, deepseek_service, github_service, markdown_generator)
             task_queue.task_done()
         except Exception as e:
             print(f"Worker exception: {e}")
             traceback.print_exc()
 
-# Start worker thread
-worker_thread = threading.Thread(target=worker, daemon=True)
-worker_thread.start()
+
+async def async_worker(job_id, data, priority=PRIORITY_BATCH):
+    """Async engine counterpart of worker(); streamed publishes pass PRIORITY_INTERACTIVE"""
+    with usage_scope(priority):
+        await process_publish_task_async(job_id, data, async_engine, markdown_generator)
+
+
+# 发布方式：auto（无服务器环境在请求内执行并流式返回进度，否则进入队列）、always、never
+PUBLISH_STREAM = os.environ.get('PUBLISH_STREAM', 'auto').lower()
+# 流式发布时无进度更新的最长间隔（秒），超过后重发当前状态
+PUBLISH_HEARTBEAT = float(os.environ.get('PUBLISH_HEARTBEAT', 10))
+
+# 发布引擎：thread（默认，单个后台线程串行处理）或 async（asyncio 事件循环，并发处理大量任务）
+publish_engine = os.environ.get('PUBLISH_ENGINE', 'thread').lower()
+async_engine = None
+async_jobs = None
+
+if publish_engine == 'async':
+    from .services.async_engine import AsyncEngine, AsyncJobRunner
+    async_engine = AsyncEngine(
+        deepseek_service,
+        github_service,
+        image_localizer,
+        deepseek_concurrency=int(os.environ.get('DEEPSEEK_MAX_CONCURRENCY', 16)),
+        github_concurrency=int(os.environ.get('GITHUB_MAX_CONCURRENCY', 10)),
+        fetch_concurrency=int(os.environ.get('FETCH_MAX_CONCURRENCY', 20))
+    )
+    async_jobs = AsyncJobRunner(async_engine.runner, async_worker,
+                                max_jobs=int(os.environ.get('PUBLISH_MAX_JOBS', 100)))
+
+
+worker_thread = None
+worker_lock = threading.Lock()
+
+
+def _ensure_worker():
+    """第一个任务入队时才启动后台线程"""
+    global worker_thread
+    with worker_lock:
+        if worker_thread is None:
+            worker_thread = threading.Thread(target=worker, daemon=True)
+            worker_thread.start()
+
+
+def prepare_feed_entry(entry, options):
+    """
+    订阅条目的抓取 → 排版 → 生成文件（不上传），同一次轮询的文件由 FeedPoller 合并提交
+    """
+    article = _publish_options({
+        'title': entry['title'],
+        'content': entry['link'],
+        'date': entry['date'] or datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00'),
+        **options
+    })
+    scraped = fetch_article_content(entry['link']) if entry['link'] else None
+    if not scraped and entry['html']:
+        # 抓取失败时使用订阅源中的全文或摘要
+        scraped = extract_article(f'<html><body><article>{entry["html"]}</article></body></html>')
+    _apply_scraped(article, scraped)
+    
+    needs_ai = _prepare_content(article, markdown_generator)
+    try:
+        if needs_ai:
+            _apply_analysis(article, deepseek_service.format_article(
+                content=article['content'],
+                title=article['title'],
+                tags=article['tags'],
+                category=article['category']
+            ))
+        elif _needs_metadata(article):
+            _apply_metadata(article, deepseek_service.analyze_metadata(
+                content=article['content'],
+                title=article['title'],
+                tags=article['tags'],
+                category=article['category']
+            ))
+    except Exception as e:
+        print(f"Warning: AI analysis failed: {e}")
+    _ensure_title(article)
+    
+    if article['localize_images']:
+        _apply_localized_images(article, image_localizer.localize(article['content'], _image_prefix(article)))
+    files = _build_publish_files(article, markdown_generator)
+    files.extend(_image_files(article))
+    return files
+
+
+feed_poller = FeedPoller(github_service, prepare_feed_entry)
+feed_poll_interval = float(os.environ.get('FEED_POLL_INTERVAL', 0))
+if feed_poll_interval > 0 and github_service and markdown_generator:
+    if SERVERLESS:
+        print("Warning: FEED_POLL_INTERVAL is ignored in serverless mode, call /api/feeds/poll from a cron job instead")
+    else:
+        feed_poller.start(feed_poll_interval)
 
 
 def process_publish_task(job_id, data, deepseek_service, github_service, markdown_generator):
@@ -79,103 +280,427 @@ def process_publish_task(job_id, data, deepseek_service, github_service, markdow
     try:
         # Update status to processing
         jobs[job_id]['status'] = 'processing'
-        jobs[job_id]['message'] = '正在分析文章内容...'
-        jobs[job_id]['progress'] = 10
-        
-        title = data.get('title', '').strip()
-        content = data['content']
-        date = data.get('date', datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00'))
-        tags = data.get('tags', [])
-        category = data.get('category', '')
-        target_dir = data.get('target_dir', 'content/posts')
-        draft = data.get('draft', False)
-        auto_format = data.get('auto_format', True)
+        _update_job(job_id, '正在分析文章内容...', 10)
+        article = _publish_options(data)
 
         # 1. Check if content is a URL
-        url_pattern = re.compile(r'^https?://\S+$')
-        if url_pattern.match(content.strip()):
-            jobs[job_id]['message'] = '正在抓取链接内容...'
-            print(f"Detected URL in publish: {content.strip()}, fetching content...")
-            scraped_data = fetch_article_content(content.strip())
-            
-            if scraped_data:
-                content = scraped_data['content']
-                if not title and scraped_data['title']:
-                    title = scraped_data['title']
-                    print(f"Use scraped title: {title}")
-            else:
-                raise Exception('无法从链接获取内容，请检查链接是否有效')
+        url = _article_url(article)
+        if url:
+            _update_job(job_id, '正在抓取链接内容...')
+            print(f"Detected URL in publish: {url}, fetching content...")
+            _apply_scraped(article, fetch_article_content(url))
 
-        # 2. Parse Front Matter to avoid duplication
-        parsed = markdown_generator.parse_front_matter(content)
-        content = parsed['content']
-        
-        # 3. AI Analysis
-        jobs[job_id]['message'] = '正在进行AI优化排版...'
-        jobs[job_id]['progress'] = 30
+        # 2. Parse Front Matter, local formatting (no network), then AI only when needed
+        needs_ai = _prepare_content(article, markdown_generator)
         
         try:
-            analysis = deepseek_service.format_article(
-                content=content,
-                title=title,
-                tags=tags,
-                category=category
-            )
-            
-            content = analysis.get('content', content)
-            tags = analysis.get('tags', [])
-            category = analysis.get('category', '未分类')
-            
-            if not title:
-                extracted_title = parsed.get('front_matter', {}).get('title')
-                title = extracted_title if extracted_title else analysis.get('title', '未命名文章')
-                
+            if needs_ai:
+                _update_job(job_id, '正在进行AI优化排版...', 30)
+                _apply_analysis(article, deepseek_service.format_article(
+                    content=article['content'],
+                    title=article['title'],
+                    tags=article['tags'],
+                    category=article['category'],
+                    progress_callback=_format_progress(job_id)
+                ))
+            elif _needs_metadata(article):
+                # 排版质量已达标，仅补全缺失的元数据
+                _update_job(job_id, '正在分析文章元数据...', 30)
+                _apply_metadata(article, deepseek_service.analyze_metadata(
+                    content=article['content'],
+                    title=article['title'],
+                    tags=article['tags'],
+                    category=article['category']
+                ))
         except Exception as e:
             print(f"Warning: AI analysis failed: {e}")
-            if not title:
-                title = f"未命名文章_{datetime.now(timezone(timedelta(hours=8))).strftime('%Y%m%d%H%M%S')}"
+        
+        _ensure_title(article)
 
-        # 4. Generate full content
-        jobs[job_id]['message'] = '正在生成文件...'
-        jobs[job_id]['progress'] = 60
+        # 3. Enrichment runs alongside image localization + translation: they do not depend on each other
+        def enrich():
+            _update_job(job_id, '正在生成摘要和标签...', 55)
+            try:
+                return deepseek_service.enrich_article(
+                    content=article['content'], title=article['title'], tags=list(article['tags'])
+                )
+            except Exception as e:
+                print(f"Warning: enrichment failed: {e}")
+                return None
+
+        def localize_and_translate():
+            # 翻译使用图片本地化之后的正文
+            if article['localize_images']:
+                _update_job(job_id, '正在下载文章图片...', 58)
+                _apply_localized_images(article, image_localizer.localize(article['content'], _image_prefix(article)))
+            if not article['languages']:
+                return {}
+            _update_job(job_id, f'正在翻译为 {", ".join(article["languages"])}...', 65)
+            return deepseek_service.translate_article(
+                content=article['content'], title=article['title'], languages=article['languages']
+            )
+
+        enriched, translations = _run_parallel(enrich if article['enrich'] else None, localize_and_translate)
+        if enriched:
+            _apply_enrichment(article, enriched)
         
-        filename = markdown_generator.generate_filename(title)
-        full_content = markdown_generator.wrap_with_front_matter(
-            title=title,
-            content=content,
-            date=date,
-            tags=tags,
-            category=category,
-            draft=draft
-        )
+        # 4. Generate full content
+        _update_job(job_id, '正在生成文件...', 75)
+        files = _build_publish_files(article, markdown_generator)
+        failed_languages = _add_translations(article, files, translations, markdown_generator)
+        files.extend(_image_files(article))
         
         # 5. Upload to GitHub
-        jobs[job_id]['message'] = '正在上传到GitHub...'
-        jobs[job_id]['progress'] = 80
-        
-        result = github_service.upload_file(
-            content=full_content,
-            filename=filename,
-            target_dir=target_dir,
-            message=f'Publish: {title}'
-        )
+        _update_job(job_id, '正在上传到GitHub...', 80)
         
-        if result['success']:
-            jobs[job_id]['status'] = 'completed'
-            jobs[job_id]['progress'] = 100
-            jobs[job_id]['message'] = '文章发布成功'
-            jobs[job_id]['result'] = {
-                'file_path': result['file_path'],
-                'url': result['url']
-            }
+        if len(files) > 1:
+            # 原文与所有翻译版本放在同一次提交中
+            result = _multi_file_result(github_service.upload_files(files=files, message=f'Publish: {article["title"]}'))
         else:
-            raise Exception(result.get('error', '上传失败'))
+            result = github_service.upload_file(
+                content=files[0]['content'],
+                filename=article['filename'],
+                target_dir=article['target_dir'],
+                message=f'Publish: {article["title"]}'
+            )
+        
+        _complete_job(job_id, result, files, failed_languages, article)
             
     except Exception as e:
-        print(f"Job {job_id} failed: {str(e)}")
-        traceback.print_exc()
-        jobs[job_id]['status'] = 'failed'
-        jobs[job_id]['error'] = str(e)
+        _fail_job(job_id, e)
+
+
+async def process_publish_task_async(job_id, data, engine, markdown_generator):
+    """
+    process_publish_task 的异步版本：步骤相同，网络调用走异步客户端
+    """
+    import asyncio
+
+    try:
+        jobs[job_id]['status'] = 'processing'
+        _update_job(job_id, '正在分析文章内容...', 10)
+        article = _publish_options(data)
+
+        url = _article_url(article)
+        if url:
+            _update_job(job_id, '正在抓取链接内容...')
+            print(f"Detected URL in publish: {url}, fetching content...")
+            _apply_scraped(article, await engine.fetcher.fetch_article_content(url))
+
+        needs_ai = _prepare_content(article, markdown_generator)
+
+        try:
+            if needs_ai:
+                _update_job(job_id, '正在进行AI优化排版...', 30)
+                _apply_analysis(article, await engine.deepseek.format_article(
+                    content=article['content'],
+                    title=article['title'],
+                    tags=article['tags'],
+                    category=article['category'],
+                    progress_callback=_format_progress(job_id)
+                ))
+            elif _needs_metadata(article):
+                _update_job(job_id, '正在分析文章元数据...', 30)
+                _apply_metadata(article, await engine.deepseek.analyze_metadata(
+                    content=article['content'],
+                    title=article['title'],
+                    tags=article['tags'],
+                    category=article['category']
+                ))
+        except Exception as e:
+            print(f"Warning: AI analysis failed: {e}")
+
+        _ensure_title(article)
+
+        async def enrich():
+            if not article['enrich']:
+                return None
+            _update_job(job_id, '正在生成摘要和标签...', 55)
+            try:
+                return await engine.deepseek.enrich_article(
+                    content=article['content'], title=article['title'], tags=list(article['tags'])
+                )
+            except Exception as e:
+                print(f"Warning: enrichment failed: {e}")
+                return None
+
+        async def localize_and_translate():
+            if article['localize_images']:
+                _update_job(job_id, '正在下载文章图片...', 58)
+                _apply_localized_images(article, await engine.images.localize(article['content'], _image_prefix(article)))
+            if not article['languages']:
+                return {}
+            _update_job(job_id, f'正在翻译为 {", ".join(article["languages"])}...', 65)
+            return await engine.deepseek.translate_article(
+                content=article['content'], title=article['title'], languages=article['languages']
+            )
+
+        enriched, translations = await asyncio.gather(enrich(), localize_and_translate())
+        if enriched:
+            _apply_enrichment(article, enriched)
+
+        _update_job(job_id, '正在生成文件...', 75)
+        files = _build_publish_files(article, markdown_generator)
+        failed_languages = _add_translations(article, files, translations, markdown_generator)
+        files.extend(_image_files(article))
+
+        _update_job(job_id, '正在上传到GitHub...', 80)
+
+        if len(files) > 1:
+            result = _multi_file_result(
+                await engine.github.upload_files(files=files, message=f'Publish: {article["title"]}')
+            )
+        else:
+            result = await engine.github.upload_file(
+                content=files[0]['content'],
+                filename=article['filename'],
+                target_dir=article['target_dir'],
+                message=f'Publish: {article["title"]}'
+            )
+
+        _complete_job(job_id, result, files, failed_languages, article)
+
+    except Exception as e:
+        _fail_job(job_id, e)
+
+
+def _update_job(job_id, message, progress=None):
+    jobs[job_id]['message'] = message
+    if progress is not None:
+        jobs[job_id]['progress'] = progress
+    _notify_job(job_id)
+
+
+def _notify_job(job_id):
+    """把任务的当前状态推送给流式发布的请求（如有）"""
+    listener = job_listeners.get(job_id)
+    if listener is not None:
+        listener.put(dict(jobs[job_id]))
+
+
+def _run_parallel(*tasks):
+    """
+    在线程中并发执行互不依赖的步骤，返回与 tasks 对应的结果（task 为 None 时结果为 None）
+
+    每个线程复制当前上下文，DeepSeek 用量仍计入当前任务
+    """
+    runnable = [task for task in tasks if task is not None]
+    if len(runnable) <= 1:
+        return [task() if task is not None else None for task in tasks]
+    with ThreadPoolExecutor(max_workers=len(runnable)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, task) if task is not None else None for task in tasks]
+        return [future.result() if future is not None else None for future in futures]
+
+
+def _publish_options(data):
+    """
+    读取发布参数，返回在各处理步骤之间传递的文章状态
+    """
+    return {
+        'title': data.get('title', '').strip(),
+        'content': data['content'],
+        'date': data.get('date', datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00')),
+        'tags': data.get('tags', []),
+        'category': data.get('category', ''),
+        'target_dir': data.get('target_dir', 'content/posts'),
+        'draft': data.get('draft', False),
+        'auto_format': data.get('auto_format', True),
+        'enrich': data.get('enrich', False),
+        'description': data.get('description', ''),
+        'languages': [lang for lang in data.get('languages', []) if lang],
+        'localize_images': data.get('localize_images', False),
+        'image_bundle': data.get('image_bundle', False),
+        'stats': data.get('stats', False),
+        'images': {},
+        'failed_images': []
+    }
+
+
+def _article_url(article):
+    """
+    正文只有一个链接时返回该链接，否则返回 None
+    """
+    content = article['content'].strip()
+    return content if re.match(r'^https?://\S+$', content) else None
+
+
+def _apply_scraped(article, scraped_data):
+    if not scraped_data:
+        raise Exception('无法从链接获取内容，请检查链接是否有效')
+    article['content'] = scraped_data['content']
+    if not article['title'] and scraped_data['title']:
+        article['title'] = scraped_data['title']
+        print(f"Use scraped title: {article['title']}")
+
+
+def _prepare_content(article, markdown_generator):
+    """
+    去掉正文中已有的 front matter 并做本地排版，返回是否需要 AI 排版
+    """
+    parsed = markdown_generator.parse_front_matter(article['content'])
+    content = parsed['content']
+    if not article['title']:
+        article['title'] = parsed.get('front_matter', {}).get('title') or markdown_formatter.extract_title(content)
+    article['content'] = markdown_formatter.format(content, article['title'])
+    return article['auto_format'] and markdown_formatter.needs_ai(article['content'])
+
+
+def _needs_metadata(article):
+    return article['auto_format'] and (not article['title'] or not article['tags'])
+
+
+def _format_progress(job_id):
+    def on_format_progress(progress, partial_content):
+        # AI 排版阶段占 30% ~ 60% 的进度区间
+        jobs[job_id]['progress'] = 30 + int(progress * 30)
+        _notify_job(job_id)
+    return on_format_progress
+
+
+def _apply_analysis(article, analysis):
+    article['content'] = markdown_formatter.format(analysis.get('content', article['content']), article['title'])
+    article['tags'] = analysis.get('tags', [])
+    article['category'] = analysis.get('category', '未分类')
+    if not article['title']:
+        article['title'] = analysis.get('title', '未命名文章')
+
+
+def _apply_metadata(article, metadata):
+    article['tags'] = article['tags'] or metadata.get('tags', [])
+    article['category'] = article['category'] or metadata.get('category', '')
+    if not article['title']:
+        article['title'] = metadata.get('title', '')
+
+
+def _ensure_title(article):
+    if not article['title']:
+        article['title'] = f"未命名文章_{datetime.now(timezone(timedelta(hours=8))).strftime('%Y%m%d%H%M%S')}"
+
+
+def _apply_enrichment(article, enriched):
+    if not article['description']:
+        article['description'] = enriched.get('description', '')
+    for tag in enriched.get('tags', []):
+        if tag not in article['tags']:
+            article['tags'].append(tag)
+    if not article['title'] and enriched.get('title'):
+        article['title'] = enriched['title']
+    if enriched['missing']:
+        print(f"Warning: enrichment incomplete: {enriched['errors']}")
+
+
+def _image_prefix(article):
+    # 页面包中图片与 index.md 同目录，使用相对路径
+    return '' if article['image_bundle'] else '/images/'
+
+
+def _apply_localized_images(article, localized):
+    article['content'] = localized['content']
+    article['images'] = localized['images']
+    article['failed_images'] = localized['failed']
+
+
+def _image_files(article):
+    """
+    本地化的图片放在 static/images，页面包模式下与文章放在同一目录
+    """
+    directory = article['target_dir'] if article['image_bundle'] else 'static/images'
+    return image_files(article['images'], directory)
+
+
+def _build_publish_files(article, markdown_generator):
+    """
+    生成原文文件，返回待上传的文件列表
+    """
+    filename = markdown_generator.generate_filename(article['title'])
+    if article['image_bundle'] and article['images']:
+        # Hugo 页面包：<slug>/index.md，图片与之同目录
+        article['target_dir'] = f'{article["target_dir"]}/{os.path.splitext(filename)[0]}'
+        filename = 'index.md'
+    article['filename'] = filename
+    full_content = markdown_generator.wrap_with_front_matter(
+        title=article['title'],
+        content=article['content'],
+        date=article['date'],
+        tags=article['tags'],
+        category=article['category'],
+        draft=article['draft'],
+        description=article['description'],
+        stats=article['stats']
+    )
+    return [{'path': f'{article["target_dir"]}/{article["filename"]}', 'content': full_content}]
+
+
+def _add_translations(article, files, translations, markdown_generator):
+    """
+    把翻译成功的语言追加到文件列表，返回 {语言: 失败原因}
+    """
+    failed_languages = {}
+    for lang, translated in translations.items():
+        if not translated['success']:
+            failed_languages[lang] = translated['error']
+            continue
+        files.append({
+            'language': lang,
+            'path': f'{article["target_dir"]}/{markdown_generator.translation_filename(article["filename"], lang)}',
+            'content': markdown_generator.wrap_with_front_matter(
+                title=translated['title'],
+                content=translated['content'],
+                date=article['date'],
+                tags=article['tags'],
+                category=article['category'],
+                draft=article['draft'],
+                stats=article['stats']
+            )
+        })
+    return failed_languages
+
+
+def _multi_file_result(result):
+    if result['success']:
+        result['file_path'] = result['files'][0]['file_path']
+        result['url'] = result['files'][0]['url']
+    return result
+
+
+def _complete_job(job_id, result, files, failed_languages, article):
+    if not result['success']:
+        raise Exception(result.get('error', '上传失败'))
+    
+    _record_job_usage(job_id)
+    jobs[job_id]['status'] = 'completed'
+    jobs[job_id]['progress'] = 100
+    jobs[job_id]['message'] = '文章发布成功'
+    jobs[job_id]['result'] = {
+        'file_path': result['file_path'],
+        'url': result['url']
+    }
+    translations = [uploaded['file_path'] for f, uploaded in zip(files, result.get('files', [])) if f.get('language')]
+    if translations:
+        jobs[job_id]['result']['translations'] = translations
+    if failed_languages:
+        jobs[job_id]['result']['failed_languages'] = failed_languages
+    if article['images']:
+        jobs[job_id]['result']['images'] = len(article['images'])
+    if article['failed_images']:
+        jobs[job_id]['result']['failed_images'] = article['failed_images']
+    _notify_job(job_id)
+
+
+def _fail_job(job_id, error):
+    print(f"Job {job_id} failed: {str(error)}")
+    traceback.print_exc()
+    _record_job_usage(job_id)
+    jobs[job_id]['status'] = 'failed'
+    jobs[job_id]['error'] = str(error)
+    _notify_job(job_id)
+
+
+def _record_job_usage(job_id):
+    """任务结束前写入当前 usage_scope 的用量，使状态和用量在同一次更新中送达客户端"""
+    usage = current_usage()
+    if usage is not None:
+        jobs[job_id]['usage'] = usage.to_dict()
 
 
 @app.route('/api/health', methods=['GET'])
@@ -185,7 +710,8 @@ def health_check():
     beijing_time = datetime.now(timezone(timedelta(hours=8)))
     return jsonify({
         'status': 'ok',
-        'timestamp': beijing_time.isoformat()
+        'timestamp': beijing_time.isoformat(),
+        'deepseek': deepseek_service.health()
     })
 
 
@@ -213,7 +739,8 @@ def format_article():
         "content": "原始文章内容",
         "title": "文章标题（可选）",
         "tags": ["标签1", "标签2"]（可选）,
-        "category": "分类"（可选）
+        "category": "分类"（可选）,
+        "stream": false（可选，为 true 时以 NDJSON 流式返回排版进度和部分内容）
     }
     """
     try:
@@ -230,6 +757,13 @@ def format_article():
         tags = data.get('tags', [])
         category = data.get('category', '')
         
+        if data.get('stream'):
+            return Response(
+                stream_with_context(_stream_format(content, title, tags, category)),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
         # Check if content is a URL
         # Basic regex for URL: starts with http/https, no spaces, seems like a single link
         url_pattern = re.compile(r'^https?://\S+$')
@@ -249,12 +783,13 @@ def format_article():
                     'error': '无法从链接获取内容，请检查链接是否有效'
                 }), 400
         
-        analysis = deepseek_service.format_article(
-            content=content,
-            title=title,
-            tags=tags,
-            category=category
-        )
+        with usage_scope(PRIORITY_INTERACTIVE) as usage:
+            analysis = deepseek_service.format_article(
+                content=content,
+                title=title,
+                tags=tags,
+                category=category
+            )
         
         # 整合分析结果
         formatted_content = analysis.get('content', '')
@@ -267,7 +802,134 @@ def format_article():
             'formatted_content': formatted_content,
             'suggested_title': suggested_title,
             'suggested_category': suggested_category,
-            'suggested_tags': suggested_tags
+            'suggested_tags': suggested_tags,
+            'usage': usage.to_dict()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _stream_format(content, title, tags, category):
+    """
+    流式排版：逐行输出 NDJSON 事件
+
+    事件类型:
+        progress: {"type": "progress", "progress": 0-100, "message": "...", "partial_content": "..."}
+        result:   与非流式接口相同的结果字段，附加 "type": "result"
+        error:    {"type": "error", "success": false, "error": "..."}
+    """
+    events = queue.Queue()
+    
+    def emit(event):
+        events.put(json.dumps(event, ensure_ascii=False) + '\n')
+    
+    def run():
+        with usage_scope(PRIORITY_INTERACTIVE) as usage:
+            _run(usage)
+    
+    def _run(usage):
+        nonlocal content, title
+        try:
+            url_pattern = re.compile(r'^https?://\S+$')
+            if url_pattern.match(content.strip()):
+                emit({'type': 'progress', 'progress': 0, 'message': '正在抓取链接内容...', 'partial_content': ''})
+                scraped_data = fetch_article_content(content.strip())
+                if not scraped_data:
+                    emit({'type': 'error', 'success': False, 'error': '无法从链接获取内容，请检查链接是否有效'})
+                    return
+                content = scraped_data['content']
+                if not title and scraped_data['title']:
+                    title = scraped_data['title']
+            
+            emit({'type': 'progress', 'progress': 0, 'message': '正在进行AI优化排版...', 'partial_content': ''})
+            
+            def on_progress(progress, partial_content):
+                emit({
+                    'type': 'progress',
+                    'progress': int(progress * 100),
+                    'message': '正在进行AI优化排版...',
+                    'partial_content': partial_content
+                })
+            
+            analysis = deepseek_service.format_article(
+                content=content,
+                title=title,
+                tags=tags,
+                category=category,
+                progress_callback=on_progress
+            )
+            
+            emit({
+                'type': 'result',
+                'success': True,
+                'formatted_content': analysis.get('content', ''),
+                'suggested_title': analysis.get('title', title) if not title else title,
+                'suggested_category': analysis.get('category', category),
+                'suggested_tags': analysis.get('tags', tags),
+                'usage': usage.to_dict()
+            })
+        except Exception as e:
+            emit({'type': 'error', 'success': False, 'error': str(e)})
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    # 先输出一个事件，确保客户端尽快收到首字节
+    yield json.dumps({'type': 'progress', 'progress': 0, 'message': '已开始处理...', 'partial_content': ''}, ensure_ascii=False) + '\n'
+    
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+
+
+@app.route('/api/enrich', methods=['POST'])
+def enrich_article():
+    """
+    并发生成标题、标签和摘要
+    
+    请求参数:
+    {
+        "content": "文章内容",
+        "title": "原始标题（可选）",
+        "tags": ["已有标签"]（可选）,
+        "timeout": 20（可选，整体截止时间，秒）
+    }
+    
+    超时或失败的字段不会出现在结果中，并列在 missing 里。
+    """
+    try:
+        data = request.json
+        
+        if not data or not data.get('content', '').strip():
+            return jsonify({
+                'success': False,
+                'error': '缺少文章内容'
+            }), 400
+        
+        timeout = data.get('timeout')
+        with usage_scope(PRIORITY_INTERACTIVE) as usage:
+            result = deepseek_service.enrich_article(
+                content=data['content'],
+                title=data.get('title', ''),
+                tags=data.get('tags', []),
+                timeout=float(timeout) if timeout else None
+            )
+        
+        return jsonify({
+            'success': True,
+            'title': result.get('title', ''),
+            'tags': result.get('tags', []),
+            'description': result.get('description', ''),
+            'missing': result['missing'],
+            'errors': result['errors'],
+            'usage': usage.to_dict()
         })
     
     except Exception as e:
@@ -314,10 +976,13 @@ def preview_article():
             content=content
         )
         
-        return jsonify({
+        response = {
             'success': True,
             'front_matter': front_matter
-        })
+        }
+        if content:
+            response['analysis'] = markdown_generator.analyze(content)
+        return jsonify(response)
     
     except Exception as e:
         return jsonify({
@@ -349,14 +1014,152 @@ def publish_article():
             'progress': 0
         }
         
-        # Add to queue instead of starting thread immediately
-        task_queue.put((job_id, data))
+        if _stream_publish_enabled():
+            return Response(
+                stream_with_context(_stream_publish(job_id, data)),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        if async_jobs is not None:
+            async_jobs.submit(job_id, data)
+            queue_position = async_jobs.pending
+        else:
+            # Add to queue instead of starting thread immediately
+            _ensure_worker()
+            task_queue.put((job_id, data))
+            queue_position = task_queue.qsize()
         
         return jsonify({
             'success': True,
             'message': '任务已加入队列',
             'job_id': job_id,
-            'queue_position': task_queue.qsize()
+            'queue_position': queue_position
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _stream_publish_enabled():
+    # auto：无服务器环境中后台任务会随请求结束被冻结，改为在请求内执行
+    if PUBLISH_STREAM == 'auto':
+        return SERVERLESS
+    return PUBLISH_STREAM == 'always'
+
+
+def _stream_publish(job_id, data):
+    """
+    在请求内执行发布，逐行输出 NDJSON 事件，响应结束时任务已完成
+
+    事件类型:
+        progress: {"type": "progress", "job": {与 /api/status 相同的任务状态}}
+        result:   {"type": "result", "success": true, "job": {...}}
+        error:    {"type": "error", "success": false, "error": "...", "job": {...}}
+    """
+    events = queue.Queue()
+    job_listeners[job_id] = events
+    
+    def run():
+        try:
+            if async_engine is not None:
+                async_engine.run(async_worker(job_id, data, PRIORITY_INTERACTIVE))
+            else:
+                with usage_scope(PRIORITY_INTERACTIVE):
+                    process_publish_task(job_id, data, deepseek_service, github_service, markdown_generator)
+        except Exception as e:
+            _fail_job(job_id, e)
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    def line(event):
+        return json.dumps(event, ensure_ascii=False) + '\n'
+    
+    try:
+        yield line({'type': 'progress', 'job': dict(jobs[job_id])})
+        while True:
+            try:
+                snapshot = events.get(timeout=PUBLISH_HEARTBEAT)
+            except queue.Empty:
+                # 长时间没有进度时重发当前状态，避免代理因空闲断开连接
+                snapshot = dict(jobs[job_id])
+            if snapshot is None:
+                break
+            yield line({'type': 'progress', 'job': snapshot})
+        
+        job = jobs[job_id]
+        if job['status'] == 'completed':
+            yield line({'type': 'result', 'success': True, 'job': job})
+        else:
+            yield line({'type': 'error', 'success': False, 'error': job.get('error', '发布失败'), 'job': job})
+    finally:
+        job_listeners.pop(job_id, None)
+
+
+@app.route('/api/import', methods=['POST'])
+def import_archive():
+    """
+    批量导入 Markdown 压缩包（zip / tar / tar.gz）
+    
+    请求参数 (multipart/form-data):
+        - file: 压缩包
+        - target_dir: 目标目录（可选，默认 content/posts）
+        - auto_format: 为 true 时对需要的文章调用 AI 排版（可选）
+        - draft: 为 true 时没有 draft 字段的文章按草稿导入（可选）
+        - rename: 为 true 时按日期和标题重新生成文件名，默认沿用原文件名（可选）
+        - restart: 为 true 时忽略上次的导入进度（可选）
+    
+    再次导入同一个压缩包时跳过已提交的文章；进度和逐篇状态通过 /api/status/<job_id> 查询。
+    """
+    try:
+        file = request.files.get('file')
+        if not file or file.filename == '':
+            return jsonify({
+                'success': False,
+                'error': '没有上传文件'
+            }), 400
+        
+        if not github_service or not markdown_generator:
+            return jsonify({
+                'success': False,
+                'error': 'GitHub服务未配置'
+            }), 500
+        
+        def flag(name):
+            return request.form.get(name, 'false').lower() == 'true'
+        
+        options = {
+            'target_dir': request.form.get('target_dir', 'content/posts'),
+            'auto_format': flag('auto_format'),
+            'draft': flag('draft'),
+            'keep_filenames': not flag('rename'),
+            'restart': flag('restart')
+        }
+        
+        # 请求结束后上传的临时文件会被清理，先保存一份给后台任务
+        fd, archive_path = tempfile.mkstemp(prefix='hugo-import-')
+        os.close(fd)
+        file.save(archive_path)
+        
+        job_id = str(uuid.uuid4())
+        jobs[job_id] = {
+            'id': job_id,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(),
+            'message': '导入任务已开始...',
+            'progress': 0
+        }
+        threading.Thread(target=_run_import, args=(job_id, archive_path, options), daemon=True).start()
+        
+        return jsonify({
+            'success': True,
+            'message': '导入任务已开始',
+            'job_id': job_id
         })
     
     except Exception as e:
@@ -366,6 +1169,124 @@ def publish_article():
         }), 500
 
 
+def _run_import(job_id, archive_path, options):
+    """Background thread for one /api/import job"""
+    def on_progress(summary):
+        jobs[job_id]['status'] = 'processing'
+        total = summary['total']
+        _update_job(job_id, f"已处理 {summary['processed']} 篇", int(summary['processed'] * 99 / total) if total else None)
+    
+    try:
+        with usage_scope(PRIORITY_BATCH) as usage:
+            summary = bulk_importer.run(archive_path, options, progress_callback=on_progress)
+        jobs[job_id]['usage'] = usage.to_dict()
+        jobs[job_id]['status'] = 'completed'
+        jobs[job_id]['progress'] = 100
+        jobs[job_id]['message'] = (f"导入完成：提交 {summary['committed']} 篇，失败 {summary['failed']} 篇，"
+                                   f"跳过 {summary['skipped']} 篇")
+        jobs[job_id]['result'] = summary
+    except Exception as e:
+        _fail_job(job_id, e)
+    finally:
+        os.remove(archive_path)
+
+
+@app.route('/api/feeds', methods=['GET', 'POST', 'DELETE'])
+def manage_feeds():
+    """
+    订阅管理
+    
+    GET: 列出订阅
+    POST (JSON): url、target_dir、category、tags、auto_format、localize_images、backfill（首次发布的最新条目数）
+    DELETE: ?url= 取消订阅
+    """
+    try:
+        if request.method == 'GET':
+            return jsonify({
+                'success': True,
+                'feeds': feed_poller.list_feeds()
+            })
+        
+        if request.method == 'DELETE':
+            url = request.args.get('url', '')
+            if not feed_poller.unsubscribe(url):
+                return jsonify({
+                    'success': False,
+                    'error': '订阅不存在'
+                }), 404
+            return jsonify({
+                'success': True,
+                'message': '已取消订阅'
+            })
+        
+        data = request.json or {}
+        url = data.get('url', '').strip()
+        if not re.match(r'^https?://\S+$', url):
+            return jsonify({
+                'success': False,
+                'error': '请提供有效的订阅地址'
+            }), 400
+        
+        feed = feed_poller.subscribe(
+            url,
+            target_dir=data.get('target_dir', 'content/posts'),
+            category=data.get('category', ''),
+            tags=data.get('tags', []),
+            auto_format=data.get('auto_format', True),
+            localize_images=data.get('localize_images', False),
+            backfill=int(data.get('backfill', 0))
+        )
+        return jsonify({
+            'success': True,
+            'feed': feed
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/feeds/poll', methods=['POST'])
+def poll_feeds():
+    """立即轮询全部订阅（后台任务），结果通过 /api/status/<job_id> 查询"""
+    if not github_service or not markdown_generator:
+        return jsonify({
+            'success': False,
+            'error': 'GitHub服务未配置'
+        }), 500
+    
+    job_id = str(uuid.uuid4())
+    jobs[job_id] = {
+        'id': job_id,
+        'status': 'processing',
+        'created_at': datetime.now().isoformat(),
+        'message': '正在轮询订阅...',
+        'progress': 0
+    }
+    
+    def run():
+        try:
+            with usage_scope(PRIORITY_BATCH) as usage:
+                report = feed_poller.poll_all()
+            jobs[job_id]['usage'] = usage.to_dict()
+            jobs[job_id]['status'] = 'completed'
+            jobs[job_id]['progress'] = 100
+            jobs[job_id]['message'] = (f"发布 {len(report['published'])} 篇，失败 {len(report['failed'])} 篇，"
+                                       f"跳过 {len(report['skipped'])} 篇")
+            jobs[job_id]['result'] = report
+        except Exception as e:
+            _fail_job(job_id, e)
+    
+    threading.Thread(target=run, daemon=True).start()
+    return jsonify({
+        'success': True,
+        'message': '已开始轮询',
+        'job_id': job_id
+    })
+
+
 @app.route('/api/status/<job_id>', methods=['GET'])
 def get_job_status(job_id):
     """获取任务状态"""
@@ -390,7 +1311,7 @@ def get_config():
         'config': {
             'default_target_dir': 'content/posts',
             'supported_formats': ['md', 'markdown'],
-            'max_content_size': 50 * 1024 * 1024
+            'max_content_size': MAX_CONTENT_SIZE
         }
     })
 
@@ -401,15 +1322,18 @@ def list_files():
     try:
         path = request.args.get('path', 'content/posts')
         fetch_metadata = request.args.get('fetch_metadata', 'false').lower() == 'true'
-        result = github_service.list_files(path, fetch_metadata=fetch_metadata)
+        if async_engine is not None and async_engine.github is not None:
+            result = async_engine.run(async_engine.github.list_files(path, fetch_metadata=fetch_metadata))
+        else:
+            result = github_service.list_files(path, fetch_metadata=fetch_metadata)
         
         if result['success']:
             files = [f for f in result.get('files', []) if f['name'].endswith(('.md', '.markdown'))]
-            return jsonify({
+            return _etag_response({
                 'success': True,
                 'path': path,
                 'files': files
-            })
+            }, _listing_version(path, fetch_metadata, files))
         else:
             return jsonify({
                 'success': False,
@@ -423,10 +1347,52 @@ def list_files():
         }), 500
 
 
-@app.route('/api/file', methods=['GET', 'DELETE'])
+def _listing_version(path, fetch_metadata, files):
+    """
+    文件列表的版本号：目录下每个文件的路径和 blob SHA 决定列表内容
+    """
+    digest = hashlib.sha1(f'{path}|{fetch_metadata}'.encode('utf-8'))
+    for f in files:
+        digest.update(f"\n{f['path']}|{f.get('sha', '')}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _etag_response(payload, etag):
+    """
+    返回带强 ETag 的 JSON 响应；请求的 If-None-Match 与之相同时返回 304
+    """
+    matched = _matching_etag(etag)
+    if matched:
+        # 304 沿用客户端缓存的那个 ETag（可能带编码后缀）
+        response = Response(status=304)
+        response.set_etag(matched)
+    else:
+        response = jsonify(payload)
+        response.set_etag(etag)
+    return response
+
+
+def _matching_etag(etag):
+    if request.if_none_match.star_tag:
+        return etag
+    # 压缩后的响应 ETag 带有编码后缀，比较时去掉
+    for tag in request.if_none_match.as_set():
+        if re.sub(r'-(gzip|br)$', '', tag) == etag:
+            return tag
+    return None
+
+
+# PATCH /api/file 允许修改的 front matter 字段
+PATCHABLE_FIELDS = {'title', 'date', 'lastmod', 'draft', 'tags', 'categories', 'description'}
+
+
+@app.route('/api/file', methods=['GET', 'DELETE', 'PATCH'])
 def get_file():
-    """获取或删除文件内容"""
+    """获取、删除文件，或只修改文件的 front matter 字段"""
     try:
+        if request.method == 'PATCH':
+            return _patch_front_matter(request.json or {})
+        
         if request.method == 'DELETE':
             path = request.args.get('path', '')
             if not path:
@@ -448,8 +1414,99 @@ def get_file():
                     'error': '缺少文件路径'
                 }), 400
             
+            if async_engine is not None and async_engine.github is not None:
+                result = async_engine.run(async_engine.github.get_file_content(path))
+            else:
+                result = github_service.get_file_content(path)
+            if result.get('success') and result.get('sha'):
+                # 文件内容由 blob SHA 唯一确定，直接作为强 ETag
+                return _etag_response(result, result['sha'])
+            return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _patch_front_matter(data):
+    """
+    PATCH /api/file
+    
+    请求参数:
+    {
+        "path": "content/posts/xxx.md",
+        "fields": {"tags": [...], "draft": false, "date": "..."},
+        "sha": "文件当前的 sha"（可选，提供时若文件已被他人修改则更新失败）
+    }
+    
+    字段值与当前内容相同时不产生提交；有变化时同时更新 lastmod。
+    """
+    path = data.get('path', '').strip('/')
+    fields = data.get('fields') or {}
+    if not path or not fields:
+        return jsonify({
+            'success': False,
+            'error': '缺少文件路径或字段'
+        }), 400
+    
+    unknown = set(fields) - PATCHABLE_FIELDS
+    if unknown:
+        return jsonify({
+            'success': False,
+            'error': f'不支持修改的字段：{", ".join(sorted(unknown))}'
+        }), 400
+    
+    current = github_service.get_file_content(path)
+    if not current['success']:
+        return jsonify(current), 404 if current.get('error') == '文件不存在' else 500
+    
+    updated = markdown_generator.update_front_matter(current['content'], fields)
+    if updated == current['content']:
+        return jsonify({
+            'success': True,
+            'unchanged': True,
+            'file_path': path,
+            'sha': current['sha']
+        })
+    
+    if 'lastmod' not in fields:
+        updated = markdown_generator.update_front_matter(updated, {
+            'lastmod': datetime.now(timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00')
+        })
+    
+    target_dir, filename = path.rsplit('/', 1) if '/' in path else ('', path)
+    result = github_service.upload_file(
+        content=updated,
+        filename=filename,
+        target_dir=target_dir,
+        message=f'Update front matter: {path}',
+        known_sha=data.get('sha') or current['sha']
+    )
+    return jsonify(result), 200 if result['success'] else 500
+
+
+@app.route('/api/render', methods=['GET'])
+def render_file():
+    """获取文件渲染后的 HTML 和目录（按 blob SHA 缓存）"""
+    try:
+        path = request.args.get('path', '')
+        if not path:
+            return jsonify({
+                'success': False,
+                'error': '缺少文件路径'
+            }), 400
+        
+        if async_engine is not None and async_engine.github is not None:
+            result = async_engine.run(async_engine.github.get_file_content(path))
+        else:
             result = github_service.get_file_content(path)
+        if not result.get('success'):
             return jsonify(result)
+        
+        rendered = markdown_renderer.render(result['content'], result.get('sha'))
+        return _etag_response(dict(rendered, success=True, path=path, sha=result.get('sha', '')), result.get('sha'))
     
     except Exception as e:
         return jsonify({
@@ -498,6 +1555,10 @@ def upload_image():
     请求参数 (multipart/form-data):
         - file: 图片文件
         - custom_name: 自定义文件名（可选）
+        - srcset: 为 true 时同时生成较小尺寸的版本（可选）
+    
+    图片会去除元数据、限制宽度并转换为 WebP/AVIF；未指定文件名时按内容哈希命名，
+    仓库中已有同一张图片时直接返回地址，不再提交。
     """
     try:
         if 'file' not in request.files:
@@ -525,37 +1586,89 @@ def upload_image():
                 'error': '不支持的文件格式'
             }), 400
         
+        if not github_service:
+            return jsonify({
+                'success': False,
+                'error': 'GitHub服务未配置'
+            }), 500
+        
         import base64
-        image_content = file.read()
-        encoded_content = base64.b64encode(image_content).decode('utf-8')
+        stream = file.stream
+        original_size = stream.seek(0, os.SEEK_END)
+        stream.seek(0)
+        out_ext = image_processor.output_extension(ext)
+        key = image_processor.content_key(stream)
         
         if custom_name:
             safe_name = custom_name.strip()
-            if not safe_name.lower().endswith(f'.{ext}'):
-                safe_name = f'{safe_name}.{ext}'
+            if safe_name.lower().endswith(f'.{ext}'):
+                safe_name = safe_name[:-len(ext) - 1]
+            safe_name = f'{safe_name}.{out_ext}'
         else:
-            timestamp = int(time.time())
-            safe_name = f'{timestamp}-{filename}'
+            # 按内容命名，重复上传同一张图片不会产生新文件
+            safe_name = f'{key}.{out_ext}'
         
         safe_name = safe_name.replace(' ', '-').replace('_', '-')
         safe_name = ''.join(c for c in safe_name if c.isalnum() or c in '.-_-')
+        base_name = safe_name.rsplit('.', 1)[0]
+        want_srcset = request.form.get('srcset', '').lower() == 'true'
         
-        result = github_service.upload_file(
-            content=encoded_content,
-            filename=safe_name,
-            target_dir='static/images',
-            message=f'Upload image: {safe_name}',
-            is_binary=True
-        )
+        if not custom_name and not want_srcset and github_service.file_exists(f'static/images/{safe_name}'):
+            return jsonify({
+                'success': True,
+                'message': '图片已存在',
+                'url': f'/images/{safe_name}',
+                'filename': safe_name,
+                'existing': True
+            })
+        
+        if image_processor.transforms(ext):
+            # 解码和编码大图片在进程池中执行，不占用 Web 进程的 GIL
+            processed = cpu_pool.run(image_processor.process, stream, ext, want_srcset)
+        else:
+            processed = image_processor.process(stream, ext, srcset=want_srcset)
+        data = processed['data']
+        body = io.BytesIO(data) if isinstance(data, bytes) else data
+        size = body.seek(0, os.SEEK_END)
+        body.seek(0)
+        
+        def image_url(width=None):
+            return f'/images/{base_name}-{width}.{out_ext}' if width else f'/images/{safe_name}'
+        
+        if processed['variants']:
+            files = [{
+                'path': f'static{image_url(variant["width"])}',
+                'content': base64.b64encode(variant['data']).decode('utf-8'),
+                'is_binary': True
+            } for variant in processed['variants']]
+            files.append({
+                'path': f'static{image_url()}',
+                'content': base64.b64encode(body.read()).decode('utf-8'),
+                'is_binary': True
+            })
+            result = github_service.upload_files(files, message=f'Upload image: {safe_name}')
+        else:
+            result = github_service.upload_stream(
+                body,
+                filename=safe_name,
+                target_dir='static/images',
+                message=f'Upload image: {safe_name}'
+            )
         
         if result['success']:
-            image_url = f'/images/{safe_name}'
-            return jsonify({
+            response = {
                 'success': True,
                 'message': '图片上传成功',
-                'url': image_url,
-                'filename': safe_name
-            })
+                'url': image_url(),
+                'filename': safe_name,
+                'size': size,
+                'original_size': original_size
+            }
+            if processed['width']:
+                response['width'] = processed['width']
+            if processed['variants']:
+                response['srcset'] = image_processor.srcset(image_url, processed['width'], processed['variants'])
+            return jsonify(response)
         else:
             return jsonify({
                 'success': False,
@@ -569,6 +1682,55 @@ def upload_image():
         }), 500
 
 
+
+@app.before_request
+def check_content_length():
+    """在路由读取请求体之前拒绝超限请求，避免被路由内的异常处理吞掉"""
+    if request.content_length is not None and request.content_length > MAX_CONTENT_SIZE:
+        return request_too_large(None)
+
+
+@app.after_request
+def finalize_response(response):
+    """按接口设置 Cache-Control，并压缩较大的 JSON 响应"""
+    cache_control = CACHE_CONTROL.get(request.endpoint)
+    if cache_control and request.method == 'GET' and 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = cache_control
+
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding, body = 'br', brotli.compress(data, quality=5)
+    elif accepted['gzip']:
+        encoding, body = 'gzip', gzip.compress(data, compresslevel=6)
+    else:
+        return response
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    # 同一内容的不同编码使用不同的强 ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    """请求体超过 MAX_CONTENT_SIZE"""
+    return jsonify({
+        'success': False,
+        'error': f'请求内容超过 {MAX_CONTENT_SIZE // (1024 * 1024)}MB 上限'
+    }), 413
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
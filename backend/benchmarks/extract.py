@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+正文提取基准：在固定的测试页面上，对比旧的 BeautifulSoup 多次查找 + 序列化后 markdownify 的做法
+与当前 _scan_document 单次遍历打分的做法，统计耗时并检查是否选中了正文
+
+用法: python -m backend.benchmarks.extract [--runs 5] [--json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import statistics
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 页面名称 → 正文段落数（约 65 KB、300 KB、1.3 MB）
+FIXTURES = (('small', 180), ('medium', 1450), ('large', 6700))
+
+BODY_MARKER = 'BODY-MARKER'
+SIDEBAR_MARKER = 'SIDEBAR-MARKER'
+
+PARAGRAPH = ('<p>{marker} 第 {i} 段：解析网页时需要在导航、侧栏和评论之间找到真正的正文，'
+             'The quick brown fox jumps over the lazy dog. <a href="/ref/{i}">参考 {i}</a></p>\n')
+
+
+def build_page(paragraphs: int) -> str:
+    """
+    生成测试页面：导航、含 500 个链接的侧栏（class 含 content）、没有 <article> 包裹的正文、页脚
+    """
+    parts = ['<html><head><title>Extract benchmark</title><script>var x = 1;</script></head><body>',
+             '<nav>' + ''.join(f'<a href="/c/{i}">栏目 {i}</a>' for i in range(30)) + '</nav>',
+             '<aside class="sidebar-content"><ul>']
+    parts.extend(f'<li><a href="/tag/{i}">{SIDEBAR_MARKER} 热门标签 {i}</a></li>' for i in range(500))
+    parts.append('</ul></aside><div class="post-body"><h1>Extract benchmark</h1>')
+    for i in range(paragraphs):
+        if i % 20 == 0:
+            parts.append(f'<h2>第 {i // 20} 节</h2>\n')
+        if i % 50 == 25:
+            parts.append(f'<p><img data-src="https://example.com/{i}.png" src="data:,"></p>\n')
+        parts.append(PARAGRAPH.format(marker=BODY_MARKER, i=i))
+    parts.append('</div><footer>footer</footer></body></html>')
+    return ''.join(parts)
+
+
+def legacy_parse(html: str) -> Optional[Dict[str, str]]:
+    """
+    改为单次遍历打分之前的提取流程：html.parser 解析，逐个 find 查找正文容器，序列化后再交给 markdownify 解析一次
+    """
+    from bs4 import BeautifulSoup
+    from markdownify import markdownify as md
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "iframe", "noscript"]):
+        script.decompose()
+
+    title = ""
+    if soup.title:
+        title = soup.title.string
+    h1 = soup.find('h1')
+    if h1:
+        title = h1.get_text().strip()
+
+    article = soup.find(id='js_content')
+    if not article:
+        article = soup.find(class_='rich_media_content')
+    if not article:
+        article = soup.find('article')
+    if not article:
+        article = soup.find('main')
+    if not article:
+        for cls in ['post-content', 'article-content', 'entry-content', 'content', 'main']:
+            article = soup.find(class_=re.compile(cls, re.I))
+            if article:
+                break
+    if not article:
+        article = soup.body
+    if not article:
+        return None
+
+    for img in article.find_all('img'):
+        if img.get('data-src'):
+            img['src'] = img['data-src']
+
+    text = md(str(article), heading_style="ATX", strip=['script', 'style'])
+    return {'title': title.strip() if title else "", 'content': text.strip()}
+
+
+def _check(result: Optional[Dict[str, str]], paragraphs: int) -> Dict[str, Any]:
+    content = (result or {}).get('content', '')
+    return {
+        'body_paragraphs': content.count(BODY_MARKER),
+        'sidebar_links': content.count(SIDEBAR_MARKER),
+        'correct': content.count(BODY_MARKER) == paragraphs and SIDEBAR_MARKER not in content
+    }
+
+
+def measure(func, page: str, runs: int) -> Dict[str, Any]:
+    """
+    执行 runs 次 func(page)
+
+    返回:
+        {'median_ms', 'min_ms', 'result'}
+    """
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(page)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(timings), 2), 'min_ms': round(min(timings), 2), 'result': result}
+
+
+def benchmark(runs: int = 5) -> Dict[str, Any]:
+    sys.path.insert(0, ROOT)
+    from backend.utils.web_scraper import HTML_PARSER, parse_article_html
+
+    report = {'parser': HTML_PARSER, 'runs': runs, 'pages': []}
+    for name, paragraphs in FIXTURES:
+        page = build_page(paragraphs)
+        row = {'page': name, 'kb': round(len(page.encode('utf-8')) / 1024)}
+        for label, func in (('legacy', legacy_parse), ('scan', parse_article_html)):
+            timing = measure(func, page, runs)
+            row[label] = {'median_ms': timing['median_ms'], 'min_ms': timing['min_ms'],
+                          **_check(timing.pop('result'), paragraphs)}
+        row['speedup'] = round(row['legacy']['median_ms'] / row['scan']['median_ms'], 2)
+        report['pages'].append(row)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='对比旧的多次查找提取与单次遍历打分提取')
+    parser.add_argument('--runs', type=int, default=5, help='每个页面每种做法的执行次数')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.runs)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"当前解析器 {report['parser']}，每项执行 {report['runs']} 次，取中位数")
+        print(f"{'页面':>8} {'KB':>6} {'旧 ms':>9} {'新 ms':>9} {'加速':>6} {'旧正文':>6} {'新正文':>6}")
+        for row in report['pages']:
+            legacy, scan = row['legacy'], row['scan']
+            print(f"{row['page']:>8} {row['kb']:>6} {legacy['median_ms']:>9.2f} {scan['median_ms']:>9.2f} "
+                  f"{row['speedup']:>6.2f} {'正确' if legacy['correct'] else '错误':>6} "
+                  f"{'正确' if scan['correct'] else '错误':>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
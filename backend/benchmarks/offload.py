@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程池基准：后台线程不断解析大网页时，测量 /api/health 的响应延迟，对比进程池关闭和开启两种情况
+
+用法: python -m backend.benchmarks.offload [--page-kb 2048] [--parsers 2] [--requests 200] [--json]
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import threading
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PARAGRAPH = ('<p>在服务端解析网页时，BeautifulSoup 和 markdownify 全程持有 GIL，'
+             '同一进程中的其他请求只能等待。<a href="https://example.com/{i}">相关链接 {i}</a>'
+             ' The quick brown fox jumps over the lazy dog, again and again, paragraph {i}.</p>\n')
+
+
+def build_page(size_kb: int) -> str:
+    """
+    生成一个约 size_kb KB 的文章页面
+    """
+    parts = ['<html><head><title>Offload benchmark</title></head><body>',
+             '<nav><a href="/">首页</a></nav><article><h1>Offload benchmark</h1>']
+    size = 0
+    i = 0
+    while size < size_kb * 1024:
+        chunk = PARAGRAPH.format(i=i)
+        if i % 20 == 0:
+            chunk = f'<h2>第 {i // 20} 节</h2>\n' + chunk
+        parts.append(chunk)
+        size += len(chunk.encode('utf-8'))
+        i += 1
+    parts.append('</article><footer>footer</footer></body></html>')
+    return ''.join(parts)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def measure(app, page: str, parsers: int, requests: int) -> Dict[str, Any]:
+    """
+    parsers 个线程循环解析 page 的同时，依次发送 requests 个 /api/health 请求
+
+    返回:
+        {'p50_ms', 'p95_ms', 'max_ms', 'pages_parsed'}
+    """
+    from backend.utils.web_scraper import extract_article
+
+    stop = threading.Event()
+    parsed = [0]
+
+    def parse_loop():
+        while not stop.is_set():
+            extract_article(page)
+            parsed[0] += 1
+
+    threads = [threading.Thread(target=parse_loop, daemon=True) for _ in range(parsers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+
+    client = app.test_client()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get('/api/health')
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.005)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'max_ms': round(max(latencies), 2),
+        'pages_parsed': parsed[0]
+    }
+
+
+def benchmark(page_kb: int = 2048, parsers: int = 2, requests: int = 200, workers: int = 2) -> Dict[str, Any]:
+    sys.path.insert(0, ROOT)
+    from backend.app import app
+    from backend.utils.cpu_pool import cpu_pool
+    from backend.utils.web_scraper import parse_article_html
+
+    page = build_page(page_kb)
+    parse_article_html(page)  # 预热导入
+
+    client = app.test_client()
+    idle = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get('/api/health')
+        idle.append((time.perf_counter() - start) * 1000)
+
+    report = {
+        'page_kb': page_kb,
+        'parsers': parsers,
+        'idle_p50_ms': round(statistics.median(idle), 2),
+        'idle_p95_ms': round(_percentile(idle, 0.95), 2)
+    }
+
+    cpu_pool.workers = 0
+    report['in_thread'] = measure(app, page, parsers, requests)
+
+    cpu_pool.workers = workers
+    cpu_pool.run(parse_article_html, page)  # 启动子进程
+    report['pool'] = measure(app, page, parsers, requests)
+    cpu_pool.shutdown()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='测量大网页解析对 API 延迟的影响')
+    parser.add_argument('--page-kb', type=int, default=2048)
+    parser.add_argument('--parsers', type=int, default=2, help='同时解析网页的线程数')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=2, help='进程池子进程数')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.page_kb, args.parsers, args.requests, args.workers)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"页面 {report['page_kb']} KB，{report['parsers']} 个线程持续解析")
+        print(f"{'':>10} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'解析页数':>8}")
+        print(f"{'空闲':>10} {report['idle_p50_ms']:>9.2f} {report['idle_p95_ms']:>9.2f}")
+        for label, key in (('当前线程', 'in_thread'), ('进程池', 'pool')):
+            r = report[key]
+            print(f"{label:>10} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['max_ms']:>9.2f} {r['pages_parsed']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动基准：在全新进程中导入 Vercel 入口 api/index.py 并处理第一个请求，统计每个模块的导入耗时
+
+用法: python -m backend.benchmarks.startup [--runs 5] [--top 25] [--json] [--budget-ms 400]
+"""
+
+import os
+import re
+import sys
+import json
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 子进程中执行：导入入口模块，再请求一次 /api/health
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import api.index
+imported = time.perf_counter()
+api.index.app.test_client().get('/api/health')
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_request_ms': (done - imported) * 1000}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+OWN_PREFIXES = ('backend', 'api')
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, Any]]:
+    """
+    解析 -X importtime 的输出
+
+    返回:
+        {模块名: {'self_ms', 'cumulative_ms', 'parent'}}，parent 为首次导入该模块的模块
+    """
+    modules = {}
+    pending = []  # (缩进, 模块名)，子模块先于父模块输出
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        depth = len(match.group(3))
+        name = match.group(4)
+        while pending and pending[-1][0] > depth:
+            _, child = pending.pop()
+            modules[child]['parent'] = name
+        modules[name] = {
+            'self_ms': int(match.group(1)) / 1000,
+            'cumulative_ms': int(match.group(2)) / 1000,
+            'parent': None
+        }
+        pending.append((depth, name))
+    return modules
+
+
+def _is_own(name: Optional[str]) -> bool:
+    return bool(name) and name.split('.')[0] in OWN_PREFIXES
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['modules'] = parse_importtime(completed.stderr)
+    return timings
+
+
+def benchmark(runs: int = 5, top: int = 25, serverless: bool = True) -> Dict[str, Any]:
+    """
+    多次测量取中位数
+
+    只统计本项目的模块和它们直接导入的第三方模块，第三方模块内部的依赖计入其累计耗时
+
+    返回:
+        {'runs', 'import_ms', 'first_request_ms', 'modules': [{'name', 'cumulative_ms', 'self_ms', 'imported_by'}]}
+    """
+    env = dict(os.environ)
+    if serverless:
+        env['SERVERLESS'] = '1'
+    results = [run_once(env) for _ in range(runs)]
+
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        for name, info in result['modules'].items():
+            if _is_own(name) or _is_own(info['parent']):
+                samples.setdefault(name, []).append(info)
+
+    modules = [
+        {
+            'name': name,
+            'cumulative_ms': round(statistics.median(i['cumulative_ms'] for i in infos), 2),
+            'self_ms': round(statistics.median(i['self_ms'] for i in infos), 2),
+            'imported_by': infos[0]['parent'] or ''
+        }
+        for name, infos in samples.items()
+    ]
+    modules.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+
+    return {
+        'runs': runs,
+        'import_ms': round(statistics.median(r['import_ms'] for r in results), 1),
+        'first_request_ms': round(statistics.median(r['first_request_ms'] for r in results), 1),
+        'modules': modules[:top]
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='测量 api/index.py 的冷启动耗时')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=25, help='列出累计耗时最高的模块数')
+    parser.add_argument('--json', action='store_true', help='输出 JSON，便于保存和对比')
+    parser.add_argument('--budget-ms', type=float, default=0, help='导入耗时中位数超过该值时返回非零')
+    parser.add_argument('--server', action='store_true', help='按常驻进程模式导入（不设置 SERVERLESS）')
+    args = parser.parse_args(argv)
+
+    report = benchmark(args.runs, args.top, serverless=not args.server)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"导入 api.index: {report['import_ms']} ms   首个请求: {report['first_request_ms']} ms   "
+              f"（{report['runs']} 次取中位数）")
+        print(f"{'累计 ms':>9} {'自身 ms':>9}  模块（导入方）")
+        for m in report['modules']:
+            print(f"{m['cumulative_ms']:>9.2f} {m['self_ms']:>9.2f}  {m['name']}"
+                  + (f"  ({m['imported_by']})" if m['imported_by'] else ''))
+
+    if args.budget_ms and report['import_ms'] > args.budget_ms:
+        print(f"导入耗时 {report['import_ms']} ms 超过预算 {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步 I/O 引擎：GitHub、DeepSeek 和网页抓取的异步客户端，以及基于 asyncio 的发布任务执行器
+
+所有协程运行在同一个后台事件循环线程中；同步的 Flask 路由通过 AsyncRunner.run 等待结果。
+"""
+
+import json
+import time
+import base64
+import asyncio
+import threading
+import traceback
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .deepseek import DeepSeekService, ApiRequest, StreamCollector, estimate_tokens, split_markdown_chunks, \
+    current_priority
+from .github import git_blob_sha
+from .commit_coalescer import files_ops, files_result
+from .image_localizer import ImageLocalizer, DOWNLOAD_HEADERS, find_image_urls
+from ..utils import placeholders
+from ..utils.page_cache import page_cache
+from ..utils.cpu_pool import cpu_pool
+from ..utils.web_scraper import REQUEST_HEADERS, CHUNK_SIZE, BodyReader, check_content_type, decode_html, \
+    extract_article
+
+
+class AsyncRunner:
+    """
+    在守护线程中运行事件循环（首次使用时才启动）
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-engine', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def submit(self, coro: Awaitable):
+        """
+        把协程提交到事件循环，返回 concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        同步等待协程结果，供 Flask 路由调用（不能在事件循环线程内调用）
+        """
+        return self.submit(coro).result(timeout)
+
+
+class AsyncDeepSeekClient:
+    """
+    DeepSeek 异步客户端
+
+    复用 DeepSeekService 的配置、提示词、限流器和熔断器，只把网络调用换成 httpx；
+    max_concurrency 限制整个进程同时在途的请求数。
+    """
+
+    def __init__(self, service: DeepSeekService, max_concurrency: int = 16):
+        self.service = service
+        self.max_concurrency = max(1, max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _session(self) -> httpx.AsyncClient:
+        # 客户端和信号量必须在事件循环线程中创建
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.service.base_url,
+                timeout=httpx.Timeout(self.service.timeout, connect=10),
+                limits=httpx.Limits(max_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def call_api(self, messages: List[dict], temperature: float = 0.7,
+                       on_delta: Optional[Callable[[str], None]] = None, max_tokens: int = 4096) -> str:
+        """
+        调用DeepSeek API，重试、限流和熔断规则与同步版本一致
+        """
+        service = self.service
+        breaker = service.circuit_breaker
+        client = self._session()
+        headers = service._headers()
+        payload = service._payload(messages, temperature, max_tokens)
+        priority = current_priority()
+        estimated_tokens = service._estimate_call_tokens(messages, max_tokens)
+
+        for attempt in range(service.max_retries + 1):
+            breaker.check()
+            row_id = None
+            try:
+                row_id = await service.rate_limiter.acquire_async(estimated_tokens, priority=priority)
+                async with self._semaphore:
+                    started = time.monotonic()
+                    if on_delta is not None:
+                        content, usage = await self._call_api_stream(client, headers, payload, on_delta)
+                    else:
+                        response = await client.post('/chat/completions', headers=headers, json=payload)
+                        response.raise_for_status()
+                        result = await cpu_pool.run_async(json.loads, response.content)
+                        content = result['choices'][0]['message']['content']
+                        usage = result.get('usage')
+                    latency = time.monotonic() - started
+            except httpx.HTTPStatusError as e:
+                self._settle_failed(row_id)
+                status = e.response.status_code
+                if status == 429 and attempt < service.max_retries:
+                    breaker.release()
+                    delay = service._retry_after(e.response, attempt)
+                    print(f"DeepSeek rate limited (429), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                if 400 <= status < 500 and status != 429:
+                    breaker.release()
+                else:
+                    breaker.record_failure(str(e))
+                raise
+            except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+                self._settle_failed(row_id)
+                breaker.record_failure(str(e))
+                raise
+            except BaseException:
+                # 限流等待超时或任务被取消：不计入失败，但要释放半开探测名额
+                self._settle_failed(row_id)
+                breaker.release()
+                raise
+
+            breaker.record_success(latency, count_slow=on_delta is None)
+            # 写入限流状态（SQLite）放到线程池，复制上下文以计入当前任务的用量统计
+            await asyncio.get_running_loop().run_in_executor(
+                None, contextvars.copy_context().run, service._record_usage, row_id, usage
+            )
+            return content
+
+    def _settle_failed(self, row_id: Optional[int]):
+        # 失败路径上不等待结清完成，也不在事件循环中执行 SQLite 写入
+        if row_id is not None:
+            asyncio.get_running_loop().run_in_executor(None, self.service._settle_failed, row_id)
+
+    async def _call_api_stream(self, client: httpx.AsyncClient, headers: dict, payload: dict,
+                               on_delta: Callable[[str], None]):
+        payload = dict(payload, stream=True, stream_options={'include_usage': True})
+        collector = StreamCollector(on_delta)
+        async with client.stream('POST', '/chat/completions', headers=headers, json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if collector.feed(line):
+                    break
+        return collector.content, collector.usage
+
+    async def execute(self, request: ApiRequest, on_delta: Optional[Callable[[str], None]] = None) -> Any:
+        response = await self.call_api(request.messages, temperature=request.temperature,
+                                       on_delta=on_delta, max_tokens=request.max_tokens)
+        return request.parse(response)
+
+    async def format_article(self, content: str, title: str = '', tags: List[str] = None, category: str = '',
+                             progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """
+        DeepSeekService.format_article 的异步版本
+        """
+        if not content or content.strip() == '':
+            raise ValueError('文章内容不能为空')
+
+        service = self.service
+        compacted, mapping, callback = service._compact_for_format(content, progress_callback)
+
+        if estimate_tokens(compacted) > service.long_document_tokens:
+            result = await self._format_long_article(compacted, title, tags or [], category, callback)
+        else:
+            result = await self._format_single(compacted, title, tags or [], category, callback)
+
+        return service._restore_format(result, mapping, compacted)
+
+    async def _format_single(self, content: str, title: str, tags: List[str], category: str,
+                             progress_callback: Optional[Callable[[float, str], None]]) -> Dict[str, Any]:
+        service = self.service
+        request = service._format_request(content, title, tags, category)
+        try:
+            return await self.execute(request, on_delta=service._progress_handler(content, progress_callback))
+        except Exception as e:
+            print(f"Error calling DeepSeek for format: {e}")
+            return service._format_fallback(content, title, tags, category)
+
+    async def _format_long_article(self, content: str, title: str, tags: List[str], category: str,
+                                   progress_callback: Optional[Callable[[float, str], None]]) -> Dict[str, Any]:
+        service = self.service
+        chunks = split_markdown_chunks(content, service.chunk_tokens)
+        print(f"DEBUG: Long document mode, {len(chunks)} chunks")
+
+        results: List[Optional[str]] = [None] * len(chunks)
+        metadata_task = asyncio.ensure_future(
+            self.execute(service._metadata_request(service._build_summary(content), title, tags, category))
+        )
+
+        async def format_chunk(index: int):
+            try:
+                results[index] = await self.execute(service._chunk_request(chunks[index])) or chunks[index]
+            except Exception as e:
+                print(f"Error formatting chunk {index}: {e}")
+                results[index] = service.local_formatter.format(chunks[index])
+
+        done = 0
+        for finished in asyncio.as_completed([format_chunk(i) for i in range(len(chunks))]):
+            await finished
+            done += 1
+            if progress_callback is not None:
+                progress_callback(done / len(chunks), service._completed_prefix(results))
+
+        try:
+            analyzed = await metadata_task
+        except Exception as e:
+            print(f"Error analyzing metadata: {e}")
+            analyzed = None
+
+        return service._merge_long_article(results, analyzed, title, tags, category)
+
+    async def analyze_metadata(self, content: str, title: str = '', tags: List[str] = None,
+                               category: str = '') -> Dict[str, Any]:
+        service = self.service
+        try:
+            return await self.execute(
+                service._metadata_request(service._build_summary(content), title, tags or [], category)
+            )
+        except Exception as e:
+            print(f"Error calling DeepSeek for metadata: {e}")
+            return {
+                'title': title,
+                'category': category,
+                'tags': tags or []
+            }
+
+    async def enrich_article(self, content: str, title: str = '', tags: List[str] = None,
+                             timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        并发生成标题、标签和摘要，超时未完成的调用直接取消
+        """
+        if not content or content.strip() == '':
+            raise ValueError('文章内容不能为空')
+
+        service = self.service
+        timeout = service.enrich_timeout if timeout is None else timeout
+        source = service._enrich_source(content)
+
+        tasks = {
+            'title': asyncio.ensure_future(self.execute(service._title_request(source, title))),
+            'tags': asyncio.ensure_future(self.execute(service._tags_request(source, tags or []))),
+            'description': asyncio.ensure_future(self.execute(service._summary_request(source)))
+        }
+        done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+        outcomes = {}
+        for field, task in tasks.items():
+            if task not in done:
+                outcomes[field] = TimeoutError()
+            else:
+                outcomes[field] = task.exception() or task.result()
+
+        return service._collect_enrichment(outcomes)
+
+    async def translate_article(self, content: str, title: str, languages: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        DeepSeekService.translate_article 的异步版本：所有语言、所有片段同时发出
+        """
+        service = self.service
+        compacted, mapping = placeholders.compact(content)
+        chunks = split_markdown_chunks(compacted, service.chunk_tokens) or [compacted]
+
+        async def translate(lang: str) -> Dict[str, Any]:
+            target = service.LANGUAGE_NAMES.get(lang, lang)
+            calls = [self.execute(service._translate_request(chunk, target)) for chunk in chunks]
+            if title:
+                calls.append(self.execute(service._translate_title_request(title, target)))
+            try:
+                outputs = await asyncio.gather(*calls)
+                translated_title = outputs[len(chunks)] if title else ''
+                return service._translation_result(outputs[:len(chunks)], translated_title, title,
+                                                   mapping, compacted)
+            except Exception as e:
+                return service._translation_error(lang, e)
+
+        results = await asyncio.gather(*[translate(lang) for lang in languages])
+        return dict(zip(languages, results))
+
+
+class ThreadedDeepSeekClient:
+    """
+    把同步服务（如未配置密钥时的本地排版服务）包装成与 AsyncDeepSeekClient 相同的协程接口
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def __getattr__(self, name: str):
+        method = getattr(self.service, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+class AsyncGitHubClient:
+    """
+    GitHub 异步客户端，返回值与 GitHubService 相同
+
+    max_concurrency 限制同时在途的 GitHub 请求数。service 为 CoalescingGitHubService 时，
+    写入与同步路径进入同一个 CommitCoalescer，两条路径不会在同一分支上互相竞争。
+    """
+
+    def __init__(self, service, max_concurrency: int = 10):
+        self.service = service
+        self.coalescer = getattr(service, 'coalescer', None)
+        self.max_concurrency = max(1, max_concurrency)
+        self.repo_url = f'{service.base_url}/repos/{service.username}/{service.repo}'
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _request(self, method: str, url: str, timeout: float = 10, **kwargs) -> httpx.Response:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.service.headers,
+                limits=httpx.Limits(max_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self._client.request(method, url, timeout=timeout, **kwargs)
+
+    async def _get_file_sha(self, path: str) -> Optional[str]:
+        try:
+            response = await self._request('GET', f'{self.repo_url}/contents/{path}')
+            if response.status_code == 404:
+                return None
+            response.raise_for_status()
+            return response.json().get('sha')
+        except httpx.HTTPError as e:
+            raise Exception(f'获取文件SHA失败：{str(e)}')
+
+    async def upload_file(self, content: str, filename: str, target_dir: str = 'content/posts',
+                          message: str = 'Update file', branch: str = 'main',
+                          is_binary: bool = False, known_sha: Optional[str] = None) -> Dict[str, Any]:
+        path = f'{target_dir}/{filename}'.lstrip('/')
+        coalescer = self.coalescer
+        if coalescer is not None and branch == coalescer.branch:
+            if not known_sha:
+                op = {'path': path, 'content': content, 'is_binary': is_binary, 'message': message}
+                return (await coalescer.wait_async(coalescer.submit([op])))[0]
+            # 带 known_sha 的写入直接提交，先提交同一路径上排队的操作
+            await asyncio.get_running_loop().run_in_executor(None, coalescer.flush, path)
+
+        try:
+            sha = known_sha or await self._get_file_sha(path)
+            data = base64.b64decode(content) if is_binary else content.encode('utf-8')
+            if sha and sha == git_blob_sha(data):
+                return self.service._unchanged_result(path, sha, branch)
+            payload = {
+                'message': message,
+                'content': content if is_binary else base64.b64encode(data).decode('utf-8'),
+                'branch': branch
+            }
+            if sha:
+                payload['sha'] = sha
+
+            response = await self._request('PUT', f'{self.repo_url}/contents/{path}', timeout=30, json=payload)
+            response.raise_for_status()
+            result = response.json()
+
+            return {
+                'success': True,
+                'file_path': path,
+                'url': result.get('content', {}).get('html_url', ''),
+                'sha': result.get('content', {}).get('sha', '')
+            }
+        except httpx.HTTPError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    async def upload_files(self, files: List[Dict[str, Any]], message: str = 'Update files',
+                           branch: str = 'main') -> Dict[str, Any]:
+        """
+        GitHubService.upload_files 的异步版本，二进制文件的 blob 并发创建
+        """
+        service = self.service
+        coalescer = self.coalescer
+        if coalescer is not None and branch == coalescer.branch:
+            if any(f.get('delete') for f in files):
+                missing = await asyncio.get_running_loop().run_in_executor(None, service.missing_deletions, files)
+                if missing:
+                    return {'success': False, 'error': f'文件不存在：{", ".join(missing)}'}
+            return files_result(await coalescer.wait_async(coalescer.submit(files_ops(files, message))))
+
+        async def tree_entry(f: Dict[str, Any]) -> Dict[str, Any]:
+            entry = {'path': f['path'].lstrip('/'), 'mode': '100644', 'type': 'blob'}
+            if f.get('delete'):
+                entry['sha'] = None
+            elif f.get('is_binary'):
+                response = await self._request('POST', f'{self.repo_url}/git/blobs', timeout=30,
+                                               json={'content': f['content'], 'encoding': 'base64'})
+                response.raise_for_status()
+                entry['sha'] = response.json()['sha']
+            else:
+                entry['content'] = f['content']
+            return entry
+
+        try:
+            response = await self._request('GET', f'{self.repo_url}/git/ref/heads/{branch}')
+            response.raise_for_status()
+            head_sha = response.json()['object']['sha']
+
+            # 读取基准树与创建 blob 互不依赖，同时进行
+            commit_response, *tree = await asyncio.gather(
+                self._request('GET', f'{self.repo_url}/git/commits/{head_sha}'),
+                *[tree_entry(f) for f in files]
+            )
+            commit_response.raise_for_status()
+            base_tree = commit_response.json()['tree']['sha']
+
+            response = await self._request('POST', f'{self.repo_url}/git/trees', timeout=30,
+                                           json={'base_tree': base_tree, 'tree': tree})
+            response.raise_for_status()
+            tree_sha = response.json()['sha']
+
+            uploaded = [
+                {
+                    'file_path': entry['path'],
+                    'url': f'https://github.com/{service.username}/{service.repo}/blob/{branch}/{entry["path"]}'
+                }
+                for entry in tree
+            ]
+            if tree_sha == base_tree:
+                print(f"Skip unchanged commit: {message}")
+                return {'success': True, 'commit_sha': head_sha, 'unchanged': True, 'files': uploaded}
+
+            response = await self._request('POST', f'{self.repo_url}/git/commits', timeout=30,
+                                           json={'message': message, 'tree': tree_sha, 'parents': [head_sha]})
+            response.raise_for_status()
+            commit_sha = response.json()['sha']
+
+            response = await self._request('PATCH', f'{self.repo_url}/git/refs/heads/{branch}', timeout=30,
+                                           json={'sha': commit_sha})
+            response.raise_for_status()
+
+            return {
+                'success': True,
+                'commit_sha': commit_sha,
+                'files': uploaded
+            }
+        except httpx.HTTPError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    async def get_file_content(self, path: str) -> Dict[str, Any]:
+        try:
+            response = await self._request('GET', f'{self.repo_url}/contents/{path}')
+            if response.status_code == 404:
+                return {
+                    'success': False,
+                    'error': '文件不存在'
+                }
+            response.raise_for_status()
+            result = response.json()
+
+            return {
+                'success': True,
+                'content': base64.b64decode(result.get('content', '')).decode('utf-8'),
+                'path': path,
+                'sha': result.get('sha', '')
+            }
+        except httpx.HTTPError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+    async def list_files(self, path: str = '', fetch_metadata: bool = False) -> Dict[str, Any]:
+        """
+        GitHubService.list_files 的异步版本，元数据读取受信号量限制并发
+        """
+        service = self.service
+
+        async def process_file(f: Dict[str, Any]) -> Dict[str, Any]:
+            item = service._file_item(f)
+            if fetch_metadata and service._wants_metadata(item):
+                try:
+                    content_res = await self.get_file_content(item['path'])
+                    if content_res['success']:
+                        item['updated_at'] = service._front_matter_date(content_res['content'])
+                except Exception as e:
+                    print(f"Error fetching metadata for {item['name']}: {e}")
+            return item
+
+        try:
+            response = await self._request('GET', f'{self.repo_url}/contents/{path}')
+            response.raise_for_status()
+            files = response.json()
+            if isinstance(files, dict):
+                files = files.get('children', [])
+
+            return {
+                'success': True,
+                'path': path,
+                'files': list(await asyncio.gather(*[process_file(f) for f in files]))
+            }
+        except httpx.HTTPError as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+
+
+class AsyncPageFetcher:
+    """
+    异步抓取网页正文；HTML 解析是 CPU 密集操作，页面缓存的文件读写也会阻塞，都放到线程池中执行
+    """
+
+    def __init__(self, max_concurrency: int = 20, timeout: float = 10):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def fetch_article_content(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        与 web_scraper.fetch_article_content 相同，返回 {'title', 'content'}，失败返回 None
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=REQUEST_HEADERS, timeout=self.timeout, follow_redirects=True)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        try:
+            entry = await loop.run_in_executor(None, page_cache.lookup, url)
+            if entry and entry['fresh']:
+                cached = await loop.run_in_executor(None, page_cache.extracted, entry, extract_article)
+                if cached is not None:
+                    return cached
+
+            response, html = await self._download(url, page_cache.validators(entry))
+            if response.status_code == 304 and entry:
+                await loop.run_in_executor(None, page_cache.revalidated, entry, response.headers)
+                cached = await loop.run_in_executor(None, page_cache.extracted, entry, extract_article)
+                if cached is not None:
+                    return cached
+                response, html = await self._download(url)
+
+            result = await loop.run_in_executor(None, extract_article, html)
+            await loop.run_in_executor(None, page_cache.store, url, html, result, response.headers)
+            return result
+        except Exception as e:
+            print(f"Error fetching URL {url}: {e}")
+            return None
+
+
+    async def _download(self, url: str, extra_headers: Optional[Dict[str, str]] = None):
+        """
+        与 web_scraper.download_page 相同：流式读取、限制字节数、非 HTML 直接放弃
+        """
+        async with self._semaphore:
+            async with self._client.stream('GET', url, headers=extra_headers or {}) as response:
+                if response.status_code == 304:
+                    return response, None
+                response.raise_for_status()
+                content_type = check_content_type(response.headers)
+
+                reader = BodyReader(url)
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    if not reader.feed(chunk):
+                        break
+        return response, decode_html(reader.body, content_type)
+
+
+class AsyncImageLocalizer:
+    """
+    ImageLocalizer 的异步版本：下载改用 httpx，按域名和总数限制并发，去重和改写逻辑不变
+    """
+
+    def __init__(self, localizer: ImageLocalizer):
+        self.localizer = localizer
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def localize(self, content: str, prefix: str = '/images/') -> Dict[str, Any]:
+        urls = find_image_urls(content)
+        if not urls:
+            return {'content': content, 'images': {}, 'failed': []}
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=DOWNLOAD_HEADERS, timeout=self.localizer.timeout,
+                                             follow_redirects=True)
+            self._semaphore = asyncio.Semaphore(self.localizer.max_workers)
+
+        downloads = await asyncio.gather(*[self._download(url) for url in urls])
+        return self.localizer.collect(content, urls, list(downloads), prefix)
+
+    async def _download(self, url: str):
+        full_url = f'https:{url}' if url.startswith('//') else url
+        host = urlsplit(full_url).hostname or ''
+        slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.localizer.per_host))
+        try:
+            async with self._semaphore, slot:
+                async with self._client.stream('GET', full_url) as response:
+                    response.raise_for_status()
+                    chunks, size = [], 0
+                    async for chunk in response.aiter_bytes(64 * 1024):
+                        size += len(chunk)
+                        if size > self.localizer.max_bytes:
+                            return None, f'超过 {self.localizer.max_bytes} 字节'
+                        chunks.append(chunk)
+            return self.localizer.validate(b''.join(chunks))
+        except httpx.HTTPError as e:
+            return None, str(e)
+
+
+class AsyncJobRunner:
+    """
+    基于 asyncio 的发布任务执行器
+
+    同时运行的任务数受 max_jobs 限制，超出的任务在信号量上等待，不占用线程。
+    """
+
+    def __init__(self, runner: AsyncRunner, handler: Callable[[str, dict], Awaitable], max_jobs: int = 100):
+        self.runner = runner
+        self.handler = handler
+        self.max_jobs = max(1, max_jobs)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """
+        已提交但尚未结束的任务数
+        """
+        return self._pending
+
+    def submit(self, job_id: str, data: dict):
+        with self._lock:
+            self._pending += 1
+        return self.runner.submit(self._run(job_id, data))
+
+    async def _run(self, job_id: str, data: dict):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+        try:
+            async with self._semaphore:
+                await self.handler(job_id, data)
+        except Exception as e:
+            print(f"Async job exception: {e}")
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+class AsyncEngine:
+    """
+    汇总异步客户端；DeepSeek 未配置密钥时退回到线程中运行的本地服务
+    """
+
+    def __init__(self, deepseek_service, github_service, image_localizer: ImageLocalizer,
+                 deepseek_concurrency: int = 16,
+                 github_concurrency: int = 10, fetch_concurrency: int = 20):
+        self.runner = AsyncRunner()
+        if isinstance(deepseek_service, DeepSeekService):
+            self.deepseek = AsyncDeepSeekClient(deepseek_service, deepseek_concurrency)
+        else:
+            self.deepseek = ThreadedDeepSeekClient(deepseek_service)
+        self.github = AsyncGitHubClient(github_service, github_concurrency) if github_service else None
+        self.fetcher = AsyncPageFetcher(fetch_concurrency)
+        self.images = AsyncImageLocalizer(image_localizer)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        return self.runner.run(coro, timeout)
@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量导入：从 zip/tar 压缩包（或目录）中逐篇读取 Markdown，并发排版后分批提交到 GitHub
+
+命令行用法:
+    python -m backend.services.bulk_import posts.zip --target-dir content/posts --format
+"""
+
+import os
+import re
+import json
+import hashlib
+import zipfile
+import tarfile
+import tempfile
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10 及以下
+    tomllib = None
+
+
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+
+# 单篇文章的大小上限，超出的条目记为失败
+MAX_ENTRY_BYTES = 5 * 1024 * 1024
+
+STATUS_COMMITTED = 'committed'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+# 由 wrap_with_front_matter 重新生成的字段；其余字段（slug、aliases、lastmod、images、自定义参数等）原样保留
+GENERATED_KEYS = ('title', 'date', 'tags', 'categories', 'category', 'draft', 'description')
+
+TOP_LEVEL_KEY = re.compile(r'^([^\s#:-][^:]*):(?:\s|$)')
+
+
+def _is_markdown(name: str) -> bool:
+    base = os.path.basename(name)
+    if base.startswith('.') or '__MACOSX' in name.split('/'):
+        return False
+    return name.lower().endswith(MARKDOWN_EXTENSIONS)
+
+
+def _decode(data: bytes) -> str:
+    for encoding in ('utf-8-sig', 'gb18030'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace')
+
+
+def split_front_matter(text: str) -> Tuple[Optional[str], str, str]:
+    """
+    拆分 front matter
+
+    返回:
+        (格式 'yaml' / 'toml'，没有 front matter 时为 None, front matter 原文, 正文)
+    """
+    lines = text.split('\n')
+    delimiter = lines[0].rstrip() if lines else ''
+    if delimiter in ('---', '+++'):
+        for i in range(1, len(lines)):
+            if lines[i].rstrip() == delimiter:
+                return ('yaml' if delimiter == '---' else 'toml'), '\n'.join(lines[1:i]), '\n'.join(lines[i + 1:])
+    return None, '', text
+
+
+def _yaml_blocks(header: str) -> Dict[str, List[str]]:
+    """
+    按顶层键切分 YAML front matter 原文：{键: [该键所在行及其后的缩进行、块列表项]}
+    """
+    blocks: Dict[str, List[str]] = {}
+    key = None
+    for line in header.split('\n'):
+        match = TOP_LEVEL_KEY.match(line)
+        if match:
+            key = match.group(1).strip()
+            blocks[key] = [line]
+        elif key is not None and line.strip():
+            blocks[key].append(line)
+    return blocks
+
+
+def _toml_value(value: Any) -> Any:
+    """
+    TOML 的日期时间转为 ISO 8601 字符串，其余值不变
+    """
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, list):
+        return [_toml_value(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _toml_value(v) for k, v in value.items()}
+    return value
+
+
+def _yaml_line(key: str, value: Any) -> str:
+    # JSON 是 YAML 的子集，嵌套的表和数组以流式写法输出
+    if key in ('date', 'lastmod', 'publishDate', 'expiryDate') and isinstance(value, str):
+        return f'{key}: {value}'
+    return f'{key}: {json.dumps(value, ensure_ascii=False)}'
+
+
+def count_entries(path: str) -> Optional[int]:
+    """
+    返回压缩包中的 Markdown 数量；tar 流无法预先统计，返回 None
+    """
+    if os.path.isdir(path):
+        return sum(1 for _ in _walk_directory(path))
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            return sum(1 for info in archive.infolist() if not info.is_dir() and _is_markdown(info.filename))
+    return None
+
+
+def _walk_directory(path: str) -> Iterator[str]:
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            relative = os.path.relpath(full, path).replace(os.sep, '/')
+            if _is_markdown(relative):
+                yield relative
+
+
+def iter_entries(path: str) -> Iterator[Tuple[str, Optional[bytes]]]:
+    """
+    逐个读取 Markdown 条目，不解压整个压缩包
+
+    返回:
+        (条目路径, 内容)；超过 MAX_ENTRY_BYTES 的条目内容为 None
+    """
+    if os.path.isdir(path):
+        for relative in _walk_directory(path):
+            full = os.path.join(path, relative)
+            if os.path.getsize(full) > MAX_ENTRY_BYTES:
+                yield relative, None
+                continue
+            with open(full, 'rb') as f:
+                yield relative, f.read()
+        return
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_markdown(info.filename):
+                    continue
+                if info.file_size > MAX_ENTRY_BYTES:
+                    yield info.filename, None
+                    continue
+                with archive.open(info) as f:
+                    yield info.filename, f.read()
+        return
+
+    # 流模式只顺序读取一遍，支持 .tar / .tar.gz / .tar.bz2 / .tar.xz
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile() or not _is_markdown(member.name):
+                continue
+            if member.size > MAX_ENTRY_BYTES:
+                yield member.name, None
+                continue
+            f = archive.extractfile(member)
+            yield member.name, f.read() if f else None
+
+
+def file_digest(path: str) -> str:
+    """
+    压缩包内容的 SHA-256，用于识别同一次导入以便断点续传
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        digest.update(os.path.abspath(path).encode('utf-8'))
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImportState:
+    """
+    导入进度记录（JSON Lines，每行一条文件状态），中断后再次导入同一压缩包时跳过已提交的条目
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        返回 {条目路径: 最后一条状态记录}
+        """
+        records = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 进程被强制结束时最后一行可能不完整
+                        continue
+                    records[record['entry']] = record
+        except OSError:
+            pass
+        return records
+
+    def append(self, records: List[Dict[str, Any]]):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class BulkImporter:
+    """
+    批量导入
+
+    条目按顺序从压缩包中读出，交给 max_workers 个线程解析 front matter、本地排版和（可选）AI 排版；
+    同时在处理中的条目不超过 2 * max_workers 个，内存占用与压缩包大小无关。
+    处理完成的文件每满 batch_size 篇通过 upload_files 合并为一次提交。
+    """
+
+    def __init__(self, deepseek_service, github_service, markdown_generator, markdown_formatter):
+        self.deepseek_service = deepseek_service
+        self.github_service = github_service
+        self.markdown_generator = markdown_generator
+        self.markdown_formatter = markdown_formatter
+        self.max_workers = max(1, int(os.environ.get('IMPORT_MAX_WORKERS', 8)))
+        self.batch_size = max(1, int(os.environ.get('IMPORT_BATCH_SIZE', 200)))
+        self.state_dir = os.environ.get('IMPORT_STATE_DIR') or os.path.join(
+            tempfile.gettempdir(), 'hugo-publisher-imports'
+        )
+
+    def run(self, path: str, options: Optional[Dict[str, Any]] = None,
+            progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        导入一个压缩包或目录
+
+        参数:
+            path: zip/tar 文件或目录路径
+            options: target_dir、auto_format、draft、keep_filenames、category、tags、restart、branch
+            progress_callback: 每处理完一篇调用一次，参数为当前汇总
+
+        返回:
+            {'success', 'import_id', 'total', 'committed', 'failed', 'skipped', 'commits', 'files': [文件状态]}
+        """
+        options = {
+            'target_dir': 'content/posts',
+            'auto_format': False,
+            'draft': False,
+            'keep_filenames': True,
+            'category': '',
+            'tags': [],
+            'restart': False,
+            'branch': 'main',
+            **(options or {})
+        }
+        import_id = file_digest(path)[:16]
+        state = ImportState(os.path.join(self.state_dir, f'{import_id}.jsonl'))
+        if options['restart']:
+            state.clear()
+        previous = {entry: r for entry, r in state.load().items() if r['status'] == STATUS_COMMITTED}
+
+        summary = {
+            'success': True,
+            'import_id': import_id,
+            'total': count_entries(path),
+            'processed': 0,
+            'committed': 0,
+            'failed': 0,
+            'skipped': 0,
+            'commits': [],
+            'files': []
+        }
+        batch: List[Dict[str, Any]] = []
+        used_paths = {r['path'] for r in previous.values()}
+
+        def record(entries: List[Dict[str, Any]]):
+            state.append([e for e in entries if e['status'] != STATUS_SKIPPED])
+            for entry in entries:
+                summary[entry['status']] += 1
+            summary['files'].extend(entries)
+
+        def collect(finished):
+            for future in finished:
+                item = future.result()
+                summary['processed'] += 1
+                if item['status'] == STATUS_FAILED:
+                    record([item])
+                else:
+                    item['path'] = self._unique_path(item['path'], used_paths)
+                    batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self._commit(batch, options, summary, record)
+                    batch.clear()
+                if progress_callback:
+                    progress_callback(summary)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for entry, data in iter_entries(path):
+                if entry in previous:
+                    summary['processed'] += 1
+                    record([{'entry': entry, 'status': STATUS_SKIPPED, 'path': previous[entry]['path']}])
+                    continue
+                # 复制上下文，使工作线程中的 AI 调用沿用调用方的优先级和用量统计
+                context = contextvars.copy_context()
+                pending.add(executor.submit(context.run, self._convert, entry, data, options))
+                if len(pending) >= self.max_workers * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+            collect(pending)
+
+        if batch:
+            self._commit(batch, options, summary, record)
+        if summary['total'] is None:
+            summary['total'] = summary['processed']
+        summary['success'] = summary['failed'] == 0
+        if progress_callback:
+            progress_callback(summary)
+        return summary
+
+    def _convert(self, entry: str, data: Optional[bytes], options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        把一个条目转换为待上传的文件，出错时返回失败状态而不是抛出异常
+        """
+        if data is None:
+            return {'entry': entry, 'status': STATUS_FAILED, 'error': f'文件超过 {MAX_ENTRY_BYTES} 字节'}
+        try:
+            text = _decode(data).replace('\r\n', '\n')
+            front_matter, extra_lines, warnings, content = self._read_front_matter(text)
+            content = content.strip()
+            if not content:
+                return {'entry': entry, 'status': STATUS_FAILED, 'error': '内容为空'}
+
+            title = str(front_matter.get('title') or self.markdown_formatter.extract_title(content) or
+                        self._entry_stem(entry))
+            tags = self._as_list(front_matter.get('tags')) or list(options['tags'])
+            categories = self._as_list(front_matter.get('categories') or front_matter.get('category'))
+            category = categories[0] if categories else options['category']
+            date = str(front_matter.get('date') or '') or datetime.now(
+                timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00')
+
+            content = self.markdown_formatter.format(content, title)
+            if options['auto_format'] and self.markdown_formatter.needs_ai(content):
+                formatted = self.deepseek_service.format_article(content, title, tags, category)
+                content = self.markdown_formatter.format(formatted.get('content', content), title)
+                tags = tags or formatted.get('tags', [])
+                category = category or formatted.get('category', '')
+
+            if options['keep_filenames']:
+                filename = f'{self.markdown_generator.slugify(self._entry_stem(entry)) or "post"}.md'
+            else:
+                filename = self.markdown_generator.generate_filename(title, date)
+
+            full_content = self.markdown_generator.wrap_with_front_matter(
+                title=title,
+                content=content,
+                date=date,
+                tags=tags,
+                category=category,
+                draft=bool(front_matter.get('draft', options['draft'])),
+                description=front_matter.get('description', '') or ''
+            )
+            item = {
+                'entry': entry,
+                'status': STATUS_COMMITTED,
+                'path': f'{options["target_dir"]}/{filename}',
+                'content': self._merge_front_matter(full_content, extra_lines)
+            }
+            if warnings:
+                item['warnings'] = warnings
+            return item
+        except Exception as e:
+            return {'entry': entry, 'status': STATUS_FAILED, 'error': str(e)}
+
+    def _read_front_matter(self, text: str) -> Tuple[Dict[str, Any], Dict[str, List[str]], List[str], str]:
+        """
+        解析 YAML（---）或 TOML（+++）front matter
+
+        返回:
+            (字段, {要原样保留的键: YAML 行}, 警告, 正文)
+        """
+        kind, header, body = split_front_matter(text)
+        warnings = []
+        if kind is None:
+            return {}, {}, warnings, text
+
+        if kind == 'toml':
+            if tomllib is None:
+                raise ValueError('TOML front matter 需要 Python 3.11 及以上')
+            try:
+                front_matter = _toml_value(tomllib.loads(header))
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f'TOML front matter 解析失败：{e}')
+            warnings.append('TOML front matter 已转换为 YAML')
+            extra_lines = {key: [_yaml_line(key, value)] for key, value in front_matter.items()
+                           if key not in GENERATED_KEYS}
+            return front_matter, extra_lines, warnings, body
+
+        front_matter = self.markdown_generator.parse_front_matter(f'---\n{header}\n---\n')['front_matter']
+        blocks = _yaml_blocks(header)
+        for key in GENERATED_KEYS:
+            # 嵌套写法无法解析时该字段按缺失处理
+            if key in blocks and len(blocks[key]) > 1 and front_matter.get(key) in ('', None):
+                warnings.append(f'字段 {key} 的写法无法解析，已忽略')
+        extra_lines = {key: lines for key, lines in blocks.items() if key not in GENERATED_KEYS}
+        return front_matter, extra_lines, warnings, body
+
+    def _merge_front_matter(self, generated: str, extra_lines: Dict[str, List[str]]) -> str:
+        """
+        把原文中未重新生成的字段追加到生成的 front matter，同名字段（如 lastmod）以原文为准
+        """
+        if not extra_lines:
+            return generated
+        lines = generated.split('\n')
+        end = lines.index('---', 1)
+        header = [line for line in lines[1:end]
+                  if not (TOP_LEVEL_KEY.match(line) and TOP_LEVEL_KEY.match(line).group(1).strip() in extra_lines)]
+        for block in extra_lines.values():
+            header.extend(block)
+        return '\n'.join(['---'] + header + lines[end:])
+
+    def _commit(self, batch: List[Dict[str, Any]], options: Dict[str, Any], summary: Dict[str, Any],
+                record: Callable[[List[Dict[str, Any]]], None]):
+        """
+        一批文件合并为一次提交，并记录每个文件的状态
+        """
+        result = self.github_service.upload_files(
+            [{'path': item['path'], 'content': item['content']} for item in batch],
+            message=f'Import {len(batch)} posts',
+            branch=options['branch']
+        )
+        entries = []
+        for item in batch:
+            status = {'entry': item['entry'], 'path': item['path']}
+            if item.get('warnings'):
+                status['warnings'] = item['warnings']
+            if result['success']:
+                status['status'] = STATUS_COMMITTED
+                status['commit'] = result.get('commit_sha', '')
+            else:
+                status['status'] = STATUS_FAILED
+                status['error'] = result.get('error', '上传失败')
+            entries.append(status)
+        if result['success']:
+            summary['commits'].append(result.get('commit_sha', ''))
+        else:
+            print(f"Warning: import batch of {len(batch)} failed: {result.get('error')}")
+        record(entries)
+
+    def _unique_path(self, path: str, used: set) -> str:
+        base, ext = os.path.splitext(path)
+        candidate, n = path, 2
+        while candidate in used:
+            candidate = f'{base}-{n}{ext}'
+            n += 1
+        used.add(candidate)
+        return candidate
+
+    def _entry_stem(self, entry: str) -> str:
+        """
+        文件名主体；页面包中的 index.md 使用所在目录名
+        """
+        parts = entry.rstrip('/').split('/')
+        stem = os.path.splitext(parts[-1])[0]
+        if stem in ('index', '_index') and len(parts) > 1:
+            stem = parts[-2]
+        return stem
+
+    def _as_list(self, value) -> List[str]:
+        if isinstance(value, list):
+            return [str(v) for v in value if str(v).strip()]
+        if isinstance(value, str) and value.strip():
+            return [v.strip() for v in re.split(r'[,，]', value) if v.strip()]
+        return []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from dotenv import load_dotenv
+    from .deepseek import DeepSeekService
+    from .github import GitHubService
+    from ..utils.markdown import MarkdownGenerator
+    from ..utils.formatter import MarkdownFormatter
+
+    parser = argparse.ArgumentParser(description='批量导入 Markdown 压缩包到 Hugo 仓库')
+    parser.add_argument('archive', help='zip/tar 文件或目录')
+    parser.add_argument('--target-dir', default='content/posts')
+    parser.add_argument('--branch', default='main')
+    parser.add_argument('--format', action='store_true', help='需要时调用 DeepSeek 排版')
+    parser.add_argument('--draft', action='store_true', help='没有 draft 字段的文章按草稿导入')
+    parser.add_argument('--rename', action='store_true', help='按日期和标题重新生成文件名')
+    parser.add_argument('--category', default='')
+    parser.add_argument('--restart', action='store_true', help='忽略上次的导入进度')
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    importer = BulkImporter(
+        DeepSeekService() if args.format else None,
+        GitHubService(),
+        MarkdownGenerator(),
+        MarkdownFormatter()
+    )
+
+    def on_progress(summary):
+        total = summary['total'] or '?'
+        print(f"\r{summary['processed']}/{total}  提交 {summary['committed']}  失败 {summary['failed']}  "
+              f"跳过 {summary['skipped']}", end='', flush=True)
+
+    summary = importer.run(args.archive, {
+        'target_dir': args.target_dir,
+        'branch': args.branch,
+        'auto_format': args.format,
+        'draft': args.draft,
+        'keep_filenames': not args.rename,
+        'category': args.category,
+        'restart': args.restart
+    }, progress_callback=on_progress)
+    print()
+    for item in summary['files']:
+        if item['status'] == STATUS_FAILED:
+            print(f"失败 {item['entry']}: {item.get('error', '')}")
+        for warning in item.get('warnings', []):
+            print(f"注意 {item['entry']}: {warning}")
+    print(f"导入编号 {summary['import_id']}，共 {len(summary['commits'])} 次提交")
+    return 0 if summary['success'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部服务熔断器
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict, Any
+
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器处于打开状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    最近 window 次调用中失败（含超慢调用）比例达到 failure_rate，
+    或连续失败 failure_threshold 次时打开；打开 recovery_timeout 秒后进入半开状态，
+    只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, failure_rate: float = 0.5,
+                 window: int = 10, min_calls: int = 5, recovery_timeout: float = 30,
+                 slow_call_seconds: float = 45):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.recovery_timeout = recovery_timeout
+        self.slow_call_seconds = slow_call_seconds
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)
+        self._latencies = deque(maxlen=window)
+        self._state = STATE_CLOSED
+        self._opened_at = 0.0
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        self._last_error = ''
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        判断本次调用是否放行；半开状态下同一时间只放行一个探测请求
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def check(self):
+        """
+        不放行时抛出 CircuitOpenError
+        """
+        if not self.allow():
+            raise CircuitOpenError(f'{self.name} 服务暂不可用（熔断中），已跳过调用')
+
+    def record_success(self, latency: float = 0.0, count_slow: bool = True):
+        """
+        记录一次成功调用；超过 slow_call_seconds 的调用按失败计入比例
+        """
+        slow = count_slow and latency >= self.slow_call_seconds
+        with self._lock:
+            self._latencies.append(latency)
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                if not slow:
+                    self._close()
+                    return
+                self._open('探测请求过慢')
+                return
+            self._consecutive_failures = 0
+            self._outcomes.append(not slow)
+            self._evaluate()
+
+    def record_failure(self, error: str = ''):
+        """
+        记录一次失败调用
+        """
+        with self._lock:
+            self._last_error = error
+            if self._state == STATE_HALF_OPEN:
+                self._probe_in_flight = False
+                self._open(error)
+                return
+            self._consecutive_failures += 1
+            self._outcomes.append(False)
+            self._evaluate()
+
+    def release(self):
+        """
+        调用既不算成功也不算失败时（如客户端参数错误）释放半开探测名额
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _evaluate(self):
+        if self._state != STATE_CLOSED:
+            return
+        failures = self._outcomes.count(False)
+        if self._consecutive_failures >= self.failure_threshold or (
+                len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate):
+            self._open(self._last_error)
+
+    def _open(self, error: str):
+        self._state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        print(f"Circuit breaker '{self.name}' opened: {error}")
+
+    def _close(self):
+        self._state = STATE_CLOSED
+        self._outcomes.clear()
+        self._consecutive_failures = 0
+        print(f"Circuit breaker '{self.name}' closed")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        返回熔断器当前状态，用于健康检查
+        """
+        with self._lock:
+            state = self._current_state()
+            latencies = list(self._latencies)
+            return {
+                'state': state,
+                'recent_calls': len(self._outcomes),
+                'recent_failures': self._outcomes.count(False),
+                'consecutive_failures': self._consecutive_failures,
+                'avg_latency': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'retry_in': round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 1)
+                if state == STATE_OPEN else 0,
+                'last_error': self._last_error
+            }
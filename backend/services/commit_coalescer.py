@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写合并：短时间内的多次写入/删除合并为一次 Git Data API 提交，减少提交次数和站点重新构建
+"""
+
+import os
+import time
+import base64
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Dict, List, Optional
+
+
+class CommitCoalescer:
+    """
+    写合并缓冲区
+
+    第一个操作到达后开始计时，window 秒后或累计 max_ops 个操作时把缓冲区作为一次提交写入。
+    同一路径的后续操作覆盖之前的操作，被覆盖的调用方得到最终操作的结果（superseded 为 True）。
+    """
+
+    def __init__(self, github_service, window: float = 2.0, max_ops: int = 50, branch: str = 'main'):
+        self.github_service = github_service
+        self.window = window
+        self.max_ops = max(1, max_ops)
+        self.branch = branch
+        self._pending: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._deadline: Optional[float] = None
+        self._cond = threading.Condition()
+        # 同一时间只有一次提交在进行，flush 会等待进行中的提交完成
+        self._commit_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._groups = itertools.count()
+
+    def submit(self, ops: List[Dict[str, Any]]) -> List[Future]:
+        """
+        加入一组操作（同一组操作总在同一次提交中）
+
+        参数:
+            ops: 每项包含 path、message，写入时另有 content、is_binary，删除时 delete 为 True
+
+        返回:
+            与 ops 一一对应的 Future，结果为该操作的上传结果字典
+        """
+        futures = []
+        with self._cond:
+            group = next(self._groups)
+            for op in ops:
+                future = Future()
+                path = op['path'].lstrip('/')
+                waiters = [future]
+                if path in self._pending:
+                    _, previous = self._pending.pop(path)
+                    waiters = previous + waiters
+                self._pending[path] = (dict(op, path=path, group=group), waiters)
+                futures.append(future)
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.window
+            if self._thread is None:
+                # 首次使用时才启动后台线程
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return futures
+
+    def wait(self, futures: List[Future]) -> List[Dict[str, Any]]:
+        return [future.result(timeout=self.window + 120) for future in futures]
+
+    async def wait_async(self, futures: List[Future]) -> List[Dict[str, Any]]:
+        """
+        wait 的协程版本，等待提交期间不阻塞事件循环
+        """
+        import asyncio
+
+        pending = asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+        return list(await asyncio.wait_for(pending, self.window + 120))
+
+    def flush(self, path: Optional[str] = None):
+        """
+        立即提交缓冲区中的操作（进程退出前调用）
+
+        参数:
+            path: 给定时只在该路径有待提交的操作时才提交
+        """
+        with self._commit_lock:
+            with self._cond:
+                if path is not None and path.lstrip('/') not in self._pending:
+                    return
+                batch = self._take()
+            if batch:
+                self._commit(batch)
+
+    def _take(self) -> list:
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._deadline = None
+        return batch
+
+    def _run(self):
+        while True:
+            self._wait_for_batch()
+            with self._commit_lock:
+                with self._cond:
+                    batch = self._take()
+                try:
+                    if batch:
+                        self._commit(batch)
+                except Exception as e:
+                    # 后台线程不能退出，否则之后的写入会一直等待
+                    print(f"Warning: commit coalescer error: {e}")
+                    self._resolve(batch, {'success': False, 'error': str(e)})
+
+    def _wait_for_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # flush 可能在等待期间取走了缓冲区
+            while 0 < len(self._pending) < self.max_ops:
+                remaining = self._deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+    def _commit(self, batch: list):
+        files = []
+        messages = []
+        for op, _ in batch:
+            if op.get('delete'):
+                files.append({'path': op['path'], 'delete': True})
+            else:
+                files.append({'path': op['path'], 'content': op['content'], 'is_binary': op.get('is_binary', False)})
+            if op['message'] not in messages:
+                messages.append(op['message'])
+
+        if len(messages) == 1:
+            message = messages[0]
+        else:
+            message = f'Batch update: {len(batch)} changes\n\n' + '\n'.join(f'- {m}' for m in messages)
+
+        try:
+            result = self.github_service.upload_files(files, message=message, branch=self.branch)
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        if not result['success']:
+            groups = OrderedDict()
+            for item in batch:
+                groups.setdefault(item[0]['group'], []).append(item)
+            if len(groups) > 1:
+                # 无法判断是哪一组出错，逐组重新提交，出错的组不连累同批的其他调用方
+                print(f"Warning: coalesced commit of {len(batch)} changes failed, retrying {len(groups)} groups "
+                      f"separately: {result.get('error')}")
+                for group in groups.values():
+                    self._commit(group)
+                return
+            print(f"Warning: coalesced commit of {len(batch)} changes failed: {result.get('error')}")
+            self._resolve(batch, {'success': False, 'error': result.get('error', '上传失败')})
+            return
+
+        uploaded_files = result.get('files') or []
+        for i, (op, waiters) in enumerate(batch):
+            uploaded = uploaded_files[i] if i < len(uploaded_files) else {}
+            if op.get('delete'):
+                outcome = {'success': True, 'path': op['path']}
+            else:
+                outcome = {'success': True, 'file_path': op['path'], 'url': uploaded.get('url', '')}
+            outcome['commit_sha'] = result.get('commit_sha', '')
+            outcome['coalesced'] = len(batch)
+            self._resolve([(op, waiters)], outcome)
+
+    def _resolve(self, batch: list, outcome: Dict[str, Any]):
+        # 只设置尚未完成的 Future：部分操作可能已在出错前得到结果
+        for _, waiters in batch:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(dict(outcome, superseded=True) if future is not waiters[-1] else dict(outcome))
+
+
+class CoalescingGitHubService:
+    """
+    GitHubService 的写合并代理
+
+    upload_file / upload_stream / upload_files / delete_file 经 CommitCoalescer 合并提交，
+    调用在所在批次提交后返回；其余方法和属性直接使用原服务。
+    """
+
+    def __init__(self, service, coalescer: CommitCoalescer, max_bytes: int = 5 * 1024 * 1024):
+        self.service = service
+        self.coalescer = coalescer
+        self.max_bytes = max_bytes
+
+    def __getattr__(self, name):
+        return getattr(self.service, name)
+
+    def upload_file(self, content: str, filename: str, target_dir: str = 'content/posts',
+                    message: str = 'Update file', branch: str = 'main', is_binary: bool = False,
+                    known_sha: Optional[str] = None) -> Dict[str, Any]:
+        if branch != self.coalescer.branch or known_sha:
+            # 带 known_sha 的写入由 GitHub 校验版本，不能合并；先提交同一路径上排队的操作，保证先后顺序
+            self._flush_for(branch, f'{target_dir}/{filename}')
+            return self.service.upload_file(content, filename, target_dir, message, branch, is_binary, known_sha)
+        op = {'path': f'{target_dir}/{filename}', 'content': content, 'is_binary': is_binary, 'message': message}
+        return self.coalescer.wait(self.coalescer.submit([op]))[0]
+
+    def upload_stream(self, source: BinaryIO, filename: str, target_dir: str = 'content/posts',
+                      message: str = 'Update file', branch: str = 'main',
+                      known_sha: Optional[str] = None) -> Dict[str, Any]:
+        start = source.tell()
+        size = source.seek(0, os.SEEK_END) - start
+        source.seek(start)
+        if size > self.max_bytes or branch != self.coalescer.branch or known_sha:
+            # 大文件和带 known_sha 的写入不进入缓冲区，直接流式上传
+            self._flush_for(branch, f'{target_dir}/{filename}')
+            return self.service.upload_stream(source, filename, target_dir, message, branch, known_sha)
+        content = base64.b64encode(source.read()).decode('ascii')
+        return self.upload_file(content, filename, target_dir, message, branch, is_binary=True)
+
+    def _flush_for(self, branch: str, path: str):
+        if branch == self.coalescer.branch:
+            self.coalescer.flush(path)
+
+    def upload_files(self, files: List[Dict[str, Any]], message: str = 'Update files',
+                     branch: str = 'main') -> Dict[str, Any]:
+        if branch != self.coalescer.branch:
+            return self.service.upload_files(files, message, branch)
+        missing = self.missing_deletions(files)
+        if missing:
+            return {'success': False, 'error': f'文件不存在：{", ".join(missing)}'}
+        return files_result(self.coalescer.wait(self.coalescer.submit(files_ops(files, message))))
+
+    def missing_deletions(self, files: List[Dict[str, Any]]) -> List[str]:
+        """
+        返回要删除但不存在的路径：这样的删除会使整批提交失败，需要在入队前拒绝
+        """
+        return [f['path'] for f in files if f.get('delete') and not self.service.file_exists(f['path'])]
+
+    def delete_file(self, path: str, message: str = 'Delete file') -> Dict[str, Any]:
+        # 删除不存在的路径会使整批提交失败，先确认文件存在
+        if not self.service.file_exists(path):
+            return {
+                'success': False,
+                'error': '文件不存在'
+            }
+        op = {'path': path, 'delete': True, 'message': message}
+        return self.coalescer.wait(self.coalescer.submit([op]))[0]
+
+
+def files_ops(files: List[Dict[str, Any]], message: str) -> List[Dict[str, Any]]:
+    """
+    把 upload_files 的文件列表转换为 CommitCoalescer.submit 的操作
+    """
+    return [
+        {
+            'path': f['path'],
+            'content': f.get('content', ''),
+            'is_binary': f.get('is_binary', False),
+            'delete': f.get('delete', False),
+            'message': message
+        }
+        for f in files
+    ]
+
+
+def files_result(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    把各操作的结果合并为 upload_files 的返回值
+    """
+    failed = next((r for r in results if not r['success']), None)
+    if failed:
+        return {'success': False, 'error': failed.get('error', '上传失败')}
+    return {
+        'success': True,
+        'commit_sha': results[-1]['commit_sha'],
+        'files': [
+            {'file_path': r.get('file_path', r.get('path')), 'url': r.get('url', '')}
+            for r in results
+        ]
+    }
@@ -5,9 +5,232 @@ DeepSeek API服务
 """
 
 import os
+import re
 import json
-import requests
-from typing import List, Optional, Dict, Any
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, Callable, NamedTuple
+
+from .rate_limiter import RateLimiter, PRIORITY_BATCH, PRIORITY_INTERACTIVE
+from .circuit_breaker import CircuitBreaker
+from ..utils.formatter import MarkdownFormatter
+from ..utils import placeholders
+from ..utils.lazy import lazy_import
+from ..utils.cpu_pool import cpu_pool
+
+requests = lazy_import('requests')
+
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数
+
+    DeepSeek 官方换算：1 个中文字符约 0.6 token，1 个英文字符约 0.3 token。
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+def extract_partial_json_string(buffer: str, key: str) -> str:
+    """
+    从尚未接收完整的 JSON 文本中提取指定字符串字段的当前值
+
+    用于流式输出时提前拿到 content 字段的已生成部分。
+    """
+    match = re.search(r'"%s"\s*:\s*"' % re.escape(key), buffer)
+    if not match:
+        return ''
+
+    escapes = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', '\\': '\\', '/': '/'}
+    chars = []
+    i = match.end()
+    while i < len(buffer):
+        char = buffer[i]
+        if char == '"':
+            break
+        if char == '\\':
+            if i + 1 >= len(buffer):
+                break
+            nxt = buffer[i + 1]
+            if nxt == 'u':
+                code = buffer[i + 2:i + 6]
+                if len(code) < 4:
+                    break
+                try:
+                    chars.append(chr(int(code, 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            chars.append(escapes.get(nxt, nxt))
+            i += 2
+            continue
+        chars.append(char)
+        i += 1
+    return ''.join(chars)
+
+
+class ApiRequest(NamedTuple):
+    """一次DeepSeek调用的消息、参数和结果解析函数，同步与异步客户端共用"""
+    messages: List[dict]
+    temperature: float
+    max_tokens: int
+    parse: Callable[[str], Any]
+
+
+class TokenUsage:
+    """累计一次任务中所有DeepSeek调用的 token 用量（线程安全）"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+    
+    def add(self, usage: Optional[Dict[str, Any]]):
+        with self._lock:
+            self.requests += 1
+            if usage:
+                self.prompt_tokens += usage.get('prompt_tokens', 0) or 0
+                self.completion_tokens += usage.get('completion_tokens', 0) or 0
+                self.total_tokens += usage.get('total_tokens', 0) or 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'total_tokens': self.total_tokens
+            }
+
+
+_call_scope: contextvars.ContextVar = contextvars.ContextVar('deepseek_call_scope', default=None)
+
+
+def current_priority() -> str:
+    """
+    当前上下文的调度优先级，未设置时按批量任务处理
+    """
+    scope = _call_scope.get()
+    return scope['priority'] if scope else PRIORITY_BATCH
+
+
+def current_usage() -> Optional[TokenUsage]:
+    """
+    当前上下文 usage_scope 的用量统计，不在 usage_scope 内时返回 None
+    """
+    scope = _call_scope.get()
+    return scope['usage'] if scope else None
+
+
+@contextmanager
+def usage_scope(priority: str = PRIORITY_BATCH):
+    """
+    为当前上下文中的DeepSeek调用设置调度优先级并统计 token 用量
+    
+    用法:
+        with usage_scope(PRIORITY_INTERACTIVE) as usage:
+            deepseek_service.format_article(...)
+        usage.to_dict()
+    """
+    usage = TokenUsage()
+    token = _call_scope.set({'priority': priority, 'usage': usage})
+    try:
+        yield usage
+    finally:
+        _call_scope.reset(token)
+
+
+def split_markdown_chunks(content: str, max_tokens: int) -> List[str]:
+    """
+    按标题/段落边界把 Markdown 切分成 token 数不超过 max_tokens 的片段
+
+    代码块不会被拆开；单个超长段落会单独成为一个片段。
+    """
+    # 1. 切成不可再分的块：段落、代码块（空行分隔，代码块内的空行不算）
+    blocks = []
+    current = []
+    in_fence = False
+    for line in content.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('```') or stripped.startswith('~~~'):
+            in_fence = not in_fence
+        if not in_fence and re.match(r'^#{1,6}\s', line) and current:
+            # 标题总是开启新块，便于优先在标题处切分
+            blocks.append('\n'.join(current))
+            current = []
+        current.append(line)
+        if not in_fence and stripped == '':
+            blocks.append('\n'.join(current))
+            current = []
+    if current:
+        blocks.append('\n'.join(current))
+    
+    # 2. 贪心合并，遇到标题且当前片段已过半时提前切分，尽量让片段从标题开始
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in blocks:
+        block_tokens = estimate_tokens(block)
+        starts_section = bool(re.match(r'^#{1,6}\s', block))
+        if current and (current_tokens + block_tokens > max_tokens or
+                        (starts_section and current_tokens > max_tokens // 2)):
+            chunks.append('\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        chunks.append('\n'.join(current))
+    
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+class StreamCollector:
+    """
+    逐行解析 DeepSeek 的 SSE 响应，拼接文本并记录用量（同步与异步客户端共用）
+    """
+
+    def __init__(self, on_delta: Callable[[str], None]):
+        self.on_delta = on_delta
+        self.parts: List[str] = []
+        self.usage: Optional[Dict[str, Any]] = None
+
+    @property
+    def content(self) -> str:
+        return ''.join(self.parts)
+
+    def feed(self, line: str) -> bool:
+        """
+        处理一行数据，收到 [DONE] 时返回 True
+        """
+        if not line or not line.startswith('data:'):
+            return False
+        data = line[5:].strip()
+        if data == '[DONE]':
+            return True
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            return False
+        if chunk.get('usage'):
+            self.usage = chunk['usage']
+        choices = chunk.get('choices') or []
+        if choices:
+            delta = choices[0].get('delta', {}).get('content')
+            if delta:
+                self.parts.append(delta)
+                self.on_delta(delta)
+        return False
 
 
 class DeepSeekService:
@@ -17,44 +240,234 @@ class DeepSeekService:
         self.api_key = os.environ.get('DEEPSEEK_API_KEY', '')
         self.base_url = 'https://api.deepseek.com'
         self.model = os.environ.get('DEEPSEEK_MODEL', 'deepseek-chat')
+        # 长文模式：输入超过 long_document_tokens 时分片并发排版
+        self.long_document_tokens = int(os.environ.get('DEEPSEEK_LONG_DOCUMENT_TOKENS', 3000))
+        self.chunk_tokens = int(os.environ.get('DEEPSEEK_CHUNK_TOKENS', 2000))
+        self.max_workers = int(os.environ.get('DEEPSEEK_MAX_WORKERS', 4))
+        self.enrich_timeout = float(os.environ.get('DEEPSEEK_ENRICH_TIMEOUT', 20))
+        self.max_retries = int(os.environ.get('DEEPSEEK_MAX_RETRIES', 2))
+        # 限流：0 表示不限制；多进程部署时共用 DEEPSEEK_RATE_LIMIT_DB 指向的状态文件
+        self.rate_limiter = RateLimiter(
+            rpm=int(os.environ.get('DEEPSEEK_RPM', 60)),
+            tpm=int(os.environ.get('DEEPSEEK_TPM', 200000)),
+            state_path=os.environ.get('DEEPSEEK_RATE_LIMIT_DB') or None
+        )
+        self.timeout = float(os.environ.get('DEEPSEEK_TIMEOUT', 60))
+        # 熔断：服务异常时直接走降级逻辑，不再等待超时
+        self.circuit_breaker = CircuitBreaker(
+            'DeepSeek',
+            failure_threshold=int(os.environ.get('DEEPSEEK_BREAKER_FAILURES', 5)),
+            recovery_timeout=float(os.environ.get('DEEPSEEK_BREAKER_RECOVERY', 30)),
+            slow_call_seconds=float(os.environ.get('DEEPSEEK_BREAKER_SLOW_CALL', 45))
+        )
+        self.local_formatter = MarkdownFormatter()
         
         if not self.api_key:
             raise ValueError('未设置DeepSeek API密钥，请配置环境变量DEEPSEEK_API_KEY')
     
-    def _call_api(self, messages: List[dict], temperature: float = 0.7) -> str:
+    def _call_api(self, messages: List[dict], temperature: float = 0.7,
+                  on_delta: Optional[Callable[[str], None]] = None,
+                  max_tokens: int = 4096) -> str:
         """
         调用DeepSeek API
         
         参数:
             messages: 消息列表
             temperature: 温度参数
+            max_tokens: 最大生成 token 数
+            on_delta: 流式回调（可选），传入时以 SSE 方式接收并逐段回调已生成的文本
             
         返回:
             API返回的文本内容
         """
-        headers = {
+        headers = self._headers()
+        payload = self._payload(messages, temperature, max_tokens)
+        priority = current_priority()
+        estimated_tokens = self._estimate_call_tokens(messages, max_tokens)
+        
+        for attempt in range(self.max_retries + 1):
+            self.circuit_breaker.check()
+            try:
+                row_id = self.rate_limiter.acquire(estimated_tokens, priority=priority)
+            except Exception:
+                self.circuit_breaker.release()
+                raise
+            
+            started = time.monotonic()
+            try:
+                if on_delta is not None:
+                    content, usage = self._call_api_stream(headers, payload, on_delta)
+                else:
+                    response = requests.post(
+                        f'{self.base_url}/chat/completions',
+                        headers=headers,
+                        json=payload,
+                        timeout=self.timeout
+                    )
+                    
+                    response.raise_for_status()
+                    
+                    # 长文排版的响应可达数 MB，大响应在进程池中解析
+                    result = cpu_pool.run(json.loads, response.content)
+                    content = result['choices'][0]['message']['content']
+                    usage = result.get('usage')
+            except requests.exceptions.HTTPError as e:
+                self._settle_failed(row_id)
+                status = e.response.status_code if e.response is not None else None
+                if status == 429 and attempt < self.max_retries:
+                    self.circuit_breaker.release()
+                    delay = self._retry_after(e.response, attempt)
+                    print(f"DeepSeek rate limited (429), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+                if status is not None and 400 <= status < 500 and status != 429:
+                    # 请求本身有误，不代表服务异常
+                    self.circuit_breaker.release()
+                else:
+                    self.circuit_breaker.record_failure(str(e))
+                raise
+            except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+                self._settle_failed(row_id)
+                self.circuit_breaker.record_failure(str(e))
+                raise
+            except BaseException:
+                # 回调出错、进程池异常或被中断：不计入失败，但要释放半开探测名额
+                self._settle_failed(row_id)
+                self.circuit_breaker.release()
+                raise
+            
+            # 流式调用的总耗时与输出长度相关，不计入慢调用
+            self.circuit_breaker.record_success(time.monotonic() - started, count_slow=on_delta is None)
+            self._record_usage(row_id, usage)
+            return content
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
             'Authorization': f'Bearer {self.api_key}',
             'Content-Type': 'application/json'
         }
-        
-        payload = {
+    
+    def _payload(self, messages: List[dict], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        return {
             'model': self.model,
             'messages': messages,
             'temperature': temperature,
-            'max_tokens': 4096
+            'max_tokens': max_tokens
+        }
+    
+    def _estimate_call_tokens(self, messages: List[dict], max_tokens: int) -> int:
+        """
+        预估一次调用的用量 = 提示词 + 预计输出（按不超过提示词长度估算）
+        """
+        prompt_tokens = sum(estimate_tokens(m.get('content', '')) for m in messages)
+        return prompt_tokens + min(max_tokens, prompt_tokens)
+    
+    def _execute(self, request: ApiRequest, on_delta: Optional[Callable[[str], None]] = None) -> Any:
+        """
+        同步执行一个 ApiRequest 并解析结果
+        """
+        response = self._call_api(request.messages, temperature=request.temperature,
+                                  on_delta=on_delta, max_tokens=request.max_tokens)
+        return request.parse(response)
+    
+    def health(self) -> Dict[str, Any]:
+        """
+        返回熔断器和限流器状态
+        """
+        return {
+            'circuit_breaker': self.circuit_breaker.snapshot(),
+            'rate_limit': self.rate_limiter.snapshot()
         }
+    
+    def _retry_after(self, response: 'requests.Response', attempt: int) -> float:
+        """
+        计算 429 之后的重试等待时间，优先使用 Retry-After 头
+        """
+        try:
+            return min(float(response.headers.get('Retry-After', '')), 60.0)
+        except ValueError:
+            return min(2.0 ** (attempt + 1), 30.0)
+    
+    def _record_usage(self, row_id: Optional[int], usage: Optional[Dict[str, Any]]):
+        """
+        记录接口返回的实际用量：修正限流窗口，并计入当前上下文的任务统计
+        """
+        if usage and usage.get('total_tokens'):
+            self.rate_limiter.record_usage(row_id, usage['total_tokens'])
+        scope = _call_scope.get()
+        if scope:
+            scope['usage'].add(usage)
+    
+    def _settle_failed(self, row_id: Optional[int]):
+        """
+        调用失败时结清限流登记：请求次数仍计入窗口，预估的 token 不再占用配额
+        """
+        try:
+            self.rate_limiter.record_usage(row_id, 0)
+        except Exception as e:
+            print(f"Warning: failed to settle rate limit reservation: {e}")
+    
+    def _submit(self, executor, fn, *args):
+        """
+        向线程池提交任务，并把当前上下文（优先级、用量统计）带到工作线程
+        """
+        return executor.submit(contextvars.copy_context().run, fn, *args)
+    
+    def _call_api_stream(self, headers: dict, payload: dict, on_delta: Callable[[str], None]):
+        """
+        以流式（SSE）方式调用DeepSeek API
+        
+        参数:
+            headers: 请求头
+            payload: 请求体
+            on_delta: 每收到一段新文本时的回调
+            
+        返回:
+            (拼接后的完整文本, 接口返回的用量或 None)
+        """
+        payload = dict(payload, stream=True, stream_options={'include_usage': True})
         
+        # 读超时针对的是相邻两个数据块之间的间隔，而非整个请求
         response = requests.post(
             f'{self.base_url}/chat/completions',
             headers=headers,
             json=payload,
-            timeout=60
+            timeout=(10, self.timeout),
+            stream=True
         )
         
         response.raise_for_status()
+        # SSE 响应通常不声明字符集，显式按 UTF-8 解码
+        response.encoding = 'utf-8'
         
-        result = response.json()
-        return result['choices'][0]['message']['content']
+        collector = StreamCollector(on_delta)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if collector.feed(line):
+                    break
+        finally:
+            response.close()
+        
+        return collector.content, collector.usage
+    
+    def _parse_json_response(self, response: str) -> Any:
+        """
+        解析模型返回的 JSON，兼容 ```json 代码块包裹
+        """
+        response = response.strip()
+        if response.startswith('```json'):
+            response = response.replace('```json', '', 1).rsplit('```', 1)[0].strip()
+        elif response.startswith('```'):
+            response = response.replace('```', '', 1).rsplit('```', 1)[0].strip()
+        return json.loads(response)
+    
+    def _placeholder_rule(self, content: str, prefix: str = '   - ') -> str:
+        """
+        内容中含有占位符时返回对应的提示词规则行，否则返回空字符串
+        """
+        if placeholders.BLOCK_PLACEHOLDER.search(content) or placeholders.LINK_PLACEHOLDER.search(content):
+            return f'{prefix}{placeholders.PROMPT_NOTE}\n'
+        return ''
     
     def _build_format_prompt(self, content: str, title: str, tags: List[str], category: str) -> str:
         """
@@ -90,7 +503,7 @@ class DeepSeekService:
      - 修正明显的错别字。
    - **Markdown 规范**：确保输出符合标准 Markdown 语法。
    - 严禁输出 YAML Front Matter 或 Markdown 一级标题（H1）。
-3. **输出格式**：
+{self._placeholder_rule(content)}3. **输出格式**：
    - 必须以 JSON 格式返回，包含以下字段：
      - `title`: 最终确定的标题
      - `category`: 建议的分类
@@ -101,16 +514,93 @@ class DeepSeekService:
         return prompt
         return prompt
     
-    def format_article(self, content: str, title: str = '', tags: List[str] = None, category: str = '') -> Dict[str, Any]:
+    def format_article(self, content: str, title: str = '', tags: List[str] = None, category: str = '',
+                       progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
         """
         格式化文章并分析元数据
+        
+        传入 progress_callback 时使用流式模式，回调参数为 (进度 0~1, 已生成的正文片段)，
+        进度按已生成 token 数相对输入长度估算。
         """
         if not content or content.strip() == '':
             raise ValueError('文章内容不能为空')
             
         print(f"DEBUG: DeepSeek Input Content (First 500 chars):\n{content[:500]}\n...")
         
-        prompt = self._build_format_prompt(content, title, tags or [], category)
+        compacted, mapping, callback = self._compact_for_format(content, progress_callback)
+        
+        if estimate_tokens(compacted) > self.long_document_tokens:
+            result = self._format_long_article(compacted, title, tags or [], category, callback)
+        else:
+            result = self._format_single(compacted, title, tags or [], category, callback)
+        
+        return self._restore_format(result, mapping, compacted)
+    
+    def _compact_for_format(self, content: str, progress_callback: Optional[Callable[[float, str], None]]):
+        """
+        图片、链接地址和代码块替换为占位符后再发送，进度回调中的部分内容同样还原
+        
+        返回:
+            (压缩后的内容, 占位符映射, 包装后的进度回调)
+        """
+        compacted, mapping = placeholders.compact(content)
+        callback = progress_callback
+        if progress_callback is not None and mapping:
+            def callback(progress, partial_content):
+                progress_callback(progress, placeholders.restore_partial(partial_content, mapping))
+        return compacted, mapping, callback
+    
+    def _restore_format(self, result: Dict[str, Any], mapping: Dict[str, str], compacted: str) -> Dict[str, Any]:
+        """
+        还原排版结果中的占位符
+        """
+        restored, missing = placeholders.restore(result['content'], mapping, compacted)
+        if missing:
+            print(f"Warning: placeholders lost by model, reinserted: {missing}")
+        result['content'] = restored
+        return result
+    
+    def _format_single(self, content: str, title: str, tags: List[str], category: str,
+                       progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """
+        单次调用完成排版和元数据分析，失败时降级为本地排版
+        """
+        request = self._format_request(content, title, tags, category)
+        on_delta = self._progress_handler(content, progress_callback)
+        
+        try:
+            return self._execute(request, on_delta=on_delta)
+        except Exception as e:
+            print(f"Error calling DeepSeek for format: {e}")
+            return self._format_fallback(content, title, tags, category)
+    
+    def _progress_handler(self, content: str,
+                          progress_callback: Optional[Callable[[float, str], None]]) -> Optional[Callable[[str], None]]:
+        """
+        把进度回调包装为流式 on_delta 回调；进度按已生成 token 数相对输入长度估算
+        """
+        if progress_callback is None:
+            return None
+        
+        expected_tokens = max(estimate_tokens(content), 1)
+        buffer = []
+        last_report = [0.0]
+        
+        def on_delta(delta: str):
+            buffer.append(delta)
+            # 节流：每 0.25 秒最多回调一次，避免逐 token 重复解析
+            now = time.monotonic()
+            if now - last_report[0] < 0.25:
+                return
+            last_report[0] = now
+            generated = ''.join(buffer)
+            progress = min(estimate_tokens(generated) / expected_tokens, 1.0)
+            progress_callback(progress, extract_partial_json_string(generated, 'content'))
+        
+        return on_delta
+    
+    def _format_request(self, content: str, title: str, tags: List[str], category: str) -> ApiRequest:
+        prompt = self._build_format_prompt(content, title, tags, category)
         
         messages = [
             {
@@ -123,31 +613,289 @@ class DeepSeekService:
             }
         ]
         
-        try:
-            response = self._call_api(messages, temperature=0.5)
-            # 处理可能的 JSON 包裹
-            if response.startswith('```json'):
-                response = response.replace('```json', '', 1).rsplit('```', 1)[0].strip()
-            elif response.startswith('```'):
-                response = response.replace('```', '', 1).rsplit('```', 1)[0].strip()
-            
-            result = json.loads(response)
+        def parse(response: str) -> Dict[str, Any]:
+            result = self._parse_json_response(response)
             return {
                 'title': result.get('title', '').strip(),
                 'category': result.get('category', '').strip(),
                 'tags': result.get('tags', []),
                 'content': result.get('content', '').strip()
             }
+        
+        return ApiRequest(messages, 0.5, 4096, parse)
+    
+    def _format_fallback(self, content: str, title: str, tags: List[str], category: str) -> Dict[str, Any]:
+        """
+        降级处理：使用本地排版结果，保持原有元数据
+        """
+        return {
+            'title': title,
+            'category': category,
+            'tags': tags,
+            'content': self.local_formatter.format(content, title)
+        }
+    
+    def _build_summary(self, content: str, max_chars: int = 3000) -> str:
+        """
+        为元数据分析构建文章概要：保留全部标题及每节的开头部分
+        """
+        lines = []
+        section_chars = 0
+        in_fence = False
+        for line in content.split('\n'):
+            stripped = line.strip()
+            if stripped.startswith('```') or stripped.startswith('~~~'):
+                in_fence = not in_fence
+                continue
+            if in_fence or not stripped:
+                continue
+            if re.match(r'^#{1,6}\s', line):
+                lines.append(line)
+                section_chars = 0
+            elif section_chars < 300:
+                lines.append(stripped[:300 - section_chars])
+                section_chars += len(stripped)
+        summary = '\n'.join(lines)
+        return summary[:max_chars]
+    
+    def _analyze_metadata(self, summary: str, title: str, tags: List[str], category: str) -> Dict[str, Any]:
+        """
+        仅根据文章概要分析标题、分类和标签
+        """
+        return self._execute(self._metadata_request(summary, title, tags, category))
+    
+    def _metadata_request(self, summary: str, title: str, tags: List[str], category: str) -> ApiRequest:
+        prompt = f"""以下是一篇博客文章的概要（各级标题及段落开头）。请分析文章并返回元数据。
+
+## 文章概要
+{summary}
+
+{'已有标题：' + title if title else ''}
+{'已有分类：' + category if category else ''}
+{'已有标签：' + ', '.join(tags) if tags else ''}
+
+要求：
+1. `title`: 如果已有标题请保留或微调，否则生成一个简洁有力的标题
+2. `category`: 1 个最合适的分类
+3. `tags`: 5-8 个核心标签
+
+直接返回包含 title、category、tags 字段的 JSON 对象，不要包含解释或代码块标记。"""
+        
+        messages = [
+            {
+                'role': 'system',
+                'content': '你是一个精通文章解析的 AI 助手。请根据要求输出 JSON 格式的分析结果。'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+        
+        def parse(response: str) -> Dict[str, Any]:
+            result = self._parse_json_response(response)
+            return {
+                'title': str(result.get('title', '')).strip(),
+                'category': str(result.get('category', '')).strip(),
+                'tags': [str(tag) for tag in result.get('tags', [])]
+            }
+        
+        return ApiRequest(messages, 0.3, 512, parse)
+    
+    def analyze_metadata(self, content: str, title: str = '', tags: List[str] = None,
+                         category: str = '') -> Dict[str, Any]:
+        """
+        仅分析文章元数据（标题、分类、标签），不改动正文
+        
+        适用于排版已达标、只需补全元数据的场景，只发送文章概要。
+        失败时返回传入的元数据。
+        """
+        try:
+            return self._analyze_metadata(self._build_summary(content), title, tags or [], category)
         except Exception as e:
-            print(f"Error calling DeepSeek for format: {e}")
-            # 降级处理：仅返回原文内容，保持原有元数据
+            print(f"Error calling DeepSeek for metadata: {e}")
             return {
                 'title': title,
                 'category': category,
-                'tags': tags or [],
-                'content': content
+                'tags': tags or []
             }
     
+    def _format_chunk(self, chunk: str) -> str:
+        """
+        排版长文中的一个片段，直接返回 Markdown（不使用 JSON，避免截断后无法解析）
+        """
+        return self._execute(self._chunk_request(chunk))
+    
+    def _chunk_request(self, chunk: str) -> ApiRequest:
+        prompt = f"""以下是一篇长文章中的一个片段，请仅做排版层面的优化后原样返回。
+
+## 片段内容
+{chunk}
+
+## 要求
+- **严格保留原义**：不要重写、摘要或扩写，不要补充片段之外的内容。
+- **保留结构**：保留标题层级（H2/H3）、列表、引用、代码块，代码块内容不得修改。
+- **严禁删除图片/链接**：保留所有 `![alt](url)` 和超链接，位置不能错乱。
+- 修正标点符号（如中英文标点混用）、优化段落间距、修正明显的错别字。
+- 严禁输出 YAML Front Matter 或 Markdown 一级标题（H1）。
+{self._placeholder_rule(chunk, prefix='- ')}
+直接返回排版后的 Markdown，不要包含解释，也不要用代码块包裹整体输出。"""
+        
+        messages = [
+            {
+                'role': 'system',
+                'content': '你是一个精通 Markdown 排版的 AI 助手。'
+            },
+            {
+                'role': 'user',
+                'content': prompt
+            }
+        ]
+        
+        def parse(response: str) -> str:
+            response = response.strip()
+            if response.startswith('```markdown') or response.startswith('```md'):
+                response = response.split('\n', 1)[-1].rsplit('```', 1)[0].strip()
+            return response
+        
+        # 输出长度与输入相当，预留一倍余量
+        return ApiRequest(messages, 0.5, min(8192, max(1024, estimate_tokens(chunk) * 2)), parse)
+    
+    def _format_long_article(self, content: str, title: str, tags: List[str], category: str,
+                             progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+        """
+        长文模式：分片并发排版，元数据基于概要单独分析，最后按原顺序拼接
+        
+        单个片段失败时该片段保留原文，元数据分析失败时沿用传入的元数据。
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        chunks = split_markdown_chunks(content, self.chunk_tokens)
+        print(f"DEBUG: Long document mode, {len(chunks)} chunks")
+        
+        results: List[Optional[str]] = [None] * len(chunks)
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            metadata_future = self._submit(
+                executor, self._analyze_metadata, self._build_summary(content), title, tags, category
+            )
+            futures = {self._submit(executor, self._format_chunk, chunk): i for i, chunk in enumerate(chunks)}
+            
+            done = 0
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result() or chunks[index]
+                except Exception as e:
+                    print(f"Error formatting chunk {index}: {e}")
+                    results[index] = self.local_formatter.format(chunks[index])
+                done += 1
+                if progress_callback is not None:
+                    progress_callback(done / len(chunks), self._completed_prefix(results))
+            
+            try:
+                analyzed = metadata_future.result()
+            except Exception as e:
+                print(f"Error analyzing metadata: {e}")
+                analyzed = None
+        
+        return self._merge_long_article(results, analyzed, title, tags, category)
+    
+    def _completed_prefix(self, results: List[Optional[str]]) -> str:
+        """
+        只返回从头开始已连续完成的片段，保证预览顺序正确
+        """
+        prefix = []
+        for part in results:
+            if part is None:
+                break
+            prefix.append(part)
+        return '\n\n'.join(prefix)
+    
+    def _merge_long_article(self, results: List[str], analyzed: Optional[Dict[str, Any]],
+                            title: str, tags: List[str], category: str) -> Dict[str, Any]:
+        """
+        拼接片段结果并合并元数据；元数据分析失败（analyzed 为 None）时沿用传入的元数据
+        """
+        analyzed = analyzed or {}
+        return {
+            'title': (analyzed.get('title') or title).strip(),
+            'category': (analyzed.get('category') or category).strip(),
+            'tags': analyzed.get('tags') or tags,
+            'content': '\n\n'.join(part.strip() for part in results).strip()
+        }
+    
+    def enrich_article(self, content: str, title: str = '', tags: List[str] = None,
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        并发生成标题、标签和摘要，所有调用共享同一个截止时间
+        
+        参数:
+            content: 文章内容
+            title: 原始标题
+            tags: 已有标签
+            timeout: 截止时间（秒），默认取 DEEPSEEK_ENRICH_TIMEOUT
+            
+        返回:
+            {'title', 'tags', 'description'} 中按时完成的字段，
+            以及 'missing'（超时或失败的字段列表）和 'errors'（失败原因）
+        """
+        from concurrent.futures import ThreadPoolExecutor, wait
+        
+        if not content or content.strip() == '':
+            raise ValueError('文章内容不能为空')
+        
+        timeout = self.enrich_timeout if timeout is None else timeout
+        source = self._enrich_source(content)
+        
+        executor = ThreadPoolExecutor(max_workers=3)
+        futures = {
+            self._submit(executor, self.improve_title, source, title): 'title',
+            self._submit(executor, self.generate_tags, source, tags or []): 'tags',
+            self._submit(executor, self.summarize_content, source): 'description'
+        }
+        done, _ = wait(futures, timeout=timeout)
+        # 不等待超时的调用，其结果直接丢弃
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        outcomes = {}
+        for future, field in futures.items():
+            if future not in done:
+                outcomes[field] = TimeoutError()
+            else:
+                try:
+                    outcomes[field] = future.result()
+                except Exception as e:
+                    outcomes[field] = e
+        
+        return self._collect_enrichment(outcomes)
+    
+    def _enrich_source(self, content: str) -> str:
+        """
+        长文只发送概要，避免三份完整正文拖慢响应
+        """
+        if estimate_tokens(content) > self.long_document_tokens:
+            return self._build_summary(content)
+        return content
+    
+    def _collect_enrichment(self, outcomes: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        汇总各字段的结果；值为异常表示失败，TimeoutError 表示超时
+        """
+        result = {'missing': [], 'errors': {}}
+        for field, value in outcomes.items():
+            if isinstance(value, TimeoutError):
+                result['missing'].append(field)
+                result['errors'][field] = '超时'
+            elif isinstance(value, Exception):
+                result['missing'].append(field)
+                result['errors'][field] = str(value)
+            elif value:
+                result[field] = value
+            else:
+                result['missing'].append(field)
+        return result
+    
     def improve_title(self, content: str, original_title: str = '') -> str:
         """
         优化文章标题
@@ -159,6 +907,12 @@ class DeepSeekService:
         返回:
             优化后的标题
         """
+        try:
+            return self._execute(self._title_request(content, original_title))
+        except requests.exceptions.RequestException as e:
+            raise Exception(f'调用DeepSeek API失败：{str(e)}')
+    
+    def _title_request(self, content: str, original_title: str = '') -> ApiRequest:
         prompt = f"""根据以下文章内容，提炼一个简洁、准确的中文标题。
 
 文章内容：
@@ -184,11 +938,7 @@ class DeepSeekService:
             }
         ]
         
-        try:
-            improved_title = self._call_api(messages, temperature=0.3)
-            return improved_title.strip()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'调用DeepSeek API失败：{str(e)}')
+        return ApiRequest(messages, 0.3, 4096, lambda response: response.strip())
     
     def generate_tags(self, content: str, existing_tags: List[str] = None) -> List[str]:
         """
@@ -201,6 +951,12 @@ class DeepSeekService:
         返回:
             标签列表
         """
+        try:
+            return self._execute(self._tags_request(content, existing_tags))
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            raise Exception(f'生成标签失败：{str(e)}')
+    
+    def _tags_request(self, content: str, existing_tags: List[str] = None) -> ApiRequest:
         prompt = f"""根据以下文章内容，推荐合适的标签。
 
 文章内容：
@@ -227,26 +983,32 @@ class DeepSeekService:
             }
         ]
         
-        try:
-            response = self._call_api(messages, temperature=0.3)
+        def parse(response: str) -> List[str]:
             tags = json.loads(response)
             if isinstance(tags, list):
                 return [str(tag) for tag in tags]
             return []
-        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-            raise Exception(f'生成标签失败：{str(e)}')
+        
+        return ApiRequest(messages, 0.3, 4096, parse)
     
-    def translate_content(self, content: str, target_language: str = '中文') -> str:
+    LANGUAGE_NAMES = {
+        'zh': '中文',
+        'en': 'English',
+        'ja': '日本語',
+        'ko': '한국어',
+        'fr': 'Français',
+        'de': 'Deutsch',
+        'es': 'Español',
+        'ru': 'Русский'
+    }
+    
+    def _translate_chunk(self, content: str, target_language: str) -> str:
         """
-        翻译文章内容
-        
-        参数:
-            content: 要翻译的内容
-            target_language: 目标语言
-            
-        返回:
-            翻译后的内容
+        翻译单个片段（不做切分）
         """
+        return self._execute(self._translate_request(content, target_language))
+    
+    def _translate_request(self, content: str, target_language: str) -> ApiRequest:
         prompt = f"""请将以下文章翻译成{target_language}，保持原有的Markdown格式不变。
 
 文章内容：
@@ -256,7 +1018,8 @@ class DeepSeekService:
 1. 保持Markdown格式不变
 2. 翻译准确、流畅
 3. 专业术语需要准确翻译
-4. 直接返回翻译后的内容，不要包含任何解释。"""
+4. 直接返回翻译后的内容，不要包含任何解释。
+{self._placeholder_rule(content, prefix='5. ')}"""
         
         messages = [
             {
@@ -269,12 +1032,118 @@ class DeepSeekService:
             }
         ]
         
+        max_tokens = min(8192, max(1024, estimate_tokens(content) * 2))
+        return ApiRequest(messages, 0.5, max_tokens, lambda response: response.strip())
+    
+    def translate_content(self, content: str, target_language: str = '中文') -> str:
+        """
+        翻译文章内容
+        
+        长文按片段并发翻译后按顺序拼接。
+        
+        参数:
+            content: 要翻译的内容
+            target_language: 目标语言
+            
+        返回:
+            翻译后的内容
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        compacted, mapping = placeholders.compact(content)
+        chunks = split_markdown_chunks(compacted, self.chunk_tokens)
+        
         try:
-            translated_content = self._call_api(messages, temperature=0.5)
-            return translated_content.strip()
+            if len(chunks) <= 1:
+                translated = self._translate_chunk(compacted, target_language)
+            else:
+                with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+                    futures = [self._submit(executor, self._translate_chunk, chunk, target_language) for chunk in chunks]
+                    parts = [future.result() for future in futures]
+                translated = '\n\n'.join(part.strip() for part in parts)
+            return placeholders.restore(translated, mapping, compacted)[0]
         except requests.exceptions.RequestException as e:
             raise Exception(f'翻译失败：{str(e)}')
     
+    def translate_article(self, content: str, title: str, languages: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        将文章并发翻译为多种语言
+        
+        所有语言的所有片段共用一个线程池，总耗时接近单次翻译。
+        
+        参数:
+            content: 文章内容（Markdown，不含 front matter）
+            title: 文章标题
+            languages: 目标语言代码列表，如 ['en', 'ja']
+            
+        返回:
+            {语言代码: {'success': True, 'title': ..., 'content': ...}
+                      或 {'success': False, 'error': ...}}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        compacted, mapping = placeholders.compact(content)
+        chunks = split_markdown_chunks(compacted, self.chunk_tokens) or [compacted]
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            futures = {}
+            for lang in languages:
+                target = self.LANGUAGE_NAMES.get(lang, lang)
+                futures[lang] = {
+                    'title': self._submit(executor, self._translate_title, title, target) if title else None,
+                    'chunks': [self._submit(executor, self._translate_chunk, chunk, target) for chunk in chunks]
+                }
+            
+            results = {}
+            for lang, pending in futures.items():
+                try:
+                    parts = [future.result() for future in pending['chunks']]
+                    translated_title = pending['title'].result() if pending['title'] else ''
+                    results[lang] = self._translation_result(parts, translated_title, title, mapping, compacted)
+                except Exception as e:
+                    results[lang] = self._translation_error(lang, e)
+        
+        return results
+    
+    def _translation_result(self, parts: List[str], translated_title: str, title: str,
+                            mapping: Dict[str, str], compacted: str) -> Dict[str, Any]:
+        """
+        拼接单个语言的翻译片段并还原占位符
+        """
+        translated = '\n\n'.join(part.strip() for part in parts)
+        return {
+            'success': True,
+            'title': translated_title or title,
+            'content': placeholders.restore(translated, mapping, compacted)[0]
+        }
+    
+    def _translation_error(self, lang: str, error: Exception) -> Dict[str, Any]:
+        print(f"Error translating to {lang}: {error}")
+        return {
+            'success': False,
+            'error': f'翻译失败：{str(error)}'
+        }
+    
+    def _translate_title(self, title: str, target_language: str) -> str:
+        """
+        翻译文章标题
+        """
+        return self._execute(self._translate_title_request(title, target_language))
+    
+    def _translate_title_request(self, title: str, target_language: str) -> ApiRequest:
+        messages = [
+            {
+                'role': 'system',
+                'content': f'你是一个专业的翻译专家，擅长将标题翻译成{target_language}。'
+            },
+            {
+                'role': 'user',
+                'content': f'请将以下博客文章标题翻译成{target_language}，直接返回译文，不要包含引号或任何解释。\n\n{title}'
+            }
+        ]
+        
+        return ApiRequest(messages, 0.3, 200, lambda response: response.strip().strip('"'))
+    
     def summarize_content(self, content: str, max_length: int = 200) -> str:
         """
         生成文章摘要
@@ -286,6 +1155,12 @@ class DeepSeekService:
         返回:
             文章摘要
         """
+        try:
+            return self._execute(self._summary_request(content, max_length))
+        except requests.exceptions.RequestException as e:
+            raise Exception(f'生成摘要失败：{str(e)}')
+    
+    def _summary_request(self, content: str, max_length: int = 200) -> ApiRequest:
         prompt = f"""请为以下文章生成一段摘要。
 
 文章内容：
@@ -308,8 +1183,4 @@ class DeepSeekService:
             }
         ]
         
-        try:
-            summary = self._call_api(messages, temperature=0.5)
-            return summary.strip()
-        except requests.exceptions.RequestException as e:
-            raise Exception(f'生成摘要失败：{str(e)}')
+        return ApiRequest(messages, 0.5, 4096, lambda response: response.strip())
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS/Atom 订阅：条件请求轮询订阅源，只处理没见过的条目，每次轮询的新文章合并为一次提交
+"""
+
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+import contextvars
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..utils.web_scraper import REQUEST_HEADERS, CHUNK_SIZE, BodyReader
+from ..utils.lazy import lazy_import
+
+requests = lazy_import('requests')
+
+
+FEED_HEADERS = dict(REQUEST_HEADERS, Accept='application/rss+xml, application/atom+xml, application/xml;q=0.9, */*;q=0.8')
+
+# 连续失败达到该次数的条目不再重试
+MAX_ATTEMPTS = 3
+
+
+def _local(tag: str) -> str:
+    """去掉命名空间，RSS 2.0 / RSS 1.0 / Atom 按本地名统一处理"""
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _child(element, *names: str) -> Optional[ET.Element]:
+    for name in names:
+        for child in element:
+            if _local(child.tag) == name:
+                return child
+    return None
+
+
+def _text(element, *names: str) -> str:
+    child = _child(element, *names)
+    return (child.text or '').strip() if child is not None else ''
+
+
+def _iso_date(value: str) -> str:
+    """
+    RFC 822（RSS）或 ISO 8601（Atom）日期转为 front matter 使用的格式，无法解析时返回空字符串
+    """
+    if not value:
+        return ''
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return ''
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone(timedelta(hours=8))).strftime('%Y-%m-%dT%H:%M:%S+08:00')
+
+
+def parse_feed(body: bytes) -> List[Dict[str, str]]:
+    """
+    解析 RSS/Atom 文档
+
+    返回:
+        条目列表（按订阅源中的顺序），每项包含 guid、title、link、date、html
+    """
+    root = ET.fromstring(body)
+    entries = []
+    for element in root.iter():
+        name = _local(element.tag)
+        if name == 'item':
+            link = _text(element, 'link')
+            entry = {
+                'guid': _text(element, 'guid') or link,
+                'title': _text(element, 'title'),
+                'link': link,
+                'date': _iso_date(_text(element, 'pubDate', 'date')),
+                'html': _text(element, 'encoded') or _text(element, 'description')
+            }
+        elif name == 'entry':
+            link = ''
+            for child in element:
+                if _local(child.tag) == 'link' and child.get('rel', 'alternate') == 'alternate':
+                    link = child.get('href', '')
+                    break
+            content = _child(element, 'content', 'summary')
+            entry = {
+                'guid': _text(element, 'id') or link,
+                'title': _text(element, 'title'),
+                'link': link,
+                'date': _iso_date(_text(element, 'published', 'updated')),
+                'html': ''.join(content.itertext()).strip() if content is not None else ''
+            }
+        else:
+            continue
+        if entry['guid']:
+            entries.append(entry)
+    return entries
+
+
+class FeedPoller:
+    """
+    订阅轮询
+
+    订阅信息、条件请求的校验值和已处理条目（guid 索引）保存在 SQLite 中，进程重启后继续增量处理。
+    新条目由 prepare 回调（抓取 → 排版 → 生成文件）并发处理，成功的文件通过 upload_files 一次提交，
+    提交成功后才记为已处理；失败的条目在之后的轮询中重试，最多 MAX_ATTEMPTS 次。
+    """
+
+    def __init__(self, github_service, prepare: Callable[[Dict[str, str], Dict[str, Any]], List[Dict[str, Any]]]):
+        self.github_service = github_service
+        self.prepare = prepare
+        self.max_workers = max(1, int(os.environ.get('FEED_MAX_CONCURRENCY', 4)))
+        self.state_path = os.environ.get('FEED_STATE_PATH') or os.path.join(
+            tempfile.gettempdir(), 'hugo-publisher-feeds.sqlite3'
+        )
+        self._local = threading.local()
+        self._poll_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # 状态库在第一次使用时才创建
+            self._init_db(conn)
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute('''CREATE TABLE IF NOT EXISTS feeds (
+            url TEXT PRIMARY KEY, target_dir TEXT, category TEXT, tags TEXT, auto_format INTEGER,
+            localize_images INTEGER, backfill INTEGER, etag TEXT, last_modified TEXT, last_polled REAL)''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS seen (
+            feed_url TEXT, guid TEXT, status TEXT, attempts INTEGER, path TEXT, updated REAL,
+            PRIMARY KEY (feed_url, guid))''')
+
+    def subscribe(self, url: str, target_dir: str = 'content/posts', category: str = '',
+                  tags: Optional[List[str]] = None, auto_format: bool = True,
+                  localize_images: bool = False, backfill: int = 0) -> Dict[str, Any]:
+        """
+        添加或更新订阅
+
+        参数:
+            backfill: 首次轮询时发布的最新条目数，其余已有条目只记为已处理
+        """
+        self._connect().execute(
+            '''INSERT INTO feeds (url, target_dir, category, tags, auto_format, localize_images, backfill)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET target_dir = excluded.target_dir, category = excluded.category,
+               tags = excluded.tags, auto_format = excluded.auto_format, localize_images = excluded.localize_images''',
+            (url, target_dir, category, ','.join(tags or []), int(auto_format), int(localize_images), backfill)
+        )
+        return self.get_feed(url)
+
+    def unsubscribe(self, url: str) -> bool:
+        conn = self._connect()
+        deleted = conn.execute('DELETE FROM feeds WHERE url = ?', (url,)).rowcount
+        conn.execute('DELETE FROM seen WHERE feed_url = ?', (url,))
+        return deleted > 0
+
+    def get_feed(self, url: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute('SELECT * FROM feeds WHERE url = ?', (url,)).fetchone()
+        return self._feed_dict(row) if row else None
+
+    def list_feeds(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute('SELECT * FROM feeds ORDER BY url').fetchall()
+        return [self._feed_dict(row) for row in rows]
+
+    def _feed_dict(self, row) -> Dict[str, Any]:
+        feed = dict(row)
+        feed['tags'] = [t for t in (feed['tags'] or '').split(',') if t]
+        feed['auto_format'] = bool(feed['auto_format'])
+        feed['localize_images'] = bool(feed['localize_images'])
+        return feed
+
+    def poll_all(self) -> Dict[str, Any]:
+        """
+        轮询全部订阅，所有订阅的新文章合并为一次提交
+
+        返回:
+            {'success', 'feeds': {订阅地址: 状态}, 'published': [文件路径], 'failed': [条目],
+             'skipped': [条目], 'commit_sha'}
+        """
+        # 定时轮询与手动触发不重叠，避免同一条目被处理两次
+        with self._poll_lock:
+            report = {'success': True, 'feeds': {}, 'published': [], 'failed': [], 'skipped': [], 'commit_sha': ''}
+            polled, work = [], []
+            for feed in self.list_feeds():
+                try:
+                    entries, headers = self._new_entries(feed)
+                    report['feeds'][feed['url']] = {'new': len(entries)}
+                    polled.append((feed, headers))
+                    work.extend((feed, entry) for entry in entries)
+                except Exception as e:
+                    print(f"Warning: feed poll failed {feed['url']}: {e}")
+                    report['feeds'][feed['url']] = {'error': str(e)}
+
+            retry = set()
+            if work:
+                try:
+                    self._publish(work, report)
+                except Exception as e:
+                    print(f"Warning: feed publish failed: {e}")
+                    report['error'] = str(e)
+                    retry.update(feed['url'] for feed, _ in work)
+            retry.update(item['feed'] for item in report['failed'])
+            for feed, headers in polled:
+                # 校验值在发布完成后才保存；有条目失败时清空，下次轮询即使订阅源未更新也能拿到这些条目重试
+                self._record_poll(feed, None if feed['url'] in retry else headers)
+            report['success'] = (not report['failed'] and 'error' not in report and
+                                 all('error' not in f for f in report['feeds'].values()))
+            return report
+
+    def _new_entries(self, feed: Dict[str, Any]) -> Tuple[List[Dict[str, str]], Any]:
+        """
+        条件请求获取订阅源
+
+        返回:
+            (尚未处理的条目（从旧到新）, 响应头)，校验值由调用方在发布完成后保存
+        """
+        headers = dict(FEED_HEADERS)
+        if feed['etag']:
+            headers['If-None-Match'] = feed['etag']
+        if feed['last_modified']:
+            headers['If-Modified-Since'] = feed['last_modified']
+
+        response = requests.get(feed['url'], headers=headers, timeout=10, stream=True)
+        try:
+            if response.status_code == 304:
+                return [], response.headers
+            response.raise_for_status()
+            reader = BodyReader(feed['url'])
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if not reader.feed(chunk):
+                    break
+            entries = parse_feed(reader.body)
+        finally:
+            response.close()
+
+        conn = self._connect()
+        seen = {
+            row['guid']: row for row in conn.execute(
+                'SELECT guid, status, attempts FROM seen WHERE feed_url = ?', (feed['url'],)
+            )
+        }
+        new = [e for e in entries if e['guid'] not in seen or
+               (seen[e['guid']]['status'] == 'failed' and seen[e['guid']]['attempts'] < MAX_ATTEMPTS)]
+
+        if feed['last_polled'] is None:
+            # 首次轮询：只发布最新的 backfill 条，其余记为已处理
+            keep = {e['guid'] for e in self._newest(entries, feed['backfill'])}
+            self._mark(feed['url'], [e for e in new if e['guid'] not in keep], 'skipped')
+            new = [e for e in new if e['guid'] in keep]
+
+        return list(reversed(self._newest(new, len(new)))), response.headers
+
+    def _newest(self, entries: List[Dict[str, str]], count: int) -> List[Dict[str, str]]:
+        if count <= 0:
+            return []
+        if all(e['date'] for e in entries):
+            return sorted(entries, key=lambda e: e['date'], reverse=True)[:count]
+        # 没有日期时按订阅源的顺序（通常最新在前）
+        return entries[:count]
+
+    def _record_poll(self, feed: Dict[str, Any], headers):
+        """
+        保存轮询时间和条件请求的校验值，headers 为 None 时清空校验值
+        """
+        if headers is None:
+            etag = last_modified = None
+        else:
+            etag = headers.get('ETag') or feed['etag']
+            last_modified = headers.get('Last-Modified') or feed['last_modified']
+        self._connect().execute(
+            'UPDATE feeds SET etag = ?, last_modified = ?, last_polled = ? WHERE url = ?',
+            (etag, last_modified, time.time(), feed['url'])
+        )
+        feed['last_polled'] = time.time()
+
+    def _publish(self, work, report: Dict[str, Any]):
+        """
+        并发处理新条目，成功生成的文件合并为一次提交
+        """
+        def run(item):
+            feed, entry = item
+            options = {
+                'target_dir': feed['target_dir'],
+                'category': feed['category'],
+                'tags': list(feed['tags']),
+                'auto_format': feed['auto_format'],
+                'localize_images': feed['localize_images']
+            }
+            try:
+                return self.prepare(entry, options), ''
+            except Exception as e:
+                return None, str(e)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(work))) as executor:
+            # 复制上下文，使工作线程中的 AI 调用沿用调用方的优先级和用量统计
+            results = list(executor.map(lambda item: contextvars.copy_context().run(run, item), work))
+
+        files, prepared = [], []
+        used_paths = set()
+        for (feed, entry), (entry_files, error) in zip(work, results):
+            if entry_files is None:
+                print(f"Warning: feed entry failed {entry['link']}: {error}")
+                report['failed'].append({'feed': feed['url'], 'guid': entry['guid'], 'link': entry['link'], 'error': error})
+                self._mark(feed['url'], [entry], 'failed')
+                continue
+            # 同一次轮询中标题相同的文章不互相覆盖：文章路径已被占用时跳过该条目，重复的图片只上传一次
+            if entry_files and entry_files[0]['path'] in used_paths:
+                reason = f"与同一次轮询中的另一篇文章路径相同：{entry_files[0]['path']}"
+                print(f"Warning: feed entry skipped {entry['link']}: {reason}")
+                report['skipped'].append({'feed': feed['url'], 'guid': entry['guid'], 'link': entry['link'],
+                                          'reason': reason})
+                self._mark(feed['url'], [entry], 'skipped')
+                continue
+            entry_files = [f for f in entry_files if f['path'] not in used_paths]
+            if not entry_files:
+                report['failed'].append({'feed': feed['url'], 'guid': entry['guid'], 'link': entry['link'],
+                                         'error': '没有生成文件'})
+                self._mark(feed['url'], [entry], 'failed')
+                continue
+            used_paths.update(f['path'] for f in entry_files)
+            files.extend(entry_files)
+            prepared.append((feed, entry, entry_files[0]['path']))
+
+        if not files:
+            return
+
+        result = self.github_service.upload_files(files, message=f'Publish {len(prepared)} posts from feeds')
+        if not result['success']:
+            for feed, entry, _ in prepared:
+                report['failed'].append({'feed': feed['url'], 'guid': entry['guid'], 'link': entry['link'],
+                                         'error': result.get('error', '上传失败')})
+                self._mark(feed['url'], [entry], 'failed')
+            return
+
+        report['commit_sha'] = result.get('commit_sha', '')
+        for feed, entry, path in prepared:
+            self._mark(feed['url'], [entry], 'published', path)
+            report['published'].append(path)
+
+    def _mark(self, feed_url: str, entries: List[Dict[str, str]], status: str, path: str = ''):
+        if not entries:
+            return
+        self._connect().executemany(
+            '''INSERT INTO seen (feed_url, guid, status, attempts, path, updated) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(feed_url, guid) DO UPDATE SET status = excluded.status, path = excluded.path,
+               updated = excluded.updated,
+               attempts = CASE WHEN excluded.status = 'failed' THEN seen.attempts + 1 ELSE seen.attempts END''',
+            [(feed_url, e['guid'], status, 1 if status == 'failed' else 0, path, time.time()) for e in entries]
+        )
+
+    def start(self, interval: float):
+        """
+        启动后台线程，每 interval 秒轮询一次
+        """
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    report = self.poll_all()
+                    if report['published'] or report['failed']:
+                        print(f"Feed poll: {len(report['published'])} published, {len(report['failed'])} failed")
+                except Exception as e:
+                    print(f"Feed poll exception: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
@@ -4,10 +4,79 @@
 GitHub上传服务
 """
 
+import io
 import os
+import re
+import json
 import base64
-import requests
-from typing import Optional, Dict, Any
+import hashlib
+from typing import Optional, Dict, Any, List, BinaryIO
+
+from ..utils.lazy import lazy_import
+
+requests = lazy_import('requests')
+
+
+# 每次读取的字节数，取 3 的倍数使各块的 base64 结果可以直接拼接
+ENCODE_CHUNK = 3 * 64 * 1024
+
+
+class Base64JsonBody:
+    """
+    流式生成 {..., "content": "<base64>"} 形式的请求体
+
+    源文件分块读取、分块编码，内存占用与文件大小无关；
+    长度可预先算出，请求仍带 Content-Length 而不是分块传输。
+    """
+    
+    def __init__(self, fields: Dict[str, Any], source: BinaryIO, field: str = 'content'):
+        self.source = source
+        self.start = source.tell()
+        self.size = source.seek(0, os.SEEK_END) - self.start
+        source.seek(self.start)
+        head = json.dumps(fields)[:-1]
+        separator = ', ' if fields else ''
+        self.prefix = f'{head}{separator}{json.dumps(field)}: "'.encode('utf-8')
+        self.suffix = b'"}'
+    
+    def __len__(self) -> int:
+        return len(self.prefix) + (self.size + 2) // 3 * 4 + len(self.suffix)
+    
+    def __iter__(self):
+        self.source.seek(self.start)
+        yield self.prefix
+        pending = b''
+        for chunk in iter(lambda: self.source.read(ENCODE_CHUNK), b''):
+            data = pending + chunk
+            cut = len(data) - len(data) % 3
+            yield base64.b64encode(data[:cut])
+            pending = data[cut:]
+        if pending:
+            yield base64.b64encode(pending)
+        yield self.suffix
+
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    按 git 的方式计算 blob 的 SHA-1，与 GitHub 返回的文件 sha 一致
+    """
+    digest = hashlib.sha1(f'blob {len(data)}\0'.encode('ascii'))
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def stream_blob_sha(source: BinaryIO) -> str:
+    """
+    git_blob_sha 的文件对象版本，分块读取，读完后回到原位置
+    """
+    start = source.tell()
+    size = source.seek(0, os.SEEK_END) - start
+    source.seek(start)
+    digest = hashlib.sha1(f'blob {size}\0'.encode('ascii'))
+    for chunk in iter(lambda: source.read(ENCODE_CHUNK), b''):
+        digest.update(chunk)
+    source.seek(start)
+    return digest.hexdigest()
 
 
 class GitHubService:
@@ -56,8 +125,15 @@ class GitHubService:
         except requests.exceptions.RequestException as e:
             raise Exception(f'获取文件SHA失败：{str(e)}')
     
+    def file_exists(self, path: str) -> bool:
+        """
+        判断仓库中是否已存在该文件
+        """
+        return self._get_file_sha(path.lstrip('/')) is not None
+    
     def upload_file(self, content: str, filename: str, target_dir: str = 'content/posts',
-                   message: str = 'Update file', branch: str = 'main') -> Dict[str, Any]:
+                   message: str = 'Update file', branch: str = 'main', is_binary: bool = False,
+                   known_sha: Optional[str] = None) -> Dict[str, Any]:
         """
         上传文件到GitHub仓库
         
@@ -67,20 +143,27 @@ class GitHubService:
             target_dir: 目标目录
             message: 提交信息
             branch: 分支名
+            is_binary: 为 True 时 content 已是 base64 编码的字符串
+            known_sha: 调用方已知的远端文件 sha，提供时不再查询
             
         返回:
             包含上传结果的字典
         """
+        if not is_binary:
+            return self.upload_stream(io.BytesIO(content.encode('utf-8')), filename, target_dir, message, branch,
+                                      known_sha=known_sha)
+        
         path = f'{target_dir}/{filename}'.lstrip('/')
         
         try:
-            sha = self._get_file_sha(path)
+            sha = known_sha or self._get_file_sha(path)
             
-            encoded_content = base64.b64encode(content.encode('utf-8')).decode('utf-8')
+            if sha and sha == git_blob_sha(base64.b64decode(content)):
+                return self._unchanged_result(path, sha, branch)
             
             payload = {
                 'message': message,
-                'content': encoded_content,
+                'content': content,
                 'branch': branch
             }
             
@@ -108,6 +191,174 @@ class GitHubService:
                 'error': str(e)
             }
     
+    def upload_stream(self, source: BinaryIO, filename: str, target_dir: str = 'content/posts',
+                      message: str = 'Update file', branch: str = 'main',
+                      known_sha: Optional[str] = None) -> Dict[str, Any]:
+        """
+        从文件对象上传文件，边读取边编码，适合大文件
+        
+        内容与仓库中的文件相同（git blob sha 一致）时不提交，返回结果中 unchanged 为 True。
+        
+        参数:
+            source: 以二进制方式读取的文件对象（需支持 seek）
+            filename: 文件名
+            target_dir: 目标目录
+            message: 提交信息
+            branch: 分支名
+            known_sha: 调用方已知的远端文件 sha，提供时不再查询
+            
+        返回:
+            包含上传结果的字典
+        """
+        path = f'{target_dir}/{filename}'.lstrip('/')
+        
+        try:
+            sha = known_sha or self._get_file_sha(path)
+            
+            if sha and sha == stream_blob_sha(source):
+                return self._unchanged_result(path, sha, branch)
+            
+            fields = {
+                'message': message,
+                'branch': branch
+            }
+            
+            if sha:
+                fields['sha'] = sha
+            
+            url = f'{self.base_url}/repos/{self.username}/{self.repo}/contents/{path}'
+            
+            response = requests.put(url, headers=self.headers, data=Base64JsonBody(fields, source), timeout=60)
+            
+            response.raise_for_status()
+            
+            result = response.json()
+            
+            return {
+                'success': True,
+                'file_path': path,
+                'url': result.get('content', {}).get('html_url', ''),
+                'sha': result.get('content', {}).get('sha', '')
+            }
+        
+        except requests.exceptions.RequestException as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _unchanged_result(self, path: str, sha: str, branch: str) -> Dict[str, Any]:
+        print(f"Skip unchanged file: {path}")
+        return {
+            'success': True,
+            'file_path': path,
+            'url': f'https://github.com/{self.username}/{self.repo}/blob/{branch}/{path}',
+            'sha': sha,
+            'unchanged': True
+        }
+    
+    def upload_files(self, files: List[Dict[str, Any]], message: str = 'Update files',
+                     branch: str = 'main') -> Dict[str, Any]:
+        """
+        通过 Git Data API 将多个文件放在同一次提交中上传
+        
+        参数:
+            files: 文件列表，每项包含 path、content，可选 is_binary
+                   （为 True 时 content 应为 base64 编码的字符串）；delete 为 True 时删除该文件
+            message: 提交信息
+            branch: 分支名
+            
+        返回:
+            包含上传结果的字典，files 为每个文件的 file_path 和 url
+        """
+        repo_url = f'{self.base_url}/repos/{self.username}/{self.repo}'
+        
+        try:
+            response = requests.get(f'{repo_url}/git/ref/heads/{branch}', headers=self.headers, timeout=10)
+            response.raise_for_status()
+            head_sha = response.json()['object']['sha']
+            
+            response = requests.get(f'{repo_url}/git/commits/{head_sha}', headers=self.headers, timeout=10)
+            response.raise_for_status()
+            base_tree = response.json()['tree']['sha']
+            
+            tree = []
+            for f in files:
+                path = f['path'].lstrip('/')
+                entry = {'path': path, 'mode': '100644', 'type': 'blob'}
+                if f.get('delete'):
+                    # sha 为 null 表示从树中删除该文件
+                    entry['sha'] = None
+                elif f.get('is_binary'):
+                    # 二进制文件需先创建 blob，树接口只接受 UTF-8 文本内容
+                    response = requests.post(
+                        f'{repo_url}/git/blobs',
+                        headers=self.headers,
+                        json={'content': f['content'], 'encoding': 'base64'},
+                        timeout=30
+                    )
+                    response.raise_for_status()
+                    entry['sha'] = response.json()['sha']
+                else:
+                    entry['content'] = f['content']
+                tree.append(entry)
+            
+            response = requests.post(
+                f'{repo_url}/git/trees',
+                headers=self.headers,
+                json={'base_tree': base_tree, 'tree': tree},
+                timeout=30
+            )
+            response.raise_for_status()
+            tree_sha = response.json()['sha']
+            
+            uploaded = [
+                {
+                    'file_path': entry['path'],
+                    'url': f'https://github.com/{self.username}/{self.repo}/blob/{branch}/{entry["path"]}'
+                }
+                for entry in tree
+            ]
+            
+            if tree_sha == base_tree:
+                # 所有文件与当前版本相同，新树与基准树一致，不产生空提交
+                print(f"Skip unchanged commit: {message}")
+                return {
+                    'success': True,
+                    'commit_sha': head_sha,
+                    'unchanged': True,
+                    'files': uploaded
+                }
+            
+            response = requests.post(
+                f'{repo_url}/git/commits',
+                headers=self.headers,
+                json={'message': message, 'tree': tree_sha, 'parents': [head_sha]},
+                timeout=30
+            )
+            response.raise_for_status()
+            commit_sha = response.json()['sha']
+            
+            response = requests.patch(
+                f'{repo_url}/git/refs/heads/{branch}',
+                headers=self.headers,
+                json={'sha': commit_sha},
+                timeout=30
+            )
+            response.raise_for_status()
+            
+            return {
+                'success': True,
+                'commit_sha': commit_sha,
+                'files': uploaded
+            }
+        
+        except requests.exceptions.RequestException as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def create_directory(self, path: str, message: str = 'Create directory') -> Dict[str, Any]:
         """
         在GitHub仓库中创建目录
@@ -246,7 +497,6 @@ class GitHubService:
         返回:
             包含文件列表的字典
         """
-        import re
         from concurrent.futures import ThreadPoolExecutor
 
         try:
@@ -264,24 +514,13 @@ class GitHubService:
             file_list = []
             
             def process_file(f):
-                item = {
-                    'name': f.get('name', ''),
-                    'path': f.get('path', ''),
-                    'type': f.get('type', ''),
-                    'size': f.get('size', 0),
-                    'url': f.get('html_url', ''),
-                    'updated_at': None # 默认占位
-                }
+                item = self._file_item(f)
                 
-                if fetch_metadata and item['type'] == 'file' and item['name'].endswith(('.md', '.markdown')):
+                if fetch_metadata and self._wants_metadata(item):
                     try:
                         content_res = self.get_file_content(item['path'])
                         if content_res['success']:
-                            content = content_res['content']
-                            # 简单正则提取 date: "..."
-                            date_match = re.search(r'^date:\s*["\']?(.+?)["\']?\s*$', content, re.MULTILINE)
-                            if date_match:
-                                item['updated_at'] = date_match.group(1)
+                            item['updated_at'] = self._front_matter_date(content_res['content'])
                     except Exception as e:
                         print(f"Error fetching metadata for {item['name']}: {e}")
                 
@@ -306,6 +545,27 @@ class GitHubService:
                 'error': str(e)
             }
     
+    def _file_item(self, f: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'name': f.get('name', ''),
+            'path': f.get('path', ''),
+            'type': f.get('type', ''),
+            'size': f.get('size', 0),
+            'sha': f.get('sha', ''),
+            'url': f.get('html_url', ''),
+            'updated_at': None # 默认占位
+        }
+    
+    def _wants_metadata(self, item: Dict[str, Any]) -> bool:
+        return item['type'] == 'file' and item['name'].endswith(('.md', '.markdown'))
+    
+    def _front_matter_date(self, content: str) -> Optional[str]:
+        """
+        简单正则提取 date: "..."
+        """
+        date_match = re.search(r'^date:\s*["\']?(.+?)["\']?\s*$', content, re.MULTILINE)
+        return date_match.group(1) if date_match else None
+    
     def get_repo_info(self) -> Dict[str, Any]:
         """
         获取仓库信息
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片本地化：并发下载文章引用的外链图片，按内容哈希去重，并把 Markdown 中的地址改为仓库内路径
+"""
+
+import os
+import re
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ..utils.lazy import lazy_import
+
+requests = lazy_import('requests')
+
+
+IMAGE = re.compile(r'(!\[[^\]\n]*\]\()([^)\s]+)((?:\s+"[^"\n]*")?\))')
+
+# 按文件头识别图片格式，防盗链返回的 HTML 占位页会被识别为失败
+SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+]
+
+DOWNLOAD_HEADERS = {
+    # 不带 Referer，多数图床（如微信）只拦截来自其他站点的引用
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/png,image/svg+xml,image/*;q=0.8,*/*;q=0.5'
+}
+
+
+def find_image_urls(content: str) -> List[str]:
+    """
+    返回 Markdown 中引用的外链图片地址（去重，保持出现顺序）
+    """
+    urls = []
+    for match in IMAGE.finditer(content):
+        url = match.group(2)
+        if url.startswith(('http://', 'https://', '//')) and url not in urls:
+            urls.append(url)
+    return urls
+
+
+def sniff_extension(data: bytes) -> Optional[str]:
+    """
+    根据文件头判断图片扩展名，不是图片时返回 None
+    """
+    for signature, ext in SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[4:8] == b'ftyp' and data[8:12] in (b'avif', b'avis'):
+        return 'avif'
+    head = data[:512].lstrip().lower()
+    if head.startswith(b'<svg') or (head.startswith(b'<?xml') and b'<svg' in head):
+        return 'svg'
+    return None
+
+
+def rewrite_images(content: str, mapping: Dict[str, str]) -> str:
+    """
+    把图片地址替换为本地路径，未下载成功的图片保持原样
+    """
+    return IMAGE.sub(lambda m: m.group(1) + mapping.get(m.group(2), m.group(2)) + m.group(3), content)
+
+
+class ImageLocalizer:
+    """
+    图片本地化
+
+    所有图片同时下载（总并发 max_workers，同一域名最多 per_host 个），
+    总耗时约等于最慢的一张图片。文件以内容哈希命名，同一张图片只保存一次。
+    """
+
+    def __init__(self):
+        self.max_workers = max(1, int(os.environ.get('IMAGE_MAX_WORKERS', 32)))
+        self.per_host = max(1, int(os.environ.get('IMAGE_PER_HOST', 10)))
+        self.max_bytes = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+        self.timeout = float(os.environ.get('IMAGE_TIMEOUT', 15))
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def localize(self, content: str, prefix: str = '/images/') -> Dict[str, Any]:
+        """
+        下载并替换文章中的外链图片
+
+        参数:
+            content: Markdown内容
+            prefix: 替换后的地址前缀，如 /images/（static 目录）或空字符串（页面包内相对路径）
+
+        返回:
+            {'content': 替换后的内容, 'images': {文件名: 图片数据}, 'failed': [下载失败的地址]}
+        """
+        urls = find_image_urls(content)
+        if not urls:
+            return {'content': content, 'images': {}, 'failed': []}
+
+        with ThreadPoolExecutor(max_workers=min(len(urls), self.max_workers)) as executor:
+            downloads = list(executor.map(self._download, urls))
+
+        return self.collect(content, urls, downloads, prefix)
+
+    def collect(self, content: str, urls: List[str], downloads: List[Tuple[Optional[bytes], str]],
+                prefix: str) -> Dict[str, Any]:
+        """
+        按内容哈希去重并改写地址（同步与异步下载共用）
+        """
+        images: Dict[str, bytes] = {}
+        mapping: Dict[str, str] = {}
+        failed = []
+        for url, (data, error) in zip(urls, downloads):
+            if data is None:
+                print(f"Warning: image not localized {url}: {error}")
+                failed.append(url)
+                continue
+            name = f'{hashlib.sha256(data).hexdigest()[:16]}.{sniff_extension(data)}'
+            images.setdefault(name, data)
+            mapping[url] = f'{prefix}{name}'
+
+        return {'content': rewrite_images(content, mapping), 'images': images, 'failed': failed}
+
+    def host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def _download(self, url: str) -> Tuple[Optional[bytes], str]:
+        """
+        返回 (图片数据, '') 或 (None, 失败原因)
+        """
+        full_url = f'https:{url}' if url.startswith('//') else url
+        try:
+            with self.host_slot(full_url):
+                response = requests.get(full_url, headers=DOWNLOAD_HEADERS, timeout=self.timeout, stream=True)
+                try:
+                    response.raise_for_status()
+                    chunks, size = [], 0
+                    for chunk in response.iter_content(64 * 1024):
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            return None, f'超过 {self.max_bytes} 字节'
+                        chunks.append(chunk)
+                finally:
+                    response.close()
+            return self.validate(b''.join(chunks))
+        except requests.exceptions.RequestException as e:
+            return None, str(e)
+
+    def validate(self, data: bytes) -> Tuple[Optional[bytes], str]:
+        if not sniff_extension(data):
+            return None, '不是图片'
+        return data, ''
+
+
+def image_files(images: Dict[str, bytes], directory: str) -> List[Dict[str, Any]]:
+    """
+    转换为 GitHubService.upload_files 接受的文件列表
+    """
+    return [
+        {
+            'path': f'{directory}/{name}',
+            'content': base64.b64encode(data).decode('ascii'),
+            'is_binary': True
+        }
+        for name, data in images.items()
+    ]
+
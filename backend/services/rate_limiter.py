@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+DeepSeek调用限流（RPM/TPM），跨线程、跨进程共享
+"""
+
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+from typing import Optional
+
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+
+
+class RateLimitTimeout(Exception):
+    """等待配额超时"""
+
+
+class RateLimiter:
+    """
+    基于 SQLite 的一分钟滑动窗口限流器
+
+    同一台机器上的多个进程（如 gunicorn 多 worker）共用同一个状态文件。
+    批量任务最多使用 (1 - interactive_reserve) 的配额，剩余部分留给交互请求；
+    同一进程内有交互请求在等待时，批量任务会让行。
+    """
+
+    WINDOW = 60.0
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, state_path: Optional[str] = None,
+                 interactive_reserve: float = 0.2):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.interactive_reserve = interactive_reserve
+        self.state_path = state_path or os.path.join(tempfile.gettempdir(), 'hugo-publisher-ratelimit.sqlite3')
+        self._local = threading.local()
+        self._waiting_interactive = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.state_path, timeout=30, isolation_level=None)
+            # 状态库在第一次使用时才创建，导入模块不产生文件
+            self._init_db(conn)
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute('CREATE TABLE IF NOT EXISTS calls (id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, tokens INTEGER)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_calls_ts ON calls (ts)')
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_BATCH, timeout: float = 120) -> Optional[int]:
+        """
+        阻塞直到窗口内有足够配额，并登记本次调用
+
+        参数:
+            tokens: 预估的 token 数（提示词 + 预计输出）
+            priority: PRIORITY_INTERACTIVE 或 PRIORITY_BATCH
+            timeout: 最长等待时间（秒）
+
+        返回:
+            登记记录的 ID，用于调用结束后按实际用量修正；未启用限流时返回 None
+        """
+        if not self.enabled:
+            return None
+
+        interactive = priority == PRIORITY_INTERACTIVE
+        tokens, rpm_limit, tpm_limit = self._limits(tokens, interactive)
+
+        deadline = time.monotonic() + timeout
+        if interactive:
+            with self._lock:
+                self._waiting_interactive += 1
+        try:
+            while True:
+                wait = None
+                if interactive or not self._waiting_interactive:
+                    row_id, wait = self._try_acquire(tokens, rpm_limit, tpm_limit)
+                    if row_id is not None:
+                        return row_id
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitTimeout('DeepSeek调用配额不足，等待超时')
+                time.sleep(max(0.05, min(wait or 0.2, remaining, 1.0)))
+        finally:
+            if interactive:
+                with self._lock:
+                    self._waiting_interactive -= 1
+
+    async def acquire_async(self, tokens: int, priority: str = PRIORITY_BATCH, timeout: float = 120) -> Optional[int]:
+        """
+        acquire 的协程版本，等待期间不占用线程
+
+        SQLite 事务（BEGIN IMMEDIATE 在争用时最多阻塞 30 秒）在线程池中执行，不阻塞事件循环。
+        """
+        import asyncio
+
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+
+        interactive = priority == PRIORITY_INTERACTIVE
+        tokens, rpm_limit, tpm_limit = self._limits(tokens, interactive)
+
+        deadline = time.monotonic() + timeout
+        if interactive:
+            with self._lock:
+                self._waiting_interactive += 1
+        try:
+            while True:
+                wait = None
+                if interactive or not self._waiting_interactive:
+                    row_id, wait = await loop.run_in_executor(None, self._try_acquire, tokens, rpm_limit, tpm_limit)
+                    if row_id is not None:
+                        return row_id
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RateLimitTimeout('DeepSeek调用配额不足，等待超时')
+                await asyncio.sleep(max(0.05, min(wait or 0.2, remaining, 1.0)))
+        finally:
+            if interactive:
+                with self._lock:
+                    self._waiting_interactive -= 1
+
+    def _limits(self, tokens: int, interactive: bool):
+        """
+        按优先级计算可用配额
+
+        返回:
+            (修正后的 token 数, RPM 上限或 None, TPM 上限或 None)
+        """
+        share = 1.0 if interactive else 1.0 - self.interactive_reserve
+        rpm_limit = max(1, int(self.rpm * share)) if self.rpm > 0 else None
+        tpm_limit = max(1, int(self.tpm * share)) if self.tpm > 0 else None
+        # 单次请求超过总配额时按总配额计，避免永远等不到
+        if tpm_limit is not None:
+            tokens = min(tokens, tpm_limit)
+        return tokens, rpm_limit, tpm_limit
+
+    def _try_acquire(self, tokens: int, rpm_limit: Optional[int], tpm_limit: Optional[int]):
+        """
+        尝试登记一次调用
+
+        返回:
+            (记录 ID 或 None, 建议等待秒数)
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM calls WHERE ts < ?', (now - self.WINDOW,))
+            count, used, oldest = conn.execute('SELECT COUNT(*), COALESCE(SUM(tokens), 0), MIN(ts) FROM calls').fetchone()
+
+            if (rpm_limit is None or count + 1 <= rpm_limit) and (tpm_limit is None or used + tokens <= tpm_limit):
+                cursor = conn.execute('INSERT INTO calls (ts, tokens) VALUES (?, ?)', (now, tokens))
+                conn.execute('COMMIT')
+                return cursor.lastrowid, 0
+
+            conn.execute('COMMIT')
+            return None, (oldest + self.WINDOW - now) if oldest else 0.2
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def record_usage(self, row_id: Optional[int], tokens: int):
+        """
+        用接口返回的实际用量修正登记的 token 数
+        """
+        if row_id is None or not self.enabled:
+            return
+        self._connect().execute('UPDATE calls SET tokens = ? WHERE id = ?', (tokens, row_id))
+
+    def snapshot(self) -> dict:
+        """
+        返回当前窗口内的用量
+        """
+        if not self.enabled:
+            return {'enabled': False}
+        now = time.time()
+        count, used = self._connect().execute(
+            'SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM calls WHERE ts >= ?', (now - self.WINDOW,)
+        ).fetchone()
+        return {
+            'enabled': True,
+            'rpm_limit': self.rpm,
+            'tpm_limit': self.tpm,
+            'requests_last_minute': count,
+            'tokens_last_minute': used
+        }
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU 密集步骤的进程池：HTML 解析、大段 JSON 解析和图片编码会长时间持有 GIL，
+放到子进程执行后，同一进程里处理其他请求的线程不再被拖慢
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Callable, Optional, Tuple, Union
+
+Payload = Union[bytes, str, BinaryIO]
+
+
+def _run_shared(func: Callable, name: str, size: int, text: bool, args: tuple) -> Any:
+    """
+    在子进程中执行：从共享内存读出载荷后调用 func
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    if text:
+        data = data.decode('utf-8', 'surrogatepass')
+    return func(data, *args)
+
+
+class CpuPool:
+    """
+    进程池
+
+    载荷小于 min_bytes 时直接在当前线程执行，避免为小任务付出进程间传递的开销。
+    大载荷写入一块共享内存后只把名字交给子进程，不经过管道 pickle 传输；文件对象直接读入共享内存，
+    不在父进程中生成完整的 bytes。进程池在第一次需要时才启动（forkserver，不从多线程的父进程 fork）。
+    workers 为 0 时不启用，所有任务都在当前线程执行。
+    """
+
+    def __init__(self, workers: int = 0, min_bytes: int = 256 * 1024):
+        self.workers = workers
+        self.min_bytes = min_bytes
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def run(self, func: Callable, payload: Payload, *args) -> Any:
+        """
+        执行 func(payload, *args)，载荷足够大时在子进程中执行
+
+        参数:
+            func: 模块级函数或可 pickle 对象的方法，第一个参数为载荷
+            payload: bytes、str 或二进制文件对象（子进程中分别收到 bytes、str、bytes）
+            args: 其余参数，需可 pickle
+
+        返回:
+            func 的返回值；func 抛出的异常原样抛出
+        """
+        start = self._offload_start(payload)
+        if start is None:
+            return func(payload, *args)
+
+        shm = None
+        try:
+            shm, future = self._submit(func, payload, args)
+            return future.result()
+        except _PoolUnavailable as e:
+            print(f"Warning: CPU pool unavailable, running {getattr(func, '__name__', func)} in-thread: {e}")
+            self._rewind(payload, start)
+            return func(payload, *args)
+        finally:
+            self._release(shm)
+
+    async def run_async(self, func: Callable, payload: Payload, *args) -> Any:
+        """
+        run 的协程版本，等待子进程时不阻塞事件循环
+        """
+        import asyncio
+
+        start = self._offload_start(payload)
+        if start is None:
+            return func(payload, *args)
+
+        shm = None
+        try:
+            shm, future = self._submit(func, payload, args)
+            return await asyncio.wrap_future(future)
+        except _PoolUnavailable as e:
+            print(f"Warning: CPU pool unavailable, running {getattr(func, '__name__', func)} in-thread: {e}")
+            self._rewind(payload, start)
+            return func(payload, *args)
+        finally:
+            self._release(shm)
+
+    def _offload_start(self, payload: Payload) -> Optional[int]:
+        """
+        需要交给子进程时返回载荷的起始位置（文件对象为当前读取位置，其余为 0），否则返回 None
+        """
+        if not self.enabled:
+            return None
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            size = len(payload)
+            start = 0
+        elif isinstance(payload, str):
+            # 字符数是 UTF-8 字节数的下限，足以判断是否达到阈值
+            size = len(payload)
+            start = 0
+        else:
+            start = payload.tell()
+            size = payload.seek(0, os.SEEK_END) - start
+            payload.seek(start)
+        return start if size >= self.min_bytes else None
+
+    def _submit(self, func: Callable, payload: Payload, args: tuple) -> Tuple[Any, Future]:
+        from multiprocessing import shared_memory
+        from concurrent.futures.process import BrokenProcessPool
+
+        text = isinstance(payload, str)
+        data = payload.encode('utf-8', 'surrogatepass') if text else payload
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            size = len(data)
+        else:
+            start = data.tell()
+            size = data.seek(0, os.SEEK_END) - start
+            data.seek(start)
+
+        try:
+            shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        except OSError as e:
+            raise _PoolUnavailable(e)
+
+        try:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                shm.buf[:size] = data
+            else:
+                written = 0
+                while written < size:
+                    if hasattr(data, 'readinto'):
+                        n = data.readinto(shm.buf[written:size])
+                    else:
+                        chunk = data.read(min(size - written, 1024 * 1024))
+                        n = len(chunk)
+                        shm.buf[written:written + n] = chunk
+                    if not n:
+                        break
+                    written += n
+                size = written
+            future = self._get_executor().submit(_run_shared, func, shm.name, size, text, args)
+        except BrokenProcessPool as e:
+            self._reset()
+            self._release(shm)
+            raise _PoolUnavailable(e)
+        except BaseException:
+            self._release(shm)
+            raise
+
+        # 子进程异常退出时换一个新的进程池，本次任务改在当前线程执行
+        broken = Future()
+
+        def relay(done: Future):
+            if done.cancelled():
+                broken.set_exception(_PoolUnavailable('task cancelled'))
+                return
+            error = done.exception()
+            if isinstance(error, BrokenProcessPool):
+                self._reset()
+                broken.set_exception(_PoolUnavailable(error))
+            elif error is not None:
+                broken.set_exception(error)
+            else:
+                broken.set_result(done.result())
+
+        future.add_done_callback(relay)
+        return shm, broken
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(method)
+                    )
+        return self._executor
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, shm):
+        if shm is None:
+            return
+        try:
+            shm.close()
+        except BufferError:
+            pass
+        try:
+            shm.unlink()
+        except OSError:
+            pass
+
+    def _rewind(self, payload: Payload, start: int):
+        if hasattr(payload, 'seek'):
+            payload.seek(start)
+
+    def shutdown(self):
+        """
+        停止子进程（进程退出时自动调用，一般无需手动调用）
+        """
+        self._reset()
+
+
+class _PoolUnavailable(Exception):
+    """进程池无法使用（共享内存不足、子进程崩溃），调用方改在当前线程执行"""
+
+
+def _default_workers() -> int:
+    # 无服务器环境中每个实例只处理一个请求，且不适合常驻子进程
+    if os.environ.get('SERVERLESS', os.environ.get('VERCEL', '')).lower() in ('1', 'true'):
+        return 0
+    configured = os.environ.get('CPU_POOL_WORKERS', '')
+    if configured.strip():
+        return max(0, int(configured))
+    return min(4, os.cpu_count() or 1)
+
+
+cpu_pool = CpuPool(
+    workers=_default_workers(),
+    min_bytes=int(float(os.environ.get('CPU_POOL_MIN_KB', 256)) * 1024)
+)
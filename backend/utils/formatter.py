@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地Markdown排版工具（无网络调用）
+"""
+
+import re
+from typing import List, Dict, Any, Optional
+
+
+CJK = r'\u2e80-\u2eff\u2f00-\u2fdf\u3040-\u309f\u30a0-\u30ff\u3100-\u312f\u3200-\u32ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+
+# 中英文之间补空格
+CJK_LATIN = re.compile(rf'([{CJK}])([A-Za-z0-9])')
+LATIN_CJK = re.compile(rf'([A-Za-z0-9%])([{CJK}])')
+
+# 中文语境下的半角标点 -> 全角标点
+HALF_TO_FULL = {',': '，', ';': '；', ':': '：', '!': '！', '?': '？'}
+CJK_HALF_PUNCT = re.compile(rf'([{CJK}])([,;:!?])(?=\s|[{CJK}]|$)')
+CJK_PERIOD = re.compile(rf'([{CJK}])\.(?=\s*$)')
+
+# 全角字母数字 -> 半角
+FULL_WIDTH_ALNUM = re.compile(r'[\uff10-\uff19\uff21-\uff3a\uff41-\uff5a]')
+
+FENCE = re.compile(r'^(\s*)(`{3,}|~{3,})(.*)$')
+# 缩进代码块：4 个空格或制表符开头
+INDENTED_CODE = re.compile(r'^(?: {4}|\t)')
+# 单个 # 后必须有空格（避免误伤 #话题），## 及以上允许缺少空格
+HEADING = re.compile(r'^(#\s+|#{2,6}\s*)(.*?)(?:\s+#+)?\s*$')
+BULLET = re.compile(r'^(\s*)(?:[*+-]\s+|[•·]\s*)(?=\S)')
+ORDERED = re.compile(r'^(\s*)(\d+)(?:\.\s+|[、)）]\s*)(?=\S)')
+# 行内代码、链接/图片地址、自动链接、HTML 标签，排版时原样保留
+PROTECTED_INLINE = re.compile(r'(`+)[^`]*?\1|\]\([^)]*\)|<[^>\n]+>|https?://[^\s)\]]+')
+
+
+class MarkdownFormatter:
+    """本地Markdown排版类"""
+
+    def __init__(self, ai_threshold: float = 0.7):
+        self.ai_threshold = ai_threshold
+
+    def format(self, content: str, title: str = '') -> str:
+        """
+        对Markdown进行确定性排版
+
+        包括中英文空格、全半角标点、空行规范化、标题层级修复、
+        列表与代码块修复，以及移除一级标题。
+
+        参数:
+            content: Markdown内容（不含front matter）
+            title: 文章标题（可选），与之相同的一级标题会被直接移除
+
+        返回:
+            排版后的内容
+        """
+        if not content:
+            return ''
+
+        lines = content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        blocks = self._split_blocks(lines)
+
+        output: List[str] = []
+        headings_seen = False
+        last_level = 1
+        title_key = self._normalize_title(title)
+
+        for kind, block in blocks:
+            if kind == 'code':
+                self._push_block(output, block)
+                continue
+
+            for raw in block:
+                line = raw.rstrip()
+                stripped = line.strip()
+
+                if not stripped:
+                    output.append('')
+                    continue
+
+                heading = HEADING.match(stripped) if stripped.startswith('#') else None
+                if heading:
+                    level = heading.group(1).count('#')
+                    text = self._format_inline(heading.group(2))
+                    if not text:
+                        continue
+
+                    # 一级标题：与标题重复或位于文首时移除，其余降为二级
+                    if level == 1:
+                        if not headings_seen and (not title_key or self._normalize_title(text) == title_key
+                                                  or not any(o.strip() for o in output)):
+                            headings_seen = True
+                            continue
+                        level = 2
+
+                    # 层级不允许跳级（如 H2 之后直接 H4）
+                    level = max(2, min(level, last_level + 1))
+                    last_level = level
+                    headings_seen = True
+                    self._push_block(output, ['#' * level + ' ' + text])
+                    continue
+
+                bullet = BULLET.match(line)
+                if bullet and not re.match(r'^\s*([*\-_])(\s*\1){2,}\s*$', line):
+                    indent = bullet.group(1)
+                    line = f'{indent}- ' + self._format_inline(line[bullet.end():])
+                    self._push_list_item(output, line)
+                    continue
+
+                ordered = ORDERED.match(line)
+                if ordered and len(ordered.group(2)) <= 3:
+                    indent, number = ordered.group(1), ordered.group(2)
+                    line = f'{indent}{number}. ' + self._format_inline(line[ordered.end():])
+                    self._push_list_item(output, line)
+                    continue
+
+                # 保留行尾两个空格表示的硬换行
+                hard_break = raw.endswith('  ')
+                formatted = self._format_inline(line) if not line.lstrip().startswith(('|', '<')) else line
+                output.append(formatted + ('  ' if hard_break and not formatted.endswith('  ') else ''))
+
+        return self._collapse_blank_lines(output)
+
+    def assess(self, content: str) -> Dict[str, Any]:
+        """
+        粗略评估排版质量，决定是否需要 AI 排版
+
+        返回:
+            {'score': 0~1, 'issues': [问题描述], 'needs_ai': bool}
+        """
+        issues = []
+        score = 1.0
+        text = content or ''
+        lines = text.split('\n')
+        non_empty = [line for line in lines if line.strip()]
+
+        if not non_empty:
+            return {'score': 0.0, 'issues': ['内容为空'], 'needs_ai': False}
+
+        # 大段无换行的文字墙（常见于直接粘贴的纯文本）
+        longest = max(len(line) for line in non_empty)
+        if longest > 1200:
+            issues.append('存在过长段落')
+            score -= 0.3
+
+        paragraphs = [p for p in re.split(r'\n\s*\n', text) if p.strip()]
+        if len(text) > 1500 and len(paragraphs) < 3:
+            issues.append('缺少段落分隔')
+            score -= 0.3
+
+        # 长文却没有任何结构
+        has_structure = any(line.lstrip().startswith(('#', '- ', '* ', '> ', '```', '|')) or ORDERED.match(line)
+                            for line in non_empty)
+        if len(text) > 3000 and not has_structure:
+            issues.append('缺少标题或列表结构')
+            score -= 0.2
+
+        # 网页抓取残留
+        html_tags = len(re.findall(r'</?(?:div|span|p|section|br|font|strong)\b', text, re.I))
+        if html_tags > 5:
+            issues.append('残留HTML标签')
+            score -= 0.3
+
+        if text.count('```') % 2:
+            issues.append('代码块未闭合')
+            score -= 0.1
+
+        # 疑似乱码或转义残留
+        if '\ufffd' in text or re.search(r'&(?:nbsp|amp|lt|gt|quot);', text):
+            issues.append('存在乱码或HTML实体')
+            score -= 0.2
+
+        score = max(0.0, round(score, 2))
+        return {
+            'score': score,
+            'issues': issues,
+            'needs_ai': score < self.ai_threshold
+        }
+
+    def needs_ai(self, content: str) -> bool:
+        """
+        判断内容是否需要 AI 排版
+        """
+        return self.assess(content)['needs_ai']
+
+    def extract_title(self, content: str) -> str:
+        """
+        从正文中提取标题（第一个一级标题，否则第一个标题）
+        """
+        first_heading = ''
+        in_fence = False
+        for line in content.split('\n'):
+            if FENCE.match(line):
+                in_fence = not in_fence
+                continue
+            if in_fence:
+                continue
+            match = HEADING.match(line.strip()) if line.startswith('#') else None
+            if match and match.group(2):
+                if match.group(1).count('#') == 1:
+                    return match.group(2).strip()
+                first_heading = first_heading or match.group(2).strip()
+        return first_heading
+
+    def _split_blocks(self, lines: List[str]) -> List[tuple]:
+        """
+        按代码块切分，返回 [('text' | 'code', 行列表)]
+
+        未闭合的代码块会在文末补上结束标记。空行（或文首）之后缩进 4 个空格的行同样是代码块，
+        列表项下的缩进内容除外。
+        """
+        blocks = []
+        current: List[str] = []
+        fence: Optional[str] = None
+        indented = False
+        in_list = False
+
+        for line in lines:
+            if indented:
+                if not line.strip() or INDENTED_CODE.match(line):
+                    current.append(line)
+                    continue
+                current = self._end_indented_code(blocks, current)
+                indented = False
+
+            match = FENCE.match(line)
+            if fence is None:
+                if match:
+                    if current:
+                        blocks.append(('text', current))
+                    current = [match.group(1) + match.group(2) + match.group(3).strip()]
+                    fence = match.group(2)
+                elif INDENTED_CODE.match(line) and line.strip() and not in_list \
+                        and (not current or not current[-1].strip()):
+                    if current:
+                        blocks.append(('text', current))
+                    current = [line]
+                    indented = True
+                else:
+                    if line.strip():
+                        in_list = bool(BULLET.match(line) or ORDERED.match(line)) or \
+                            (in_list and line.startswith((' ', '\t')))
+                    current.append(line)
+            else:
+                current.append(line)
+                if match and match.group(2)[0] == fence[0] and len(match.group(2)) >= len(fence) \
+                        and not match.group(3).strip():
+                    blocks.append(('code', current))
+                    current = []
+                    fence = None
+
+        if fence is not None:
+            while len(current) > 1 and not current[-1].strip():
+                current.pop()
+            current.append(current[0].lstrip()[:len(fence)])
+            blocks.append(('code', current))
+        else:
+            if indented:
+                current = self._end_indented_code(blocks, current)
+            if current:
+                blocks.append(('text', current))
+
+        return blocks
+
+    def _end_indented_code(self, blocks: List[tuple], current: List[str]) -> List[str]:
+        """
+        结束缩进代码块，返回块末尾的空行（归入后面的正文）
+        """
+        trailing = []
+        while not current[-1].strip():
+            trailing.insert(0, current.pop())
+        blocks.append(('code', current))
+        return trailing
+
+    def _format_inline(self, text: str) -> str:
+        """
+        行内排版：全角字母数字转半角、中文标点、中英文空格
+
+        行内代码、链接地址和HTML标签不做修改。
+        """
+        parts = []
+        last = 0
+        for match in PROTECTED_INLINE.finditer(text):
+            plain = self._format_plain(text[last:match.start()])
+            protected = match.group(0)
+            # 行内代码与中文之间同样补空格
+            if protected.startswith('`') and re.search(rf'[{CJK}]$', plain):
+                plain += ' '
+            if parts and parts[-1].startswith('`') and re.match(rf'[{CJK}]', plain):
+                plain = ' ' + plain
+            parts.append(plain)
+            parts.append(protected)
+            last = match.end()
+        tail = self._format_plain(text[last:])
+        if parts and parts[-1].startswith('`') and re.match(rf'[{CJK}]', tail):
+            tail = ' ' + tail
+        parts.append(tail)
+        return ''.join(parts)
+
+    def _format_plain(self, text: str) -> str:
+        if not text:
+            return text
+        text = FULL_WIDTH_ALNUM.sub(lambda m: chr(ord(m.group(0)) - 0xfee0), text)
+        text = CJK_HALF_PUNCT.sub(lambda m: m.group(1) + HALF_TO_FULL[m.group(2)], text)
+        text = CJK_PERIOD.sub(r'\1。', text)
+        text = CJK_LATIN.sub(r'\1 \2', text)
+        text = LATIN_CJK.sub(r'\1 \2', text)
+        # 全角标点前后不需要空格
+        text = re.sub(r'\s+([，。；：！？、）》」』】])', r'\1', text)
+        text = re.sub(r'([，。；：！？、（《「『【])\s+', r'\1', text)
+        return text
+
+    def _normalize_title(self, title: str) -> str:
+        return re.sub(r'[\s\W_]+', '', title or '').lower()
+
+    def _is_list_item(self, line: str) -> bool:
+        return bool(re.match(r'^\s*(?:- |\d+\. )', line))
+
+    def _push_block(self, output: List[str], block: List[str]):
+        """
+        追加一个需要前后空行分隔的块（标题、代码块）
+        """
+        if output and output[-1].strip():
+            output.append('')
+        output.extend(block)
+        output.append('')
+
+    def _push_list_item(self, output: List[str], line: str):
+        """
+        追加列表项，列表开始前补空行
+        """
+        if output and output[-1].strip() and not self._is_list_item(output[-1]) \
+                and not output[-1].startswith((' ', '\t')):
+            output.append('')
+        output.append(line)
+
+    def _collapse_blank_lines(self, lines: List[str]) -> str:
+        result = []
+        for line in lines:
+            if not line.strip():
+                if result and result[-1] == '':
+                    continue
+                result.append('')
+            else:
+                result.append(line)
+        return '\n'.join(result).strip('\n') + '\n'
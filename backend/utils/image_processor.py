@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传图片处理：去除元数据、限制尺寸、转换为 WebP/AVIF，并生成 srcset 所需的多尺寸版本
+"""
+
+import io
+import os
+import hashlib
+from typing import Any, BinaryIO, Dict, List, Union
+
+# Pillow 在第一次处理图片时才导入，见 _load_pil
+Image = ImageOps = features = None
+_pil_loaded = False
+
+
+# 矢量图和动图原样保存
+PASSTHROUGH_EXTENSIONS = {'svg', 'gif'}
+
+HASH_CHUNK = 256 * 1024
+
+
+def _load_pil() -> bool:
+    """
+    导入 Pillow，返回是否可用
+    """
+    global Image, ImageOps, features, _pil_loaded
+    if not _pil_loaded:
+        try:
+            from PIL import Image, ImageOps, features
+        except ImportError:
+            pass
+        _pil_loaded = True
+    return Image is not None
+
+
+class ImageProcessor:
+    """
+    图片处理类
+
+    未安装 Pillow 时不做处理，只按内容哈希命名。
+    """
+
+    def __init__(self):
+        self.max_width = int(os.environ.get('IMAGE_MAX_WIDTH', 1920))
+        self.output_format = os.environ.get('IMAGE_FORMAT', 'webp').lower()
+        self.quality = int(os.environ.get('IMAGE_QUALITY', 82))
+        self.srcset_widths = sorted(
+            int(w) for w in os.environ.get('IMAGE_SRCSET_WIDTHS', '480,960,1440').split(',') if w.strip()
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return _load_pil()
+
+    def output_extension(self, ext: str) -> str:
+        """
+        返回处理后的扩展名；AVIF 编码器不可用时退回 WebP
+        """
+        ext = 'jpg' if ext == 'jpeg' else ext
+        if not self.enabled or ext in PASSTHROUGH_EXTENSIONS or self.output_format == 'original':
+            return ext
+        if self.output_format == 'avif' and features.check('avif'):
+            return 'avif'
+        return 'webp'
+
+    def content_key(self, source: Union[bytes, BinaryIO]) -> str:
+        """
+        以原始内容和处理参数计算文件名主体，相同的上传得到相同的名字
+
+        source 为文件对象时分块读取，读完后回到开头
+        """
+        if isinstance(source, bytes):
+            digest = hashlib.sha256(source)
+        else:
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: source.read(HASH_CHUNK), b''):
+                digest.update(chunk)
+            source.seek(0)
+        digest.update(f'|{self.max_width}|{self.output_format}|{self.quality}'.encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+    def transforms(self, ext: str) -> bool:
+        """
+        是否会重新编码该格式的图片（否则 process 原样返回数据）
+        """
+        return self.output_extension(ext) not in PASSTHROUGH_EXTENSIONS and self.enabled
+
+    def process(self, data: Union[bytes, BinaryIO], ext: str, srcset: bool = False) -> Dict[str, Any]:
+        """
+        处理一张图片
+
+        参数:
+            data: 原始图片数据或文件对象
+            ext: 原始扩展名
+            srcset: 是否生成较小尺寸的版本
+
+        返回:
+            {'data': 处理后的数据（不处理时原样返回 data）, 'ext': 扩展名, 'width': 宽度或 None,
+             'variants': [{'width': 宽度, 'data': 数据}]（仅 srcset 时）}
+        """
+        out_ext = self.output_extension(ext)
+        if not self.transforms(ext):
+            return {'data': data, 'ext': out_ext, 'width': None, 'variants': []}
+
+        with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data) as source:
+            # JPEG 解码时直接按 1/2、1/4、1/8 缩小，超大照片不必完整解码到内存
+            if source.format == 'JPEG':
+                source.draft('RGB', (self.max_width, self.max_width))
+            # 先按 EXIF 方向旋转，再丢弃全部元数据
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            image.info = {}
+            if image.width > self.max_width:
+                image = self._resize(image, self.max_width)
+
+            result = {'data': self._encode(image, out_ext), 'ext': out_ext, 'width': image.width, 'variants': []}
+            if srcset:
+                result['variants'] = [
+                    {'width': width, 'data': self._encode(self._resize(image, width), out_ext)}
+                    for width in self.srcset_widths if width < image.width
+                ]
+        return result
+
+    def _resize(self, image, width: int):
+        height = max(1, round(image.height * width / image.width))
+        return image.resize((width, height), Image.LANCZOS)
+
+    def _encode(self, image, ext: str) -> bytes:
+        output = io.BytesIO()
+        if ext in ('jpg', 'jpeg'):
+            image.convert('RGB').save(output, 'JPEG', quality=self.quality, optimize=True, progressive=True)
+        elif ext == 'png':
+            image.save(output, 'PNG', optimize=True)
+        elif ext == 'avif':
+            image.save(output, 'AVIF', quality=self.quality)
+        elif ext == 'bmp':
+            image.save(output, 'BMP')
+        else:
+            image.save(output, 'WEBP', quality=self.quality, method=4)
+        return output.getvalue()
+
+    def srcset(self, url_for_width, width: int, variants: List[Dict[str, Any]]) -> str:
+        """
+        生成 srcset 属性值，url_for_width(宽度或 None) 返回对应文件的地址
+        """
+        entries = [f'{url_for_width(v["width"])} {v["width"]}w' for v in variants]
+        entries.append(f'{url_for_width(None)} {width}w')
+        return ', '.join(entries)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延迟导入：模块在第一次访问其属性时才真正加载，避免冷启动为用不到的依赖付出导入时间
+"""
+
+import importlib
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    模块占位对象
+
+    用法与普通模块相同（如 requests.get、requests.exceptions.RequestException），
+    第一次访问属性时导入真实模块，之后直接转发。
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def __getattr__(self, attr):
+        module = self._lazy_module
+        if module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self.__name__)
+                module = self._lazy_module
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    返回延迟加载的模块
+
+    参数:
+        name: 模块名
+
+    返回:
+        LazyModule 占位对象
+    """
+    return LazyModule(name)
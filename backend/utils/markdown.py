@@ -6,17 +6,39 @@ Markdown格式处理工具
 
 import re
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional, Dict, Any
 import unicodedata
 
 
+FENCE = re.compile(r'^(`{3,}|~{3,})')
+HEADING = re.compile(r'^(#{1,6})\s+(.+?)(?:\s+#+)?\s*$')
+INLINE_CODE = re.compile(r'`+[^`]*`+')
+LINK = re.compile(r'(!)?\[([^\]]*)\]\(\s*<?([^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+CJK = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+# 中日韩文字逐字计数，其他文字按连续的字母数字计为一个词
+LATIN_WORD = re.compile(r'[^\W_\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+'
+                        r"(?:['’.-][^\W_\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+)*")
+
+WORDS_PER_MINUTE = 200
+CJK_CHARS_PER_MINUTE = 300
+ANALYSIS_CACHE_SIZE = 256
+
+# 标题数达到该值时在 front matter 中开启目录
+TOC_MIN_HEADINGS = 2
+
+
 class MarkdownGenerator:
     """Markdown格式处理类"""
     
     def __init__(self):
         self.default_category = '未分类'
         self.default_tags = []
+        self._analysis_cache: OrderedDict = OrderedDict()
+        self._analysis_lock = threading.Lock()
     
     def slugify(self, text: str) -> str:
         """
@@ -46,15 +68,17 @@ class MarkdownGenerator:
         
         return text[:100]
     
-    def generate_filename(self, title: str, date: Optional[str] = None) -> str:
+    def generate_filename(self, title: str, date: Optional[str] = None, language: str = '') -> str:
         """
         生成Hugo文章文件名
         
         Hugo文件名格式: YYYY-MM-DD-title-slug.md
+        多语言版本格式: YYYY-MM-DD-title-slug.<lang>.md
         
         参数:
             title: 文章标题
             date: 日期字符串，格式为YYYY-MM-DD
+            language: 语言代码（可选），如 en、ja
             
         返回:
             文件名
@@ -67,8 +91,27 @@ class MarkdownGenerator:
         if not slug:
             slug = 'post'
         
+        if language:
+            return f'{date_part}-{slug}.{self.slugify(language)}.md'
+        
         return f'{date_part}-{slug}.md'
     
+    def translation_filename(self, filename: str, language: str) -> str:
+        """
+        根据原文文件名生成翻译版本文件名（post.md -> post.en.md）
+        
+        Hugo 通过相同的文件名主体关联不同语言的版本。
+        
+        参数:
+            filename: 原文文件名
+            language: 语言代码
+            
+        返回:
+            翻译版本的文件名
+        """
+        base, ext = os.path.splitext(filename)
+        return f'{base}.{self.slugify(language)}{ext or ".md"}'
+    
     def generate_front_matter(self, title: str, date: Optional[str] = None,
                              tags: Optional[List[str]] = None,
                              category: Optional[str] = None,
@@ -116,7 +159,9 @@ class MarkdownGenerator:
                                tags: Optional[List[str]] = None,
                                category: Optional[str] = None,
                                draft: bool = False,
-                               featured_image: str = '') -> str:
+                               featured_image: str = '',
+                               description: str = '',
+                               stats: bool = False) -> str:
         """
         将文章内容包装为完整的Hugo Markdown格式
         
@@ -128,6 +173,8 @@ class MarkdownGenerator:
             category: 分类
             draft: 是否为草稿
             featured_image: 特色图片
+            description: 文章摘要
+            stats: 是否写入 readingTime、wordCount 和 toc（复用 analyze 的缓存结果）
             
         返回:
             完整的Hugo文章内容
@@ -156,10 +203,20 @@ class MarkdownGenerator:
             tags_str = ', '.join([f'"{self._escape_yaml_string(tag)}"' for tag in tags])
             lines.append(f'tags: [{tags_str}]')
         
+        if description:
+            description = ' '.join(str(description).split())
+            lines.append(f'description: "{self._escape_yaml_string(description)}"')
+        
         if featured_image:
             lines.append(f'featuredImage: "{featured_image}"')
             lines.append(f'image: "{featured_image}"')
         
+        if stats:
+            analysis = self.analyze(content)
+            lines.append(f'readingTime: {analysis["reading_time"]}')
+            lines.append(f'wordCount: {analysis["word_count"]}')
+            lines.append(f'toc: {"true" if len(analysis["headings"]) >= TOC_MIN_HEADINGS else "false"}')
+        
         lines.append('---')
         lines.append('')
         lines.append(content)
@@ -232,6 +289,57 @@ class MarkdownGenerator:
             'content': content
         }
     
+    def update_front_matter(self, markdown_content: str, fields: Dict[str, Any]) -> str:
+        """
+        只改写 front matter 中指定的字段，其余行（包括正文）原样保留
+        
+        参数:
+            markdown_content: 完整的Markdown内容
+            fields: 要设置的字段，如 {'tags': [...], 'draft': False, 'date': '...'}
+            
+        返回:
+            更新后的内容；字段值未变化时与原内容完全相同
+        """
+        lines = markdown_content.split('\n')
+        
+        if lines and lines[0] == '---' and '---' in lines[1:]:
+            end = lines.index('---', 1)
+        else:
+            lines = ['---', '---', ''] + lines
+            end = 1
+        
+        header = lines[1:end]
+        
+        for key, value in fields.items():
+            rendered = f'{key}: {self._yaml_value(key, value)}'
+            index = next((i for i, line in enumerate(header) if re.match(rf'^{re.escape(key)}\s*:', line)), None)
+            
+            if index is None:
+                header.append(rendered)
+                continue
+            
+            # 旧值为块列表（下一行起缩进的 - 项）时一并替换
+            stop = index + 1
+            while stop < len(header) and header[stop][:1] in (' ', '\t'):
+                stop += 1
+            header[index:stop] = [rendered]
+        
+        return '\n'.join(['---'] + header + lines[end:])
+    
+    def _yaml_value(self, key: str, value: Any) -> str:
+        """
+        按 wrap_with_front_matter 的写法输出字段值
+        """
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        if value is None:
+            return 'null'
+        if isinstance(value, (list, tuple)):
+            return '[' + ', '.join(f'"{self._escape_yaml_string(item)}"' for item in value) + ']'
+        if key in ('date', 'lastmod') or isinstance(value, (int, float)):
+            return str(value)
+        return f'"{self._escape_yaml_string(value)}"'
+    
     def _parse_yaml(self, yaml_text: str) -> Dict[str, Any]:
         """
         简单的YAML解析
@@ -243,19 +351,34 @@ class MarkdownGenerator:
             解析后的字典
         """
         result = {}
+        # 值为空的键，其后的 "- 项" 是它的块列表
+        block_key = None
         
-        for line in yaml_text.strip().split('\n'):
-            line = line.strip()
+        for raw in yaml_text.strip('\n').split('\n'):
+            line = raw.strip()
             
             if not line or line.startswith('#'):
                 continue
             
-            if ':' not in line:
+            if block_key is not None and (line == '-' or line.startswith('- ')):
+                if not isinstance(result[block_key], list):
+                    result[block_key] = []
+                item = line[1:].strip()
+                if len(item) >= 2 and item[0] == item[-1] and item[0] in ('"', "'"):
+                    item = item[1:-1]
+                if item:
+                    result[block_key].append(item)
+                continue
+            
+            # 其余缩进行属于嵌套结构，不解析
+            if raw[:1] in (' ', '\t') or ':' not in line:
+                block_key = None
                 continue
             
             key, value = line.split(':', 1)
             key = key.strip()
             value = value.strip()
+            block_key = key if not value else None
             
             if value.startswith('[') and value.endswith(']'):
                 value = self._parse_yaml_list(value)
@@ -321,38 +444,128 @@ class MarkdownGenerator:
         
         return [item.strip().strip('"\'') for item in items if item.strip()]
     
-    def validate_markdown(self, content: str) -> Dict[str, Any]:
+    def analyze(self, content: str) -> Dict[str, Any]:
         """
-        验证Markdown内容的有效性
+        一次遍历得到目录、字数、阅读时间、链接/图片清单和格式问题
+        
+        代码块内的内容不参与标题、字数和格式检查；中日韩文字按字计数，其他文字按词计数。
+        结果按内容哈希缓存，同一篇文章的多次调用只分析一次。
         
         参数:
-            content: Markdown内容
+            content: Markdown内容（不含 front matter）
             
         返回:
-            验证结果
+            {'headings', 'word_count', 'cjk_chars', 'latin_words', 'reading_time', 'line_count',
+             'code_blocks', 'links', 'images', 'issues', 'valid'}
         """
+        key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+        with self._analysis_lock:
+            cached = self._analysis_cache.get(key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(key)
+                return cached
+        
+        headings = []
+        links = []
+        images = []
         issues = []
+        prose = []
+        code_blocks = 0
+        fence = None
         
         lines = content.split('\n')
         
         for i, line in enumerate(lines, 1):
-            if line.startswith('#') and not re.match(r'^#{1,6}\s', line):
-                issues.append(f'第{i}行: 标题格式不正确，应为 # 标题')
+            stripped = line.lstrip()
+            
+            if fence:
+                if stripped.startswith(fence) and not stripped[len(fence):].strip():
+                    fence = None
+                continue
+            
+            fence_match = FENCE.match(stripped)
+            if fence_match:
+                fence = fence_match.group(1)
+                code_blocks += 1
+                continue
+            
+            if line.startswith('#'):
+                heading = HEADING.match(line)
+                if heading:
+                    title = heading.group(2).strip()
+                    headings.append({'level': len(heading.group(1)), 'title': title, 'slug': self.slugify(title)})
+                else:
+                    issues.append(f'第{i}行: 标题格式不正确，应为 # 标题')
             
-            if line.count('**') % 2 != 0:
-                issues.append(f'第{i}行: 粗体标记不匹配')
+            text = line
+            if '`' in line:
+                if line.count('`') % 2 != 0:
+                    issues.append(f'第{i}行: 代码标记不匹配')
+                text = INLINE_CODE.sub(' ', line)
             
-            if line.count('*') % 2 != 0 and '**' not in line:
-                issues.append(f'第{i}行: 斜体标记不匹配')
+            if '*' in text:
+                if text.count('**') % 2 != 0:
+                    issues.append(f'第{i}行: 粗体标记不匹配')
+                
+                if text.count('*') % 2 != 0 and '**' not in text:
+                    issues.append(f'第{i}行: 斜体标记不匹配')
+            
+            if '](' in text:
+                for match in LINK.finditer(text):
+                    if match.group(1):
+                        images.append({'alt': match.group(2), 'url': match.group(3), 'line': i})
+                    else:
+                        links.append({'text': match.group(2), 'url': match.group(3), 'line': i})
+                text = LINK.sub(lambda m: ' ' if m.group(1) else m.group(2), text)
+            
+            prose.append(text)
+        
+        if fence:
+            issues.append('代码块没有闭合')
+        
+        # 正文在遍历时已去掉代码，最后对其整体计数
+        prose_text = '\n'.join(prose)
+        cjk_chars = len(CJK.findall(prose_text))
+        latin_words = len(LATIN_WORD.findall(prose_text))
+        
+        result = {
+            'headings': headings,
+            'word_count': cjk_chars + latin_words,
+            'cjk_chars': cjk_chars,
+            'latin_words': latin_words,
+            'reading_time': max(1, int(latin_words / WORDS_PER_MINUTE + cjk_chars / CJK_CHARS_PER_MINUTE)),
+            'line_count': len(lines),
+            'code_blocks': code_blocks,
+            'links': links,
+            'images': images,
+            'issues': issues,
+            'valid': len(issues) == 0
+        }
+        
+        with self._analysis_lock:
+            self._analysis_cache[key] = result
+            if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                self._analysis_cache.popitem(last=False)
+        
+        return result
+    
+    def validate_markdown(self, content: str) -> Dict[str, Any]:
+        """
+        验证Markdown内容的有效性
+        
+        参数:
+            content: Markdown内容
             
-            if line.count('`') % 2 != 0 and line.count('```') % 2 == 0:
-                issues.append(f'第{i}行: 代码标记不匹配')
+        返回:
+            验证结果
+        """
+        analysis = self.analyze(content)
         
         return {
-            'valid': len(issues) == 0,
-            'issues': issues,
-            'line_count': len(lines),
-            'word_count': len(content.split())
+            'valid': analysis['valid'],
+            'issues': analysis['issues'],
+            'line_count': analysis['line_count'],
+            'word_count': analysis['word_count']
         }
     
     def extract_toc(self, content: str, max_level: int = 3) -> List[Dict[str, Any]]:
@@ -366,26 +579,11 @@ class MarkdownGenerator:
         返回:
             目录列表
         """
-        toc = []
-        
-        for line in content.split('\n'):
-            match = re.match(r'^(#{1,6})\s+(.+)$', line)
-            
-            if match:
-                level = len(match.group(1))
-                
-                if level <= max_level:
-                    toc.append({
-                        'level': level,
-                        'title': match.group(2).strip(),
-                        'slug': self.slugify(match.group(2))
-                    })
-        
-        return toc
+        return [dict(h) for h in self.analyze(content)['headings'] if h['level'] <= max_level]
     
     def word_count(self, content: str) -> int:
         """
-        统计文章字数
+        统计文章字数（中日韩文字按字计，其他文字按词计）
         
         参数:
             content: Markdown内容
@@ -393,29 +591,24 @@ class MarkdownGenerator:
         返回:
             字数
         """
-        text = re.sub(r'```[\s\S]*?```', '', content)
-        text = re.sub(r'`[^`]+`', '', text)
-        text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-        text = re.sub(r'[#*_~\[\]()]/g', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        
-        words = text.strip().split()
-        
-        return len(words)
+        return self.analyze(content)['word_count']
     
-    def reading_time(self, content: str, words_per_minute: int = 200) -> int:
+    def reading_time(self, content: str, words_per_minute: int = WORDS_PER_MINUTE) -> int:
         """
         计算阅读时间
         
         参数:
             content: Markdown内容
-            words_per_minute: 每分钟阅读字数
+            words_per_minute: 每分钟阅读词数（中日韩文字按每分钟 CJK_CHARS_PER_MINUTE 字计）
             
         返回:
             阅读时间（分钟）
         """
-        words = self.word_count(content)
+        analysis = self.analyze(content)
+        
+        if words_per_minute == WORDS_PER_MINUTE:
+            return analysis['reading_time']
         
-        minutes = words / words_per_minute
+        minutes = analysis['latin_words'] / words_per_minute + analysis['cjk_chars'] / CJK_CHARS_PER_MINUTE
         
         return max(1, int(minutes))
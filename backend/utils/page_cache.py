@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取网页的磁盘缓存：保存原始 HTML 和提取结果，支持 ETag/Last-Modified 条件请求
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+# 提取逻辑变化时递增，旧的提取结果会基于缓存的 HTML 重新解析
+EXTRACTOR_VERSION = 2
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|spm|from|isappinstalled)$', re.I)
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化 URL：协议和域名小写、去掉默认端口、片段和跟踪参数，查询参数排序
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not (scheme == 'http' and parts.port == 80 or scheme == 'https' and parts.port == 443):
+        host = f'{host}:{parts.port}'
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class PageCache:
+    """
+    网页缓存
+
+    每个 URL 对应三个文件：<key>.json（元数据）、<key>.html（原始页面）、<key>.result.json（提取结果）。
+    新鲜度取自 Cache-Control 的 max-age（或 Expires），没有声明时使用 default_ttl；
+    过期后带 If-None-Match / If-Modified-Since 重新验证，304 时直接复用缓存。
+    总大小超过 max_bytes 时按最近访问时间淘汰。
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 100 * 1024 * 1024,
+                 default_ttl: float = 300):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'hugo-publisher-page-cache')
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f'{key}{suffix}')
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存条目
+
+        返回:
+            元数据字典（含 'fresh' 表示是否仍在有效期内），没有缓存时返回 None
+        """
+        if not self.enabled:
+            return None
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        try:
+            with open(self._path(key, '.json'), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry['key'] = key
+        entry['fresh'] = time.time() < entry.get('expires_at', 0)
+        return entry
+
+    def validators(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        返回条件请求头
+        """
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def extracted(self, entry: Dict[str, Any], parse: Callable[[str], Optional[dict]]) -> Optional[dict]:
+        """
+        返回缓存的提取结果；结果缺失或提取逻辑已升级时用缓存的 HTML 重新解析
+        """
+        key = entry['key']
+        if entry.get('extractor_version') == EXTRACTOR_VERSION:
+            result = self._read_json(self._path(key, '.result.json'))
+            if result is not None:
+                self._touch(key)
+                return result
+
+        try:
+            with open(self._path(key, '.html'), encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            return None
+
+        result = parse(html)
+        if result is not None:
+            self._write(self._path(key, '.result.json'), json.dumps(result, ensure_ascii=False))
+            entry['extractor_version'] = EXTRACTOR_VERSION
+            self._write_meta(entry)
+        return result
+
+    def store(self, url: str, html: str, result: Optional[dict], headers) -> None:
+        """
+        保存一次完整下载的页面和提取结果；响应声明 no-store 时不缓存
+        """
+        if not self.enabled:
+            return
+        max_age = self._max_age(headers)
+        if max_age is None:
+            return
+
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(self._path(key, '.html'), html)
+        if result is not None:
+            self._write(self._path(key, '.result.json'), json.dumps(result, ensure_ascii=False))
+        self._write_meta({
+            'key': key,
+            'url': url,
+            'etag': headers.get('ETag', ''),
+            'last_modified': headers.get('Last-Modified', ''),
+            'expires_at': time.time() + max_age,
+            'extractor_version': EXTRACTOR_VERSION if result is not None else 0
+        })
+        self._evict()
+
+    def revalidated(self, entry: Dict[str, Any], headers) -> None:
+        """
+        304 之后按新的响应头刷新有效期
+        """
+        max_age = self._max_age(headers)
+        entry['expires_at'] = time.time() + (max_age or 0)
+        if headers.get('ETag'):
+            entry['etag'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            entry['last_modified'] = headers['Last-Modified']
+        self._write_meta(entry)
+
+    def _max_age(self, headers) -> Optional[float]:
+        """
+        从响应头计算有效期（秒），no-store 返回 None，no-cache 返回 0
+        """
+        cache_control = (headers.get('Cache-Control') or '').lower()
+        if 'no-store' in cache_control:
+            return None
+        if 'no-cache' in cache_control:
+            return 0
+        match = re.search(r'(?:s-maxage|max-age)\s*=\s*(\d+)', cache_control)
+        if match:
+            return float(match.group(1))
+        if headers.get('Expires'):
+            try:
+                return max(0.0, parsedate_to_datetime(headers['Expires']).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return 0
+        return self.default_ttl
+
+    def _read_json(self, path: str) -> Optional[Any]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry: Dict[str, Any]):
+        meta = {k: v for k, v in entry.items() if k not in ('key', 'fresh')}
+        self._write(self._path(entry['key'], '.json'), json.dumps(meta, ensure_ascii=False))
+
+    def _write(self, path: str, text: str):
+        # 先写临时文件再替换，避免并发读取到半个文件
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._path(key, '.json'))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        超出容量时按元数据文件的修改时间（最近访问时间）淘汰最旧的条目
+        """
+        entries: Dict[str, list] = {}
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.tmp'):
+                continue
+            key = name.split('.', 1)[0]
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            info = entries.setdefault(key, [0.0, 0])
+            if name == f'{key}.json':
+                info[0] = stat.st_mtime
+            info[1] += stat.st_size
+            total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(entries.items(), key=lambda item: item[1][0]):
+            for suffix in ('.json', '.html', '.result.json'):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+page_cache = PageCache(
+    directory=os.environ.get('SCRAPER_CACHE_DIR') or None,
+    max_bytes=int(float(os.environ.get('SCRAPER_CACHE_MAX_MB', 100)) * 1024 * 1024),
+    default_ttl=float(os.environ.get('SCRAPER_CACHE_TTL', 300))
+)
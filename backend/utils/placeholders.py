@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词压缩：用短占位符替换图片、链接地址和代码块，调用结束后还原
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+
+CODE_BLOCK = re.compile(r'^(`{3,}|~{3,})[^\n]*\n[\s\S]*?\n\1[ \t]*$', re.MULTILINE)
+IMAGE = re.compile(r'!\[[^\]\n]*\]\([^)\s]+(?:\s+"[^"\n]*")?\)')
+LINK = re.compile(r'(?<!!)\[([^\[\]\n]*)\]\(([^)\s]+(?:\s+"[^"\n]*")?)\)')
+BARE_URL = re.compile(r'https?://[^\s<>()\[\]"\']+')
+
+BLOCK_PLACEHOLDER = re.compile(r'\[\[\s*(IMG|CODE|URL)_(\d+)\s*\]\]')
+LINK_PLACEHOLDER = re.compile(r'\]\(\s*(LINK_\d+)\s*\)')
+
+# 还原时包在独立成段内容两侧的临时分隔符
+BLOCK_SEPARATOR = '\x00'
+
+# 短于该长度的链接替换后不会更短，保持原样
+MIN_URL_LENGTH = 16
+
+PROMPT_NOTE = ('文中形如 [[IMG_1]]、[[CODE_1]]、[[URL_1]] 的占位符分别代表图片、代码块和网址，'
+               '链接中的 LINK_1 代表链接地址，必须原样保留、不得修改或删除，位置保持不变。')
+
+
+def compact(content: str) -> Tuple[str, Dict[str, str]]:
+    """
+    用占位符替换代码块、图片、链接地址和裸网址
+
+    参数:
+        content: Markdown内容
+
+    返回:
+        (压缩后的内容, {占位符: 原文})，占位符按出现顺序编号
+    """
+    mapping: Dict[str, str] = {}
+    counters = {'CODE': 0, 'IMG': 0, 'LINK': 0, 'URL': 0}
+
+    def new_key(kind: str) -> str:
+        counters[kind] += 1
+        return f'{kind}_{counters[kind]}'
+
+    def replace_code(match):
+        key = new_key('CODE')
+        mapping[key] = match.group(0)
+        return f'[[{key}]]'
+
+    def replace_image(match):
+        key = new_key('IMG')
+        mapping[key] = match.group(0)
+        return f'[[{key}]]'
+
+    def replace_link(match):
+        target = match.group(2)
+        if len(target) < MIN_URL_LENGTH:
+            return match.group(0)
+        key = new_key('LINK')
+        mapping[key] = target
+        return f'[{match.group(1)}]({key})'
+
+    def replace_url(match):
+        url = match.group(0)
+        if len(url) < MIN_URL_LENGTH:
+            return url
+        key = new_key('URL')
+        mapping[key] = url
+        return f'[[{key}]]'
+
+    text = CODE_BLOCK.sub(replace_code, content)
+    text = IMAGE.sub(replace_image, text)
+    text = LINK.sub(replace_link, text)
+    text = _sub_outside_placeholders(BARE_URL, replace_url, text)
+    return text, mapping
+
+
+def restore(text: str, mapping: Dict[str, str], original: str = '') -> Tuple[str, List[str]]:
+    """
+    还原占位符
+
+    模型删掉的占位符会按块回退：把对应的原始内容作为独立段落，
+    插回到它前面最近一个成功保留的占位符所在段落之后（没有则放在后面最近一个之前）。
+    重复出现的占位符只还原第一次，其余删除。
+
+    参数:
+        text: 模型输出
+        mapping: compact 返回的映射
+        original: 压缩后的输入（用于确定缺失占位符的原始顺序）
+
+    返回:
+        (还原后的内容, 缺失的占位符列表)
+    """
+    if not mapping:
+        return text, []
+
+    seen = set()
+
+    def replace_block(match):
+        key = f'{match.group(1)}_{match.group(2)}'
+        if key not in mapping or key in seen:
+            return ''
+        seen.add(key)
+        value = mapping[key]
+        if match.group(1) == 'CODE':
+            return f'{BLOCK_SEPARATOR}{value}{BLOCK_SEPARATOR}'
+        return value
+
+    def replace_link(match):
+        key = match.group(1)
+        if key not in mapping or key in seen:
+            return match.group(0)
+        seen.add(key)
+        return f']({mapping[key]})'
+
+    restored = BLOCK_PLACEHOLDER.sub(replace_block, text)
+    restored = LINK_PLACEHOLDER.sub(replace_link, restored)
+
+    missing = [key for key in _ordered_keys(original, mapping) if key not in seen]
+    if missing:
+        restored = _reinsert_missing(restored, missing, mapping, original, seen)
+
+    # 独立成段的内容前后统一为一个空行（只处理分隔符两侧，不影响代码块内部）
+    restored = re.sub(r'[ \t]*\n*(?:\x00\n*)+', '\n\n', restored)
+    return restored.strip('\n'), missing
+
+
+def restore_partial(text: str, mapping: Dict[str, str]) -> str:
+    """
+    还原流式输出中已生成的部分（不做缺失检查）
+    """
+    if not mapping:
+        return text
+    text = BLOCK_PLACEHOLDER.sub(lambda m: mapping.get(f'{m.group(1)}_{m.group(2)}', ''), text)
+    return LINK_PLACEHOLDER.sub(lambda m: f']({mapping[m.group(1)]})' if m.group(1) in mapping else m.group(0), text)
+
+
+def _sub_outside_placeholders(pattern, repl, text: str) -> str:
+    """
+    只替换占位符之外的内容，避免改写已生成的占位符或链接
+    """
+    protected = re.compile(r'\[\[[A-Z]+_\d+\]\]|\]\(LINK_\d+\)|\]\([^)]*\)')
+    parts = []
+    last = 0
+    for match in protected.finditer(text):
+        parts.append(pattern.sub(repl, text[last:match.start()]))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(pattern.sub(repl, text[last:]))
+    return ''.join(parts)
+
+
+def _ordered_keys(original: str, mapping: Dict[str, str]) -> List[str]:
+    if not original:
+        return list(mapping)
+    keys = []
+    for match in re.finditer(r'\[\[(IMG|CODE|URL)_(\d+)\]\]|\]\((LINK_\d+)\)', original):
+        keys.append(match.group(3) or f'{match.group(1)}_{match.group(2)}')
+    return keys + [key for key in mapping if key not in keys]
+
+
+def _reinsert_missing(text: str, missing: List[str], mapping: Dict[str, str],
+                      original: str, seen: set) -> str:
+    order = _ordered_keys(original, mapping)
+
+    for key in missing:
+        value = mapping[key]
+        if key.startswith('LINK_'):
+            # 链接文字已无法定位，只保留地址
+            value = f'<{value.split()[0]}>'
+
+        # 插到前一个已还原内容所在段落的末尾；没有则插到后一个所在段落之前
+        position = order.index(key)
+        insert_at = None
+        for previous in reversed(order[:position]):
+            found = text.find(mapping[previous]) if previous in seen else -1
+            if found >= 0:
+                boundary = text.find('\n\n', found + len(mapping[previous]))
+                insert_at = len(text) if boundary < 0 else boundary
+                break
+        if insert_at is None:
+            insert_at = 0
+            for following in order[position + 1:]:
+                found = text.find(mapping[following]) if following in seen else -1
+                if found >= 0:
+                    insert_at = max(0, text.rfind('\n\n', 0, found))
+                    break
+
+        text = f'{text[:insert_at]}{BLOCK_SEPARATOR}{value}{BLOCK_SEPARATOR}{text[insert_at:]}'
+        seen.add(key)
+
+    return text
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务端 Markdown 渲染：输出与 Hugo（Goldmark 默认配置）一致的 HTML 和目录
+"""
+
+import re
+import os
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+# Hugo 默认不输出原始 HTML，以注释代替
+RAW_HTML_OMITTED = '<!-- raw HTML omitted -->'
+
+# 与 Hugo 的 markup.tableOfContents 默认值一致
+TOC_START_LEVEL = 2
+TOC_END_LEVEL = 3
+
+TASK_MARKER = re.compile(r'\[([ xX])\](?=\s|$)')
+
+
+class MarkdownRenderer:
+    """
+    Markdown 渲染类
+
+    渲染结果按文件的 blob SHA 缓存，同一版本只渲染一次。
+    """
+
+    def __init__(self, markdown_generator):
+        self.markdown_generator = markdown_generator
+        self.cache_size = int(os.environ.get('RENDER_CACHE_SIZE', 128))
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._md = None
+
+    @property
+    def md(self):
+        """
+        markdown-it 解析器，第一次渲染时才导入并构建
+        """
+        if self._md is None:
+            with self._lock:
+                if self._md is None:
+                    self._md = self._build_parser()
+        return self._md
+
+    def _build_parser(self):
+        from markdown_it import MarkdownIt
+        from mdit_py_plugins.deflist import deflist_plugin
+        from mdit_py_plugins.footnote import footnote_plugin
+
+        # CommonMark + GFM 表格/删除线/自动链接 + 脚注、定义列表，任务列表见 _mark_task_items，对应 Hugo 默认启用的扩展
+        md = (
+            MarkdownIt('commonmark', {'html': True, 'linkify': True, 'typographer': True})
+            .enable(['table', 'strikethrough', 'linkify', 'replacements', 'smartquotes'])
+            .use(footnote_plugin)
+            .use(deflist_plugin)
+        )
+        # 解析原始 HTML 后丢弃，而不是转义成文本
+        md.add_render_rule('html_block', lambda *args: RAW_HTML_OMITTED + '\n')
+        md.add_render_rule('html_inline', lambda *args: RAW_HTML_OMITTED)
+        md.add_render_rule('task_checkbox', lambda self, tokens, idx, options, env: (
+            '<input checked="" disabled="" type="checkbox">' if tokens[idx].meta['checked']
+            else '<input disabled="" type="checkbox">'
+        ))
+        return md
+
+    def render(self, markdown_content: str, sha: Optional[str] = None) -> Dict[str, Any]:
+        """
+        渲染一篇 Markdown 文章
+
+        参数:
+            markdown_content: 文件内容（可含 front matter）
+            sha: 文件的 blob SHA，作为缓存键；为空时按内容哈希
+
+        返回:
+            {'front_matter', 'html', 'toc': [{'level', 'title', 'id'}], 'word_count', 'reading_time'}
+        """
+        key = sha or hashlib.blake2b(markdown_content.encode('utf-8'), digest_size=16).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        parsed = self.markdown_generator.parse_front_matter(markdown_content)
+        body = parsed['content']
+
+        tokens = self.md.parse(body, {})
+        toc = self._assign_heading_ids(tokens)
+        self._mark_task_items(tokens)
+        analysis = self.markdown_generator.analyze(body)
+
+        result = {
+            'front_matter': parsed['front_matter'],
+            'html': self.md.renderer.render(tokens, self.md.options, {}),
+            'toc': toc,
+            'word_count': analysis['word_count'],
+            'reading_time': analysis['reading_time']
+        }
+
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def _assign_heading_ids(self, tokens) -> List[Dict[str, Any]]:
+        """
+        为标题生成与 Hugo 相同的 id（重复的依次加 -1、-2），并收集目录
+        """
+        toc = []
+        used = {}
+        for i, token in enumerate(tokens):
+            if token.type != 'heading_open':
+                continue
+            title = ''.join(
+                child.content for child in tokens[i + 1].children or []
+                if child.type in ('text', 'code_inline', 'softbreak')
+            ).strip()
+            anchor = self._anchor(title) or 'heading'
+            if anchor in used:
+                used[anchor] += 1
+                anchor = f'{anchor}-{used[anchor]}'
+            else:
+                used[anchor] = 0
+            token.attrSet('id', anchor)
+
+            level = int(token.tag[1])
+            if TOC_START_LEVEL <= level <= TOC_END_LEVEL:
+                toc.append({'level': level, 'title': title, 'id': anchor})
+        return toc
+
+    def _mark_task_items(self, tokens):
+        """
+        把以 [ ] / [x] 开头的列表项转为复选框
+        """
+        from markdown_it.token import Token
+
+        for i, token in enumerate(tokens):
+            if (token.type != 'inline' or i < 2 or not token.children
+                    or tokens[i - 1].type != 'paragraph_open' or tokens[i - 2].type != 'list_item_open'):
+                continue
+            first = token.children[0]
+            match = TASK_MARKER.match(first.content) if first.type == 'text' else None
+            if not match:
+                continue
+            first.content = first.content[match.end():]
+            token.children.insert(0, Token('task_checkbox', 'input', 0, meta={'checked': match.group(1) != ' '}))
+
+    def _anchor(self, text: str) -> str:
+        # Hugo autoHeadingIDType = "github"：保留字母、数字、- 和 _，空格变为 -，其余字符去掉
+        chars = []
+        for char in text.lower():
+            if char == ' ':
+                chars.append('-')
+            elif char in '-_' or unicodedata.category(char)[0] in ('L', 'N'):
+                chars.append(char)
+        return ''.join(chars)
@@ -1,7 +1,39 @@
-import requests
-from bs4 import BeautifulSoup
+import os
+import time
+import codecs
 import re
-from markdownify import markdownify as md
+
+from .lazy import lazy_import
+from .page_cache import page_cache
+from .cpu_pool import cpu_pool
+
+requests = lazy_import('requests')
+
+# Prefer the C-based lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+JUNK_TAGS = {'script', 'style', 'nav', 'footer', 'iframe', 'noscript'}
+SCORED_TAGS = {'p', 'pre', 'blockquote', 'li', 'td', 'h2', 'h3', 'h4', 'section'}
+CONTENT_CLASS = re.compile(r'post-content|article-content|entry-content|content|main', re.I)
+MIN_PARAGRAPH_LENGTH = 25
+HINT_BONUS = 1.25
+
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml'}
+MAX_PAGE_BYTES = int(os.environ.get('SCRAPER_MAX_BYTES', 5 * 1024 * 1024))
+MAX_DOWNLOAD_SECONDS = float(os.environ.get('SCRAPER_MAX_SECONDS', 20))
+CHUNK_SIZE = 64 * 1024
+META_SCAN_BYTES = 4096
+DETECT_SAMPLE_BYTES = 32 * 1024
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
 
 def fetch_article_content(url):
     """
@@ -9,77 +41,301 @@ def fetch_article_content(url):
     Returns a dictionary with 'title' and 'content', or None on failure.
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        # Serve from the page cache while fresh, otherwise revalidate with ETag/Last-Modified
+        entry = page_cache.lookup(url)
+        if entry and entry['fresh']:
+            cached = page_cache.extracted(entry, extract_article)
+            if cached is not None:
+                return cached
+
+        response, html = download_page(url, page_cache.validators(entry))
+        if response.status_code == 304 and entry:
+            page_cache.revalidated(entry, response.headers)
+            cached = page_cache.extracted(entry, extract_article)
+            if cached is not None:
+                return cached
+            response, html = download_page(url)
+
+        result = extract_article(html)
+        page_cache.store(url, html, result, response.headers)
+        return result
+
+    except Exception as e:
+        print(f"Error fetching URL {url}: {e}")
+        return None
+
+
+def download_page(url, extra_headers=None):
+    """
+    Stream an HTML page with a byte cap and an overall deadline.
+    Returns (response, html); html is None for a 304 response.
+    Raises ValueError for non-HTML content types.
+    """
+    headers = dict(REQUEST_HEADERS, **(extra_headers or {}))
+    response = requests.get(url, headers=headers, timeout=10, stream=True)
+    try:
+        if response.status_code == 304:
+            return response, None
         response.raise_for_status()
-        
-        # Determine encoding if possible, else default to utf-8 or apparent_encoding
-        if response.encoding == 'ISO-8859-1':
-            response.encoding = response.apparent_encoding
-            
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "iframe", "noscript"]):
-            script.decompose()
-            
+        content_type = check_content_type(response.headers)
+
+        reader = BodyReader(url)
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if not reader.feed(chunk):
+                break
+        return response, decode_html(reader.body, content_type)
+    finally:
+        response.close()
+
+
+def check_content_type(headers):
+    """
+    Abort before reading the body when the response is clearly not an HTML page.
+    """
+    content_type = headers.get('Content-Type', '')
+    mime = content_type.split(';', 1)[0].strip().lower()
+    if mime and mime not in HTML_CONTENT_TYPES:
+        raise ValueError(f'Unsupported content type: {mime}')
+    return content_type
+
+
+class BodyReader:
+    """
+    Accumulates response chunks up to MAX_PAGE_BYTES (the rest of the page is dropped)
+    and enforces MAX_DOWNLOAD_SECONDS across the whole download.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.chunks = []
+        self.size = 0
+        self.deadline = time.monotonic() + MAX_DOWNLOAD_SECONDS
+
+    @property
+    def body(self):
+        return b''.join(self.chunks)
+
+    def feed(self, chunk):
+        """Add a chunk; returns False once the byte cap is reached."""
+        if time.monotonic() > self.deadline:
+            raise TimeoutError(f'Download exceeded {MAX_DOWNLOAD_SECONDS:.0f}s')
+        remaining = MAX_PAGE_BYTES - self.size
+        if len(chunk) >= remaining:
+            self.chunks.append(chunk[:remaining])
+            self.size = MAX_PAGE_BYTES
+            print(f"Warning: {self.url} truncated at {MAX_PAGE_BYTES} bytes")
+            return False
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        return True
+
+
+def decode_html(body, content_type=''):
+    """
+    Decode a page without running detection over the whole body.
+    Order: Content-Type charset, BOM, <meta> charset in the first few KB,
+    strict UTF-8, then detection on a sample.
+    """
+    encoding = (_charset_param(content_type) or _bom_charset(body)
+                or _meta_charset(body[:META_SCAN_BYTES]))
+    if not encoding:
+        try:
+            return body.decode('utf-8')
+        except UnicodeDecodeError:
+            encoding = _detect_charset(body[:DETECT_SAMPLE_BYTES])
+    return body.decode(_normalize_charset(encoding), errors='replace')
+
+
+def _charset_param(content_type):
+    match = re.search(r'charset=["\']?([\w.:-]+)', content_type or '', re.I)
+    return match.group(1) if match else None
+
+
+def _bom_charset(body):
+    for bom, name in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'),
+                      (codecs.BOM_UTF16_BE, 'utf-16')):
+        if body.startswith(bom):
+            return name
+    return None
+
+
+def _meta_charset(head):
+    match = META_CHARSET.search(head)
+    return match.group(1).decode('ascii', 'ignore') if match else None
+
+
+def _detect_charset(sample):
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(sample).best()
+        return best.encoding if best else 'utf-8'
+    except ImportError:
+        return 'utf-8'
+
+
+def _normalize_charset(encoding):
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        return 'utf-8'
+    # GB2312/GBK pages routinely contain GB18030-only characters
+    return 'gb18030' if name in ('gb2312', 'gbk') else name
+
+
+def extract_article(html):
+    """
+    Run parse_article_html, in the CPU pool when the page is large enough to be worth it,
+    so a big page does not hold the GIL while other requests are being served.
+    """
+    return cpu_pool.run(parse_article_html, html)
+
+
+def parse_article_html(html):
+    """
+    Extract title and main content (as Markdown) from an HTML document.
+    Shared by the sync fetcher and the async engine; returns None if no content is found.
+
+    The document is parsed once (with lxml when installed) and walked once: junk tags are
+    dropped, lazy images fixed, and every container is scored by the non-link text of the
+    paragraphs it holds. The winning element is converted to Markdown in place.
+    """
+    # bs4 and markdownify are imported on first use to keep them off the cold-start path
+    from bs4 import BeautifulSoup
+    from markdownify import MarkdownConverter
+
+    try:
+        soup = BeautifulSoup(html, HTML_PARSER)
+        scan = _scan_document(soup)
+
         # Extract title
         title = ""
-        if soup.title:
+        if soup.title and soup.title.string:
             title = soup.title.string
-        
-        h1 = soup.find('h1')
-        if h1:
-            title = h1.get_text().strip()
-            
-        # Extract content - Primitive heuristic: find the container with the most p tags or longest text
-        # Better: look for <article>, <main>, or div with class containing 'content', 'article', 'post'
-        
-        # WeChat specific handling
-        article = soup.find(id='js_content')
-        if not article:
-            article = soup.find(class_='rich_media_content')
+        if scan['h1'] is not None:
+            title = scan['h1'].get_text().strip()
 
-        if not article:
-            article = soup.find('article')
-            
-        if not article:
-            article = soup.find('main')
-            
-        if not article:
-            # Fallback: specific common classes
-            potential_classes = ['post-content', 'article-content', 'entry-content', 'content', 'main']
-            for cls in potential_classes:
-                article = soup.find(class_=re.compile(cls, re.I))
-                if article:
-                    break
-        
-        if not article:
-            # Fallback: body
-            article = soup.body
-            
+        article = _pick_article(soup, scan)
         if not article:
             return None
 
-        # Pre-process: Handle lazy loading images (especially WeChat)
-        # WeChat uses data-src instead of src
-        for img in article.find_all('img'):
-            if img.get('data-src'):
-                img['src'] = img['data-src']
-                # Clean up other attributes to keep markdown clean? 
-                # markdownify usually just takes src.
-
-        # Convert to Markdown using markdownify to preserve layout (headers, lists, links, images)
-        # We strip the article content to remove surrounding whitespace
-        text = md(str(article), heading_style="ATX", strip=['script', 'style'])
-        
+        # Convert the chosen subtree directly, without serializing and re-parsing it
+        text = MarkdownConverter(heading_style="ATX").process_tag(article, convert_as_inline=False)
+
         return {
             'title': title.strip() if title else "",
             'content': text.strip()
         }
 
     except Exception as e:
-        print(f"Error fetching URL {url}: {e}")
+        print(f"Error parsing HTML: {e}")
         return None
+
+
+def _scan_document(soup):
+    """
+    Single post-order traversal collecting everything the extractor needs.
+
+    Returns text/link lengths and paragraph scores keyed by id(element), the first <h1>,
+    the WeChat content container and the first element of each structural hint.
+    """
+    from bs4 import NavigableString, Tag
+
+    nodes = {}      # id -> element
+    lengths = {}    # id -> [text length, link text length]
+    scores = {}     # id -> accumulated paragraph score
+    hints = {}      # hint kind -> first matching element
+    found = {'h1': None, 'wechat': None}
+
+    stack = [(soup, False)]
+    while stack:
+        el, visited = stack.pop()
+        key = id(el)
+
+        if not visited:
+            if el.name in JUNK_TAGS:
+                el.decompose()
+                continue
+
+            nodes[key] = el
+            lengths[key] = [0, 0]
+            _note_hints(el, found, hints)
+
+            # WeChat (and others) lazy-load images through data-src
+            if el.name == 'img' and el.get('data-src'):
+                el['src'] = el['data-src']
+
+            stack.append((el, True))
+            children = []
+            for child in el.contents:
+                if isinstance(child, Tag):
+                    children.append((child, False))
+                elif type(child) is NavigableString:
+                    lengths[key][0] += len(child.strip())
+            # Reverse so children are visited in document order
+            stack.extend(reversed(children))
+            continue
+
+        text_len, link_len = lengths[key]
+        if el.name == 'a':
+            link_len = lengths[key][1] = text_len
+
+        parent = el.parent
+        if parent is None or id(parent) not in lengths:
+            continue
+        lengths[id(parent)][0] += text_len
+        lengths[id(parent)][1] += link_len
+
+        if el.name in SCORED_TAGS and text_len >= MIN_PARAGRAPH_LENGTH:
+            score = text_len - link_len
+            scores[id(parent)] = scores.get(id(parent), 0) + score
+            grandparent = parent.parent
+            if grandparent is not None and id(grandparent) in lengths:
+                scores[id(grandparent)] = scores.get(id(grandparent), 0) + score / 2
+
+    return {'nodes': nodes, 'lengths': lengths, 'scores': scores, 'hints': hints, **found}
+
+
+def _note_hints(el, found, hints):
+    if el.name == 'h1' and found['h1'] is None:
+        found['h1'] = el
+    if found['wechat'] is None and (el.get('id') == 'js_content' or 'rich_media_content' in (el.get('class') or [])):
+        found['wechat'] = el
+    if el.name in ('article', 'main'):
+        hints.setdefault(el.name, el)
+    elif el.get('class') and CONTENT_CLASS.search(' '.join(el.get('class'))):
+        hints.setdefault('class', el)
+
+
+def _pick_article(soup, scan):
+    """
+    Choose the content container: WeChat body, else the best-scoring element
+    (link-dense blocks are penalized, <article>/<main>/content classes get a bonus),
+    else the first structural hint, else <body>.
+    """
+    if scan['wechat'] is not None:
+        return scan['wechat']
+
+    nodes, lengths = scan['nodes'], scan['lengths']
+    hinted = {id(el) for el in scan['hints'].values()}
+
+    def adjusted(key):
+        text_len, link_len = lengths[key]
+        density = link_len / text_len if text_len else 1
+        return scan['scores'].get(key, 0) * (1 - density) * (HINT_BONUS if key in hinted else 1)
+
+    best = max(scan['scores'], key=adjusted, default=None)
+    if best is None or adjusted(best) <= 0:
+        for kind in ('article', 'main', 'class'):
+            if kind in scan['hints']:
+                return scan['hints'][kind]
+        return soup.body
+
+    # Content split across sibling blocks: move up while the parent gathers a comparable score
+    best_score = adjusted(best)
+    element = nodes[best]
+    while element.parent is not None and id(element.parent) in scan['scores'] \
+            and element.parent.name not in ('body', 'html', '[document]') \
+            and adjusted(id(element.parent)) >= best_score * 0.66:
+        element = element.parent
+        best_score = max(best_score, adjusted(id(element)))
+    return element
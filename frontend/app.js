@@ -161,11 +161,27 @@ class HugoPublisher {
                     content: content,
                     title: this.titleInput.value.trim(),
                     tags: this.getTags(),
-                    category: this.categorySelect.value
+                    category: this.categorySelect.value,
+                    stream: true
                 })
             });
 
-            const data = await response.json();
+            // 流式返回 NDJSON：逐行处理进度事件，最后一行为结果
+            let data = null;
+            await this.readNdjson(response, (event) => {
+                if (event.type === 'progress') {
+                    this.showLoading(`${event.message} (${event.progress}%)`);
+                    if (event.partial_content) {
+                        this.updatePreview(event.partial_content);
+                    }
+                } else {
+                    data = event;
+                }
+            });
+
+            if (!data) {
+                data = { success: false, error: '未收到排版结果' };
+            }
 
             if (data.success) {
                 this.currentContent = data.formatted_content;
@@ -198,6 +214,87 @@ class HugoPublisher {
 
 
 
+    async readNdjson(response, onEvent) {
+        // 非流式响应（如参数错误）直接按普通 JSON 处理
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('ndjson') || !response.body) {
+            onEvent(await response.json());
+            return;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let newlineIndex;
+            while ((newlineIndex = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newlineIndex).trim();
+                buffer = buffer.slice(newlineIndex + 1);
+                if (line) onEvent(JSON.parse(line));
+            }
+        }
+
+        if (buffer.trim()) onEvent(JSON.parse(buffer));
+    }
+
+    async runPublish(payload, onUpdate) {
+        // 无服务器部署在请求内发布并以 NDJSON 推送任务状态；常驻部署返回 job_id，改为轮询 /api/status
+        const response = await fetch(`${this.apiBaseUrl}/api/publish`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
+        });
+
+        let job = null;
+        let queued = null;
+        await this.readNdjson(response, (event) => {
+            if (event.job) {
+                job = event.job;
+                onUpdate(job);
+            } else {
+                queued = event;
+            }
+        });
+
+        if (job) {
+            if (!['completed', 'failed'].includes(job.status)) {
+                return { ...job, status: 'failed', error: '连接中断，发布未完成' };
+            }
+            return job;
+        }
+        if (!queued || !queued.success || !queued.job_id) {
+            return { status: 'failed', progress: 0, message: '', error: (queued && queued.error) || '发布失败' };
+        }
+
+        onUpdate({ id: queued.job_id, status: 'queued', progress: 10, message: '已加入队列' });
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const statusResponse = await fetch(`${this.apiBaseUrl}/api/status/${queued.job_id}`);
+            const data = await statusResponse.json();
+            if (!data.success) {
+                return { status: 'failed', progress: 0, message: '', error: '无法获取任务状态' };
+            }
+            onUpdate(data.job);
+            if (['completed', 'failed'].includes(data.job.status)) {
+                return data.job;
+            }
+        }
+    }
+
+    applyJobUpdate(job, update) {
+        job.status = update.status;
+        job.progress = update.progress;
+        job.message = update.status === 'failed' ? (update.error || update.message) : update.message;
+        job.result = update.result;
+        if (update.error) job.error = update.error;
+        this.renderJobQueue();
+    }
+
     async handlePublishWithPassword() {
         const title = this.titleInput.value.trim();
         const content = this.currentContent || this.contentTextarea.value.trim();
@@ -252,44 +349,34 @@ class HugoPublisher {
         });
         this.renderJobQueue();
 
-        // Submit all jobs sequentially to backend (or parallel, but backend is queue-based anyway)
-        for (let i = 0; i < urls.length; i++) {
-            const url = urls[i];
-            try {
-                // Submit job
-                const response = await fetch(`${this.apiBaseUrl}/api/publish`, {
-                    method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify({
+        // 同时进行的发布请求数（流式发布时每个请求会保持到任务结束）
+        const concurrency = 3;
+        let next = 0;
+        const runNext = async () => {
+            while (next < urls.length) {
+                const i = next++;
+                try {
+                    const job = await this.runPublish({
                         title: '', // Auto-detect
-                        content: url,
+                        content: urls[i],
                         tags: this.getTags(),
                         category: this.categorySelect.value,
                         target_dir: this.targetDirSelect.value,
                         draft: this.isDraftCheckbox.checked,
                         auto_format: true
-                    })
-                });
-
-                const data = await response.json();
-                if (data.success) {
-                    this.jobs[i].id = data.job_id;
-                    this.jobs[i].status = 'queued';
-                    this.jobs[i].message = '已加入队列';
-                    this.jobs[i].progress = 10;
-                } else {
-                    this.jobs[i].status = 'failed';
-                    this.jobs[i].message = data.error || '提交失败';
+                    }, (update) => this.applyJobUpdate(this.jobs[i], update));
+                    this.applyJobUpdate(this.jobs[i], job);
+                } catch (error) {
+                    this.applyJobUpdate(this.jobs[i], { status: 'failed', progress: 0, message: `网络错误: ${error.message}` });
                 }
-            } catch (error) {
-                this.jobs[i].status = 'failed';
-                this.jobs[i].message = `网络错误: ${error.message}`;
             }
-            this.renderJobQueue();
-        }
+        };
+        await Promise.all(Array.from({ length: Math.min(concurrency, urls.length) }, runNext));
 
-        // Start polling
-        this.pollJobs();
+        this.setButtonsDisabled(false);
+        if (this.jobs.every(j => j.status === 'completed')) {
+            this.showNotification('所有任务处理完成!', 'success');
+        }
     }
 
     async publishArticle() {
@@ -326,35 +413,20 @@ class HugoPublisher {
         this.renderJobQueue();
 
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/publish`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    title: title,
-                    content: content,
-                    tags: this.getTags(),
-                    category: this.categorySelect.value,
-                    target_dir: this.targetDirSelect.value,
-                    draft: this.isDraftCheckbox.checked,
-                    auto_format: !alreadyFormatted  // 已手动优化则跳过自动优化
-                })
-            });
+            const job = await this.runPublish({
+                title: title,
+                content: content,
+                tags: this.getTags(),
+                category: this.categorySelect.value,
+                target_dir: this.targetDirSelect.value,
+                draft: this.isDraftCheckbox.checked,
+                auto_format: !alreadyFormatted  // 已手动优化则跳过自动优化
+            }, (update) => this.applyJobUpdate(this.jobs[0], update));
+            this.applyJobUpdate(this.jobs[0], job);
 
-            const data = await response.json();
-
-            if (data.success && data.job_id) {
-                this.jobs[0].id = data.job_id;
-                this.jobs[0].status = 'queued';
-                this.jobs[0].message = '已加入队列';
-                this.renderJobQueue();
-                this.pollJobs();
-            } else {
-                this.jobs[0].status = 'failed';
-                this.jobs[0].message = data.error || '发布失败';
-                this.renderJobQueue();
-                this.handlePublishError(data.error || '发布失败');
+            this.setButtonsDisabled(false);
+            if (job.status !== 'completed') {
+                this.handlePublishError(job.error || '发布失败');
             }
         } catch (error) {
             console.error('发布错误:', error);
@@ -402,51 +474,6 @@ class HugoPublisher {
         });
     }
 
-    async pollJobs() {
-        const pollInterval = 1000;
-        let activeJobs = this.jobs.filter(j => j.id && !['completed', 'failed'].includes(j.status));
-
-        if (activeJobs.length === 0) {
-            // All done (or none started)
-            this.setButtonsDisabled(false);
-
-            // If all completed successfully
-            if (this.jobs.every(j => j.status === 'completed')) {
-                this.showNotification('所有任务处理完成!', 'success');
-            }
-            return;
-        }
-
-        // Poll each active job
-        for (const job of activeJobs) {
-            try {
-                const response = await fetch(`${this.apiBaseUrl}/api/status/${job.id}`);
-                const data = await response.json();
-
-                if (data.success) {
-                    const updatedJob = data.job;
-                    // Update local job state
-                    job.status = updatedJob.status;
-                    job.progress = updatedJob.progress;
-                    job.message = updatedJob.message;
-                    job.result = updatedJob.result;
-                    if (updatedJob.error) job.error = updatedJob.error;
-
-                    // If we found a refined title, update it
-                    // (Backend doesn't return title in status, but maybe we can infer or backend could added it. 
-                    //  For now, use message or just keep URL)
-                }
-            } catch (error) {
-                console.error(`Poll error for ${job.id}:`, error);
-            }
-        }
-
-        this.renderJobQueue();
-
-        // Continue polling if there are still active jobs
-        setTimeout(() => this.pollJobs(), pollInterval);
-    }
-
     showPasswordDialog(action, onSuccess) {
         // 移除已存在的对话框
         const existingDialog = document.getElementById('passwordDialog');
@@ -559,29 +586,20 @@ class HugoPublisher {
         this.showLoading(loadingMsg);
 
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/publish`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    title: title,
-                    content: content,
-                    tags: this.getTags(),
-                    category: this.categorySelect.value,
-                    target_dir: this.targetDirSelect.value,
-                    draft: this.isDraftCheckbox.checked,
-                    auto_format: !alreadyFormatted  // 已手动优化则跳过自动优化
-                })
-            });
-
-            const data = await response.json();
-
-            if (data.success && data.job_id) {
-                this.showNotification('任务提交成功，正在后台处理...', 'success');
-                this.pollStatus(data.job_id);
+            const job = await this.runPublish({
+                title: title,
+                content: content,
+                tags: this.getTags(),
+                category: this.categorySelect.value,
+                target_dir: this.targetDirSelect.value,
+                draft: this.isDraftCheckbox.checked,
+                auto_format: !alreadyFormatted  // 已手动优化则跳过自动优化
+            }, (update) => this.showLoading(`${update.message} (${update.progress}%)`));
+
+            if (job.status === 'completed') {
+                this.handlePublishSuccess(job.result);
             } else {
-                this.handlePublishError(data.error || '发布失败');
+                this.handlePublishError(job.error || '发布失败');
             }
         } catch (error) {
             console.error('发布错误:', error);
@@ -589,39 +607,6 @@ class HugoPublisher {
         }
     }
 
-    async pollStatus(jobId) {
-        const pollInterval = 1000; // 1 second
-
-        const checkStatus = async () => {
-            try {
-                const response = await fetch(`${this.apiBaseUrl}/api/status/${jobId}`);
-                const data = await response.json();
-
-                if (data.success) {
-                    const job = data.job;
-                    this.showLoading(`${job.message} (${job.progress}%)`);
-
-                    if (job.status === 'completed') {
-                        this.handlePublishSuccess(job.result);
-                    } else if (job.status === 'failed') {
-                        this.handlePublishError(job.error);
-                    } else {
-                        // Continue polling
-                        setTimeout(checkStatus, pollInterval);
-                    }
-                } else {
-                    this.handlePublishError('无法获取任务状态');
-                }
-            } catch (error) {
-                console.error('Polling error:', error);
-                this.handlePublishError(`状态查询失败: ${error.message}`);
-            }
-        };
-
-        // Start polling
-        checkStatus();
-    }
-
     handlePublishSuccess(result) {
         this.hideLoading();
         this.publishBtn.disabled = false;
@@ -315,12 +315,12 @@ class ArticleBrowser {
         this.showLoading('加载文章...');
 
         try {
-            const response = await fetch(`${this.apiBaseUrl}/api/file?path=${encodeURIComponent(path)}`);
+            // 服务端渲染好的 HTML 和目录（按文件版本缓存）
+            const response = await fetch(`${this.apiBaseUrl}/api/render?path=${encodeURIComponent(path)}`);
             const data = await response.json();
 
             if (data.success) {
-                // API 已返回解码后的 UTF-8 文本，直接使用
-                this.displayArticle(data.content);
+                this.displayArticle(data);
             } else {
                 this.articleBody.innerHTML = `<p class="empty-text">加载失败: ${data.error}</p>`;
             }
@@ -332,92 +332,40 @@ class ArticleBrowser {
         }
     }
 
-    displayArticle(content) {
-        const { frontMatter, body } = this.parseFrontMatter(content);
+    displayArticle(data) {
+        const frontMatter = data.front_matter || {};
+        const toList = (value) => Array.isArray(value) ? value : (value ? [value] : []);
+        const categories = toList(frontMatter.categories);
+        const tags = toList(frontMatter.tags);
 
         this.articleTitle.textContent = frontMatter.title || '无标题';
-        this.articleDate.textContent = frontMatter.date ? `📅 ${frontMatter.date}` : '';
-        this.articleCategory.textContent = frontMatter.categories?.length ? `📁 ${frontMatter.categories.join(', ')}` : '';
-        this.articleTags.textContent = frontMatter.tags?.length ? `🏷️ ${frontMatter.tags.join(', ')}` : '';
+        this.articleDate.textContent = frontMatter.date ? `📅 ${String(frontMatter.date).split('T')[0]}` : '';
+        this.articleCategory.textContent = categories.length ? `📁 ${categories.join(', ')}` : '';
+        this.articleTags.textContent = tags.length ? `🏷️ ${tags.join(', ')}` : '';
 
-        this.articleBody.innerHTML = this.renderMarkdown(body);
+        this.articleBody.innerHTML = this.renderToc(data.toc || []) + data.html;
 
         this.contentPlaceholder.classList.add('hidden');
         this.articleContent.classList.remove('hidden');
     }
 
-    parseFrontMatter(content) {
-        const result = {
-            frontMatter: { title: '', date: '', categories: [], tags: [] },
-            body: content
-        };
-
-        const lines = content.split('\n');
-        let inFrontMatter = false;
-        let frontMatterEnd = 0;
-
-        for (let i = 0; i < lines.length; i++) {
-            const line = lines[i].trim();
-
-            if (line === '---') {
-                if (!inFrontMatter) {
-                    inFrontMatter = true;
-                    continue;
-                } else {
-                    frontMatterEnd = i;
-                    break;
-                }
-            }
-
-            if (inFrontMatter && line.includes(':')) {
-                const colonIndex = line.indexOf(':');
-                const key = line.slice(0, colonIndex).trim();
-                const value = line.slice(colonIndex + 1).trim();
-
-                if (key === 'title') {
-                    result.frontMatter.title = value.replace(/^["']|["']$/g, '');
-                } else if (key === 'date') {
-                    result.frontMatter.date = value.split('T')[0];
-                } else if (key === 'categories' || key === 'tags') {
-                    const match = value.match(/\[([^\]]*)\]/);
-                    if (match) {
-                        result.frontMatter[key] = match[1].split(',').map(t => t.trim().replace(/["']/g, '')).filter(t => t);
-                    }
-                }
-            }
-        }
-
-        if (frontMatterEnd > 0) {
-            result.body = lines.slice(frontMatterEnd + 1).join('\n').trim();
-        }
-
-        return result;
-    }
-
-    renderMarkdown(markdown) {
-        let html = markdown
-            .replace(/^### (.+)$/gm, '<h3>$1</h3>')
-            .replace(/^## (.+)$/gm, '<h2>$1</h2>')
-            .replace(/^# (.+)$/gm, '<h1>$1</h1>')
-            .replace(/\*\*(.+?)\*\*/g, '<strong>$1</strong>')
-            .replace(/\*(.+?)\*/g, '<em>$1</em>')
-            .replace(/`([^`]+)`/g, '<code>$1</code>')
-            .replace(/```(\w+)?\n([\s\S]+?)```/g, '<pre><code class="language-$1">$2</code></pre>')
-            .replace(/\[(.+?)\]\((.+?)\)/g, '<a href="$2" target="_blank">$1</a>')
-            .replace(/^> (.+)$/gm, '<blockquote>$1</blockquote>')
-            .replace(/!\[([^\]]*)\]\(([^)]+)\)/g, '<img src="$2" alt="$1">')
-            .replace(/^- (.+)$/gm, '<li>$1</li>')
-            .replace(/^\d+\. (.+)$/gm, '<li>$1</li>')
-            .replace(/\n\n/g, '</p><p>')
-            .replace(/^(?!<[hpulob])(.+)$/gm, '<p>$1</p>');
-
-        // 处理列表包装
-        html = html.replace(/(<li>.*<\/li>\n?)+/g, (match) => `<ul>${match}</ul>`);
-
-        // 合并连续的 blockquote
-        html = html.replace(/<\/blockquote>\s*<blockquote>/g, '<br>');
-
-        return html;
+    renderToc(toc) {
+        if (toc.length < 2) return '';
+
+        const nav = document.createElement('nav');
+        nav.className = 'article-toc';
+        const list = document.createElement('ul');
+        toc.forEach(item => {
+            const li = document.createElement('li');
+            li.className = `toc-level-${item.level}`;
+            const link = document.createElement('a');
+            link.href = `#${item.id}`;
+            link.textContent = item.title;
+            li.appendChild(link);
+            list.appendChild(li);
+        });
+        nav.appendChild(list);
+        return nav.outerHTML;
     }
 
     confirmDeleteArticle(path, name) {
@@ -0,0 +1,40 @@
+import queue
+import asyncio
+
+from backend import app as app_module
+from backend.services.deepseek import PRIORITY_BATCH, PRIORITY_INTERACTIVE, current_priority, current_usage
+
+
+def test_async_worker_runs_streamed_publishes_at_interactive_priority(monkeypatch):
+    seen = []
+
+    async def publish(job_id, data, engine, generator):
+        seen.append(current_priority())
+
+    monkeypatch.setattr(app_module, 'process_publish_task_async', publish)
+    monkeypatch.setitem(app_module.jobs, 'queued', {})
+    monkeypatch.setitem(app_module.jobs, 'streamed', {})
+
+    asyncio.run(app_module.async_worker('queued', {}))
+    asyncio.run(app_module.async_worker('streamed', {}, PRIORITY_INTERACTIVE))
+
+    assert seen == [PRIORITY_BATCH, PRIORITY_INTERACTIVE]
+
+
+def test_completed_update_carries_token_usage(monkeypatch):
+    events = queue.Queue()
+
+    async def publish(job_id, data, engine, generator):
+        current_usage().add({'prompt_tokens': 10, 'completion_tokens': 5, 'total_tokens': 15})
+        result = {'success': True, 'file_path': 'content/posts/a.md', 'url': 'https://example.com/a'}
+        app_module._complete_job(job_id, result, [], [], {'images': [], 'failed_images': []})
+
+    monkeypatch.setattr(app_module, 'process_publish_task_async', publish)
+    monkeypatch.setitem(app_module.jobs, 'job', {'status': 'processing'})
+    monkeypatch.setitem(app_module.job_listeners, 'job', events)
+
+    asyncio.run(app_module.async_worker('job', {}))
+
+    update = events.get_nowait()
+    assert update['status'] == 'completed'
+    assert update['usage']['total_tokens'] == 15
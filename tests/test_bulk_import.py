@@ -0,0 +1,81 @@
+from backend.services.bulk_import import BulkImporter, STATUS_COMMITTED, STATUS_FAILED, tomllib
+from backend.utils.formatter import MarkdownFormatter
+from backend.utils.markdown import MarkdownGenerator
+
+
+def convert(text):
+    importer = BulkImporter(None, None, MarkdownGenerator(), MarkdownFormatter())
+    options = {'target_dir': 'content/posts', 'auto_format': False, 'draft': False,
+               'keep_filenames': True, 'category': '', 'tags': []}
+    return importer._convert('posts/hello.md', text.encode('utf-8'), options)
+
+
+def front_matter(item):
+    return MarkdownGenerator().parse_front_matter(item['content'])['front_matter']
+
+
+def test_unknown_keys_are_kept():
+    item = convert('---\n'
+                   'title: Hello\n'
+                   'date: 2024-01-02T03:04:05+08:00\n'
+                   'lastmod: 2024-05-06T00:00:00+08:00\n'
+                   'slug: hello-world\n'
+                   'aliases:\n'
+                   '  - /old/hello\n'
+                   'params:\n'
+                   '  toc: true\n'
+                   '---\n'
+                   'Body text.\n')
+
+    assert item['status'] == STATUS_COMMITTED
+    parsed = front_matter(item)
+    assert parsed['title'] == 'Hello'
+    assert parsed['slug'] == 'hello-world'
+    assert parsed['lastmod'] == '2024-05-06T00:00:00+08:00'
+    assert item['content'].count('lastmod:') == 1
+    assert 'aliases:\n  - /old/hello\nparams:\n  toc: true\n---' in item['content']
+    assert 'warnings' not in item
+
+
+def test_block_list_tags_are_parsed():
+    item = convert('---\ntitle: Hello\ntags:\n  - go\n  - "a, b"\n---\nBody text.\n')
+
+    assert front_matter(item)['tags'] == ['go', 'a, b']
+
+
+def test_nested_generated_key_is_reported():
+    item = convert('---\ntitle: Hello\ndescription:\n  en: English\n---\nBody text.\n')
+
+    assert item['status'] == STATUS_COMMITTED
+    assert item['warnings'] == ['字段 description 的写法无法解析，已忽略']
+
+
+def test_toml_front_matter_is_converted():
+    item = convert('+++\n'
+                   'title = "Hello"\n'
+                   'date = 2024-01-02T03:04:05+08:00\n'
+                   'tags = ["go", "web"]\n'
+                   'slug = "hello-world"\n'
+                   '[params]\n'
+                   'toc = true\n'
+                   '+++\n'
+                   'Body text.\n')
+
+    if tomllib is None:
+        assert item['status'] == STATUS_FAILED
+        return
+    assert item['status'] == STATUS_COMMITTED
+    assert item['warnings'] == ['TOML front matter 已转换为 YAML']
+    parsed = front_matter(item)
+    assert parsed['title'] == 'Hello'
+    assert parsed['date'] == '2024-01-02T03:04:05+08:00'
+    assert parsed['tags'] == ['go', 'web']
+    assert parsed['slug'] == 'hello-world'
+    assert 'params: {"toc": true}' in item['content']
+    assert '+++' not in item['content']
+
+
+def test_invalid_toml_fails_the_entry():
+    item = convert('+++\ntitle = \n+++\nBody text.\n')
+
+    assert item['status'] == STATUS_FAILED
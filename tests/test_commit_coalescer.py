@@ -0,0 +1,158 @@
+import base64
+import asyncio
+
+from backend.services.commit_coalescer import CommitCoalescer, CoalescingGitHubService
+from backend.services.github import git_blob_sha
+
+
+def sha(content):
+    return git_blob_sha(content.encode('utf-8'))
+
+
+class FakeGitHubService:
+    """内存中的仓库，upload_file 与 GitHub 一样在 known_sha 过期时返回冲突"""
+
+    base_url = 'https://api.github.invalid'
+    username = 'owner'
+    repo = 'blog'
+    headers = {}
+
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+        self.commits = []
+
+    def file_exists(self, path):
+        return path in self.files
+
+    def upload_file(self, content, filename, target_dir='content/posts', message='Update file', branch='main',
+                    is_binary=False, known_sha=None):
+        path = f'{target_dir}/{filename}'
+        current = self.files.get(path)
+        if known_sha and current is not None and known_sha != sha(current):
+            return {'success': False, 'error': '409 Client Error: Conflict'}
+        self.files[path] = content
+        self.commits.append([path])
+        return {'success': True, 'file_path': path, 'url': f'https://example.com/{path}', 'sha': sha(content)}
+
+    def upload_stream(self, source, filename, target_dir='content/posts', message='Update file', branch='main',
+                      known_sha=None):
+        content = base64.b64encode(source.read()).decode('ascii')
+        return self.upload_file(content, filename, target_dir, message, branch, True, known_sha)
+
+    def upload_files(self, files, message='Update files', branch='main'):
+        for f in files:
+            if f.get('delete'):
+                self.files.pop(f['path'], None)
+            else:
+                self.files[f['path']] = f['content']
+        self.commits.append([f['path'] for f in files])
+        return {
+            'success': True,
+            'commit_sha': f'commit-{len(self.commits)}',
+            'files': [{'file_path': f['path'], 'url': f'https://example.com/{f["path"]}'} for f in files]
+        }
+
+
+def wrap(service, window=60.0):
+    return CoalescingGitHubService(service, CommitCoalescer(service, window=window))
+
+
+def test_stale_known_sha_is_rejected():
+    service = FakeGitHubService({'content/posts/a.md': 'v2'})
+    github = wrap(service)
+
+    result = github.upload_file('v3', 'a.md', known_sha=sha('v1'))
+
+    assert result['success'] is False
+    assert 'Conflict' in result['error']
+    assert service.files['content/posts/a.md'] == 'v2'
+
+
+def test_queued_write_is_committed_before_checked_write():
+    service = FakeGitHubService({'content/posts/a.md': 'v1'})
+    github = wrap(service)
+    github.coalescer.submit([{'path': 'content/posts/a.md', 'content': 'v2', 'message': 'queued'}])
+
+    # 调用方基于 v1 修改，而排队中的 v2 已更新了文件
+    result = github.upload_file('v3', 'a.md', known_sha=sha('v1'))
+
+    assert result['success'] is False
+    assert service.files['content/posts/a.md'] == 'v2'
+
+
+def test_current_known_sha_is_written():
+    service = FakeGitHubService({'content/posts/a.md': 'v1'})
+    github = wrap(service)
+
+    result = github.upload_file('v2', 'a.md', known_sha=sha('v1'))
+
+    assert result['success'] is True
+    assert service.files['content/posts/a.md'] == 'v2'
+
+
+class FlakyGitHubService(FakeGitHubService):
+    """含 bad 的路径使整批提交失败；raise_next 为 True 时下一次提交直接抛出异常"""
+
+    def __init__(self, files=None):
+        super().__init__(files)
+        self.raise_next = False
+
+    def upload_files(self, files, message='Update files', branch='main'):
+        if self.raise_next:
+            self.raise_next = False
+            raise RuntimeError('connection reset')
+        if any('bad' in f['path'] for f in files):
+            return {'success': False, 'error': '422 Unprocessable Entity'}
+        return super().upload_files(files, message, branch)
+
+
+def test_failing_group_does_not_fail_the_rest_of_the_batch():
+    service = FlakyGitHubService()
+    coalescer = CommitCoalescer(service, window=60.0)
+    good = coalescer.submit([{'path': 'content/posts/a.md', 'content': 'a', 'message': 'a'},
+                             {'path': 'static/images/a.png', 'content': 'aW1n', 'is_binary': True, 'message': 'a'}])
+    bad = coalescer.submit([{'path': 'content/posts/bad.md', 'content': 'b', 'message': 'b'}])
+
+    coalescer.flush()
+
+    assert [f.result(timeout=1)['success'] for f in good] == [True, True]
+    assert bad[0].result(timeout=1) == {'success': False, 'error': '422 Unprocessable Entity'}
+    assert service.files == {'content/posts/a.md': 'a', 'static/images/a.png': 'aW1n'}
+
+
+def test_flusher_thread_survives_errors():
+    service = FlakyGitHubService()
+    service.raise_next = True
+    coalescer = CommitCoalescer(service, window=0.01)
+
+    first = coalescer.wait(coalescer.submit([{'path': 'a.md', 'content': 'a', 'message': 'a'}]))
+    second = coalescer.wait(coalescer.submit([{'path': 'b.md', 'content': 'b', 'message': 'b'}]))
+
+    assert first[0] == {'success': False, 'error': 'connection reset'}
+    assert second[0]['success'] is True
+    assert coalescer._thread.is_alive()
+
+
+def test_resolve_skips_futures_that_already_have_a_result():
+    coalescer = CommitCoalescer(FakeGitHubService())
+    futures = coalescer.submit([{'path': 'a.md', 'content': 'a', 'message': 'a'}])
+    futures[0].set_result({'success': True})
+
+    coalescer._resolve(coalescer._take(), {'success': False, 'error': 'late'})
+
+    assert futures[0].result() == {'success': True}
+
+
+def test_async_engine_writes_share_the_coalescer():
+    from backend.services.async_engine import AsyncGitHubClient
+
+    service = FakeGitHubService()
+    github = wrap(service, window=0.05)
+    client = AsyncGitHubClient(github)
+    queued = github.coalescer.submit([{'path': 'content/posts/sync.md', 'content': 's', 'message': 'sync'}])
+
+    result = asyncio.run(client.upload_files([{'path': 'content/posts/async.md', 'content': 'a'}], message='async'))
+
+    assert result['success'] is True
+    assert queued[0].result(timeout=1)['success'] is True
+    assert service.commits == [['content/posts/sync.md', 'content/posts/async.md']]
@@ -0,0 +1,47 @@
+import pytest
+
+from backend.services.circuit_breaker import STATE_HALF_OPEN, STATE_OPEN
+from backend.services.deepseek import DeepSeekService
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setenv('DEEPSEEK_API_KEY', 'test-key')
+    monkeypatch.setenv('DEEPSEEK_RATE_LIMIT_DB', str(tmp_path / 'ratelimit.sqlite3'))
+    return DeepSeekService()
+
+
+def half_open(breaker):
+    breaker._state = STATE_OPEN
+    breaker._opened_at = 0.0
+
+
+def reserved_tokens(service):
+    return service.rate_limiter.snapshot()['tokens_last_minute']
+
+
+def test_callback_error_releases_the_half_open_probe(service):
+    half_open(service.circuit_breaker)
+
+    def on_delta(text):
+        raise RuntimeError('client went away')
+
+    service._call_api_stream = lambda headers, payload, callback: callback('partial')
+    with pytest.raises(RuntimeError):
+        service._call_api([{'role': 'user', 'content': 'hello'}], on_delta=on_delta)
+
+    assert service.circuit_breaker.state == STATE_HALF_OPEN
+    assert service.circuit_breaker.allow() is True
+    assert reserved_tokens(service) == 0
+
+
+def test_unexpected_error_settles_the_rate_limit_reservation(service):
+    def broken_stream(headers, payload, on_delta):
+        raise LookupError('unexpected')
+
+    service._call_api_stream = broken_stream
+    with pytest.raises(LookupError):
+        service._call_api([{'role': 'user', 'content': 'hello ' * 200}], on_delta=lambda text: None)
+
+    assert service.rate_limiter.snapshot()['requests_last_minute'] == 1
+    assert reserved_tokens(service) == 0
@@ -0,0 +1,99 @@
+import pytest
+
+from backend.services import feed_poller as feed_poller_module
+from backend.services.feed_poller import FeedPoller
+
+FEED_URL = 'https://example.com/feed.xml'
+
+FEED = b'''<?xml version="1.0"?>
+<rss version="2.0"><channel>
+<item><guid>1</guid><title>Same</title><link>https://example.com/1</link></item>
+<item><guid>2</guid><title>Same</title><link>https://example.com/2</link></item>
+</channel></rss>'''
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        pass
+
+
+class FakeGitHubService:
+    def __init__(self):
+        self.commits = []
+        self.error = None
+
+    def upload_files(self, files, message='Update files', branch='main'):
+        if self.error:
+            raise self.error
+        self.commits.append([f['path'] for f in files])
+        return {'success': True, 'commit_sha': f'commit-{len(self.commits)}'}
+
+
+@pytest.fixture
+def requests_get(monkeypatch):
+    calls = []
+
+    def get(url, headers=None, **kwargs):
+        calls.append(headers)
+        if headers.get('If-None-Match') == '"v1"':
+            return FakeResponse(304)
+        return FakeResponse(200, FEED, {'ETag': '"v1"'})
+
+    class Requests:
+        pass
+
+    fake = Requests()
+    fake.get = get
+    monkeypatch.setattr(feed_poller_module, 'requests', fake)
+    return calls
+
+
+def poller(tmp_path, monkeypatch, prepare, github=None):
+    monkeypatch.setenv('FEED_STATE_PATH', str(tmp_path / 'feeds.sqlite3'))
+    feeds = FeedPoller(github or FakeGitHubService(), prepare)
+    feeds.subscribe(FEED_URL, backfill=10)
+    return feeds
+
+
+def test_validators_are_not_saved_when_publishing_raises(tmp_path, monkeypatch, requests_get):
+    github = FakeGitHubService()
+    feeds = poller(tmp_path, monkeypatch, lambda entry, options: [{'path': f"p/{entry['guid']}.md", 'content': ''}],
+                   github)
+    github.error = RuntimeError('connection reset')
+
+    report = feeds.poll_all()
+
+    assert report['success'] is False
+    assert report['error'] == 'connection reset'
+    assert feeds.get_feed(FEED_URL)['etag'] is None
+
+    github.error = None
+    report = feeds.poll_all()
+
+    assert 'If-None-Match' not in requests_get[-1]
+    assert sorted(report['published']) == ['p/1.md', 'p/2.md']
+    assert feeds.get_feed(FEED_URL)['etag'] == '"v1"'
+
+
+def test_entry_with_duplicate_path_is_skipped(tmp_path, monkeypatch, requests_get):
+    feeds = poller(tmp_path, monkeypatch, lambda entry, options: [{'path': 'p/same.md', 'content': entry['guid']}])
+
+    report = feeds.poll_all()
+
+    assert report['published'] == ['p/same.md']
+    assert len(report['skipped']) == 1
+    assert 'p/same.md' in report['skipped'][0]['reason']
+    statuses = {row['guid']: (row['status'], row['path'])
+                for row in feeds._connect().execute('SELECT guid, status, path FROM seen')}
+    assert sorted(statuses.values()) == [('published', 'p/same.md'), ('skipped', '')]
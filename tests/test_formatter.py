@@ -0,0 +1,31 @@
+from backend.utils.formatter import MarkdownFormatter
+
+
+def test_indented_code_block_is_left_unchanged():
+    content = ('使用pip安装:\n'
+               '\n'
+               '    pip install requests,flask\n'
+               '    # 中文注释:不要改\n'
+               '\n'
+               '    print("ok")\n'
+               '\n'
+               '然后运行app')
+
+    formatted = MarkdownFormatter().format(content)
+
+    assert formatted == ('使用 pip 安装：\n'
+                         '\n'
+                         '    pip install requests,flask\n'
+                         '    # 中文注释:不要改\n'
+                         '\n'
+                         '    print("ok")\n'
+                         '\n'
+                         '然后运行 app\n')
+
+
+def test_indented_list_continuation_is_still_formatted():
+    content = '- 第一项\n\n    继续说明Python用法\n'
+
+    formatted = MarkdownFormatter().format(content)
+
+    assert '    继续说明 Python 用法' in formatted
@@ -0,0 +1,45 @@
+import time
+import asyncio
+import sqlite3
+import threading
+
+from backend.services.rate_limiter import RateLimiter
+
+
+def test_acquire_async_does_not_block_the_event_loop(tmp_path):
+    limiter = RateLimiter(rpm=60, state_path=str(tmp_path / 'ratelimit.sqlite3'))
+    limiter.acquire(1)
+
+    # 另一个进程持有写锁时，BEGIN IMMEDIATE 会一直等到锁释放
+    other = sqlite3.connect(limiter.state_path, isolation_level=None, check_same_thread=False)
+    other.execute('BEGIN IMMEDIATE')
+    threading.Timer(0.3, lambda: other.execute('COMMIT')).start()
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            while len(ticks) < 10:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        ticking = asyncio.ensure_future(ticker())
+        await asyncio.sleep(0.05)
+        row_id = await limiter.acquire_async(1)
+        await ticking
+        return row_id, ticks
+
+    row_id, ticks = asyncio.run(main())
+
+    assert row_id is not None
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.2
+
+
+def test_state_file_is_created_on_first_acquire(tmp_path):
+    path = tmp_path / 'ratelimit.sqlite3'
+    limiter = RateLimiter(rpm=60, state_path=str(path))
+
+    assert not path.exists()
+
+    assert limiter.acquire(1) is not None
+    assert path.exists()